@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script para agregar y llenar la columna persona.nombre_busqueda y su índice
+
+Agrega la columna si la base de datos es anterior a ella, habilita pg_trgm en
+PostgreSQL, calcula el nombre normalizado de las personas que no lo tienen
+(o de todas con --todos) y crea el índice de búsqueda.
+
+Uso:
+    python actualizar_busqueda_personas.py
+    python actualizar_busqueda_personas.py --todos
+"""
+
+import sys
+import os
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import bindparam, inspect, text
+
+from app import create_app, db
+from app.models.persona import Persona, nombre_busqueda
+
+LOTE = 1000
+
+
+def preparar_esquema():
+    """Agrega la columna y la extensión pg_trgm si faltan"""
+    columnas = {columna["name"] for columna in inspect(db.engine).get_columns("persona")}
+    if "nombre_busqueda" not in columnas:
+        print("Agregando columna persona.nombre_busqueda...")
+        db.session.execute(text("ALTER TABLE persona ADD COLUMN nombre_busqueda VARCHAR(620)"))
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    db.session.commit()
+
+
+def llenar_nombres(todos):
+    """Calcula el nombre de búsqueda por lotes; devuelve la cantidad de personas actualizadas"""
+    tabla = Persona.__table__
+    actualizar = (
+        tabla.update()
+        .where(tabla.c.id_persona == bindparam("b_id"))
+        .values(nombre_busqueda=bindparam("b_nombre"))
+    )
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        consulta = db.session.query(
+            Persona.id_persona,
+            Persona.primer_nombre,
+            Persona.segundo_nombre,
+            Persona.primer_apellido,
+            Persona.segundo_apellido,
+        ).filter(Persona.id_persona > ultimo_id)
+        if not todos:
+            consulta = consulta.filter(Persona.nombre_busqueda.is_(None))
+        filas = consulta.order_by(Persona.id_persona).limit(LOTE).all()
+        if not filas:
+            return total
+
+        db.session.execute(
+            actualizar,
+            [
+                {
+                    "b_id": fila.id_persona,
+                    "b_nombre": nombre_busqueda(*fila[1:]),
+                }
+                for fila in filas
+            ],
+        )
+        db.session.commit()
+        total += len(filas)
+        ultimo_id = filas[-1].id_persona
+
+
+def crear_indice():
+    for indice in Persona.__table__.indexes:
+        indice.create(db.engine, checkfirst=True)
+
+
+def main():
+    """Prepara la columna de búsqueda de personas"""
+    app = create_app()
+    todos = "--todos" in sys.argv[1:]
+
+    with app.app_context():
+        try:
+            preparar_esquema()
+            print("Calculando nombres de búsqueda...")
+            total = llenar_nombres(todos)
+            print(f"✅ Personas actualizadas: {total}")
+            crear_indice()
+            print("✅ Índice de búsqueda disponible")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error al actualizar la búsqueda de personas: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
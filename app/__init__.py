@@ -70,6 +70,30 @@ def create_app():
     # Registrar la función como filtro de Jinja2
     app.jinja_env.filters["fecha_es"] = format_date_spanish
 
+    from .utils.cache_credenciales import cache_credenciales
+
+    cache_credenciales.init_app(app)
+
+    from .utils.limitador import limitador_intentos
+
+    limitador_intentos.init_app(app)
+
+    from .utils.cola_registros import cola_registros
+
+    cola_registros.init_app(app)
+
+    from .utils.contadores import contadores_panel
+
+    contadores_panel.init_app(app)
+
+    from .utils.cache_reportes import cache_reportes
+
+    cache_reportes.init_app(app)
+
+    from .utils.trabajos_reportes import trabajos_reportes
+
+    trabajos_reportes.init_app(app)
+
     from .routers.auth import auth_bp
     from .routers.registro import registro_bp
     from .routers.admin import admin_bp
@@ -7,6 +7,9 @@ from .tipo_registro import TipoRegistro
 from .registro import Registro
 from .empleado import Empleado
 from .usuarios import Usuario
+from .estado_asistencia import EstadoAsistencia
+from .jornada import Jornada
+from .version_cache import VersionCache
 
 __all__ = [
     "Persona",
@@ -18,4 +21,7 @@ __all__ = [
     "Registro",
     "Empleado",
     "Usuario",
+    "EstadoAsistencia",
+    "Jornada",
+    "VersionCache",
 ]
@@ -14,6 +14,10 @@ class Credencial(db.Model):
     # Restricción de credencial única
     __table_args__ = (
         db.UniqueConstraint('id_tipo_credencial', 'valor', name='uk_credencial_tipo_valor'),
+        db.Index(
+            'ix_credencial_persona', 'id_persona',
+            postgresql_include=['id_tipo_credencial', 'activo', 'valor'],
+        ),
     )
 
     # Relaciones de las tablas
@@ -0,0 +1,22 @@
+from app import db
+from datetime import datetime
+
+class EstadoAsistencia(db.Model):
+    __tablename__ = 'estado_asistencia'
+
+    id_persona = db.Column(db.Integer, db.ForeignKey('persona.id_persona', ondelete="CASCADE"), primary_key=True)
+    # Registro de ingreso sin salida posterior (None si no hay turno abierto)
+    id_registro_abierto = db.Column(db.Integer)
+    fecha_hora_ultimo_ingreso = db.Column(db.DateTime)
+    fecha_hora_ultima_salida = db.Column(db.DateTime)
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relaciones de las tablas
+    persona = db.relationship("Persona", backref=db.backref("estado_asistencia", uselist=False), passive_deletes=True)
+
+    @property
+    def turno_abierto(self):
+        return self.id_registro_abierto is not None
+
+    def __repr__(self):
+        return f"<EstadoAsistencia Persona {self.id_persona} - Abierto {self.id_registro_abierto}>"
@@ -0,0 +1,33 @@
+from app import db
+from datetime import datetime
+
+class Jornada(db.Model):
+    __tablename__ = 'jornada'
+
+    # Resumen diario de asistencia por persona, mantenido al insertar registros
+    id_persona = db.Column(db.Integer, db.ForeignKey('persona.id_persona', ondelete="CASCADE"), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    fecha_hora_primer_ingreso = db.Column(db.DateTime)
+    fecha_hora_ultima_salida = db.Column(db.DateTime)
+    pares = db.Column(db.Integer, nullable=False, default=0)
+    minutos_trabajados = db.Column(db.Integer, nullable=False, default=0)
+    # Primer ingreso del día que aún no tiene salida (None si la jornada está cerrada)
+    fecha_hora_ingreso_abierto = db.Column(db.DateTime)
+    # Ingresos del día que esperan salida; cada salida cierra el más antiguo
+    ingresos_abiertos = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Índice para los reportes por rango de fechas
+    __table_args__ = (
+        db.Index('ix_jornada_fecha', 'fecha', 'id_persona'),
+    )
+
+    # Relaciones de las tablas
+    persona = db.relationship("Persona", backref="jornadas", passive_deletes=True)
+
+    @property
+    def abierta(self):
+        return self.fecha_hora_ingreso_abierto is not None
+
+    def __repr__(self):
+        return f"<Jornada Persona {self.id_persona} - {self.fecha}>"
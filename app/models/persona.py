@@ -1,5 +1,22 @@
+import unicodedata
 from app import db
 from datetime import datetime
+from sqlalchemy import DDL, event
+
+
+def normalizar_texto(texto):
+    """Pasa un texto a minúsculas sin tildes y con espacios simples para búsquedas"""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.lower().split())
+
+
+def escapar_like(texto):
+    """Escapa los comodines de LIKE (usar con escape="\\")"""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 class Persona(db.Model):
     __tablename__ = "persona"
@@ -13,6 +30,44 @@ class Persona(db.Model):
     correo = db.Column(db.String(255), nullable=False, unique=True)
     celular = db.Column(db.String(50))
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # Nombre completo normalizado (minúsculas, sin tildes) para búsquedas
+    nombre_busqueda = db.Column(db.String(620))
+
+    # Índice de trigramas para búsquedas por subcadena (índice normal fuera de PostgreSQL)
+    __table_args__ = (
+        db.Index(
+            "ix_persona_nombre_busqueda", "nombre_busqueda",
+            postgresql_using="gin",
+            postgresql_ops={"nombre_busqueda": "gin_trgm_ops"},
+        ),
+    )
+
+    def actualizar_nombre_busqueda(self):
+        self.nombre_busqueda = nombre_busqueda(
+            self.primer_nombre,
+            self.segundo_nombre,
+            self.primer_apellido,
+            self.segundo_apellido,
+        )
 
     def __repr__(self):
-        return f"<Persona {self.primer_nombre} {self.primer_apellido}>"
\ No newline at end of file
+        return f"<Persona {self.primer_nombre} {self.primer_apellido}>"
+
+
+def nombre_busqueda(*partes):
+    return normalizar_texto(" ".join(parte for parte in partes if parte))
+
+
+# Mantener el nombre de búsqueda sincronizado al crear y editar personas
+@event.listens_for(Persona, "before_insert")
+@event.listens_for(Persona, "before_update")
+def _sincronizar_nombre_busqueda(mapper, connection, persona):
+    persona.actualizar_nombre_busqueda()
+
+
+# El índice de trigramas requiere la extensión pg_trgm
+event.listen(
+    Persona.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
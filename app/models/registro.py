@@ -11,6 +11,19 @@ class Registro(db.Model):
     fecha_hora = db.Column(db.DateTime, nullable=False)
     observacion = db.Column(db.String(200))
 
+    # Índices para el registro de asistencia, reportes e historial
+    __table_args__ = (
+        db.Index(
+            'ix_registro_persona_tipo_fecha', 'id_persona', 'id_tipo_registro', 'fecha_hora',
+            postgresql_include=['registro_id'],
+        ),
+        db.Index('ix_registro_persona_fecha', 'id_persona', 'fecha_hora', 'registro_id'),
+        db.Index(
+            'ix_registro_fecha_hora', 'fecha_hora',
+            postgresql_include=['id_persona', 'id_tipo_registro'],
+        ),
+    )
+
     # Relaciones de las tablas
     persona = db.relationship("Persona", backref="registros", passive_deletes=True)
     credencial = db.relationship("Credencial", backref="registros", passive_deletes=True)
@@ -15,6 +15,8 @@ class Usuario(UserMixin, db.Model):
     id_rol = db.Column(db.Integer, db.ForeignKey("roles.id_rol"), nullable=False)
     contrasena = db.Column(db.String(255), nullable=False)
 
+    __table_args__ = (db.Index("ix_usuarios_persona", "id_persona"),)
+
     # Relaciones de las tablas
     persona = db.relationship(
         "Persona", backref="usuario", uselist=False, passive_deletes=True
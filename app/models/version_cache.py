@@ -0,0 +1,37 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+
+class VersionCache(db.Model):
+    __tablename__ = 'version_cache'
+
+    # Contador compartido entre procesos: cada proceso compara su copia con
+    # la guardada y descarta su cache en memoria cuando cambia
+    nombre = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    @classmethod
+    def leer(cls, nombre):
+        """Versión actual del cache indicado (0 si nunca se incrementó)"""
+        return db.session.query(cls.version).filter(cls.nombre == nombre).scalar() or 0
+
+    @classmethod
+    def incrementar(cls, nombre):
+        """Incrementa la versión en la transacción actual; crea la fila la primera vez"""
+        actualizadas = (
+            db.session.query(cls)
+            .filter(cls.nombre == nombre)
+            .update({cls.version: cls.version + 1}, synchronize_session=False)
+        )
+        if actualizadas:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(nombre=nombre, version=1))
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            cls.incrementar(nombre)
+
+    def __repr__(self):
+        return f"<VersionCache {self.nombre} - {self.version}>"
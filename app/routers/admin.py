@@ -1,4 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import (
+    Blueprint,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    flash,
+    jsonify,
+    current_app,
+    Response,
+    stream_with_context,
+    send_file,
+)
 from app import db
 from app.models.empleado import Empleado
 from app.models.persona import Persona
@@ -6,12 +18,29 @@ from app.models.cargo_empleado import CargoEmpleado
 from app.models.credencial import Credencial
 from app.models.tipo_credencial import TipoCredencial
 from app.models.usuarios import Usuario
-from app.models.registro import Registro
-from app.models.tipo_registro import TipoRegistro
+from app.utils.cache_credenciales import cache_credenciales
+from app.utils.cola_registros import cola_registros
+from app.utils.contadores import contadores_panel
+from app.utils.limitador import limitador_intentos
+from app.utils.reportes import (
+    parsear_filtros,
+    pagina_pares,
+    paginar_pares,
+    consulta_resumen,
+    nombre_completo,
+)
+from app.utils.cache_reportes import cache_reportes
+from app.utils.empleados import (
+    cambiar_estado_credenciales,
+    fila_a_empleado,
+    pagina_empleados,
+)
+from app.utils.importacion import importar_empleados
+from app.utils.pines import PinesAgotados, crear_credencial_pin
+from app.utils.exportacion import FORMATOS, exportar_csv, exportar_xlsx, nombre_archivo
+from app.utils.trabajos_reportes import trabajos_reportes
 from werkzeug.security import generate_password_hash
 from datetime import datetime
-import random
-import string
 from flask_login import login_required, current_user
 from functools import wraps
 
@@ -35,50 +64,37 @@ def admin_required(f):
 @login_required
 @admin_required
 def lista_empleados():
-    # Lista de empleados
-    empleados = (
-        Empleado.query.join(Persona, Empleado.id_persona == Persona.id_persona)
-        .join(CargoEmpleado, Empleado.cargo_id == CargoEmpleado.id_cargo)
-        .add_columns(
-            Persona.primer_nombre,
-            Persona.segundo_nombre,
-            Persona.primer_apellido,
-            Persona.segundo_apellido,
-            Persona.documento,
-            Persona.fecha_creacion,
-            CargoEmpleado.descripcion.label("cargo"),
-            Empleado.empleado_id,
-            Empleado.fecha_contratacion,
-            Empleado.id_persona,
-        )
-        .all()
-    )
-
-    # Obtenemos información sobre las credenciales de cada empleado
-    empleados_con_credenciales = []
-    for emp in empleados:
-        credencial = (
-            Credencial.query.join(TipoCredencial)
-            .filter(
-                Credencial.id_persona == emp.id_persona, TipoCredencial.nombre == "PIN"
-            )
-            .first()
-        )
+    # Las filas se cargan desde lista_empleados_datos (procesamiento en servidor)
+    return render_template("admin/vista_empleados.html")
 
-        tiene_credencial = credencial is not None
-        credencial_activa = tiene_credencial and credencial.activo
 
-        empleados_con_credenciales.append(
-            {
-                "info": emp,
-                "tiene_credencial": tiene_credencial,
-                "credencial_activa": credencial_activa,
-            }
-        )
+@admin_bp.route("/empleados/datos", methods=["GET"])
+@login_required
+@admin_required
+def lista_empleados_datos():
+    """Página de empleados para DataTables (procesamiento en servidor)"""
+    draw = request.args.get("draw", 0, type=int)
+    inicio = max(request.args.get("start", 0, type=int), 0)
+    longitud = request.args.get("length", 10, type=int)
+    pagina_max = current_app.config.get("EMPLEADOS_PAGINA_MAX", 500)
+    if longitud <= 0 or longitud > pagina_max:
+        longitud = pagina_max
+
+    total, filtrados, filas = pagina_empleados(
+        inicio,
+        longitud,
+        busqueda=request.args.get("search[value]", ""),
+        columna=request.args.get("order[0][column]", 0, type=int),
+        descendente=request.args.get("order[0][dir]", "asc") == "desc",
+    )
 
-    return render_template(
-        "admin/vista_empleados.html",
-        empleados_con_credenciales=empleados_con_credenciales,
+    return jsonify(
+        {
+            "draw": draw,
+            "recordsTotal": total,
+            "recordsFiltered": filtrados,
+            "data": [fila_a_empleado(fila) for fila in filas],
+        }
     )
 
 
@@ -175,25 +191,9 @@ def crear_empleado():
 
             db.session.add(empleado)
 
-            # Generar PIN para el empleado
-            pin = generate_pin(primer_nombre)
-
-            # Obtener o crear el tipo de credencial PIN
-            tipo_pin = TipoCredencial.query.filter_by(nombre="PIN").first()
-            if not tipo_pin:
-                tipo_pin = TipoCredencial(nombre="PIN")
-                db.session.add(tipo_pin)
-                db.session.flush()
-
-            # Crear credencial PIN para el empleado
-            credencial = Credencial(
-                id_persona=persona.id_persona,
-                id_tipo_credencial=tipo_pin.id_tipo_credencial,
-                valor=pin,
-                activo=True,
-            )
-
-            db.session.add(credencial)
+            # Credencial PIN con un valor libre para el prefijo del nombre
+            credencial = crear_credencial_pin(persona.id_persona, primer_nombre)
+            pin = credencial.valor
 
             # Crear un usuario para el empleado (para poder iniciar sesión)
             usuario = Usuario(
@@ -204,6 +204,8 @@ def crear_empleado():
 
             db.session.add(usuario)
             db.session.commit()
+            cache_credenciales.invalidar_pin(pin)
+            contadores_panel.invalidar()
 
             flash(f"Empleado creado con éxito. PIN generado: {pin}", "success")
             flash(
@@ -212,6 +214,9 @@ def crear_empleado():
             )
             return redirect(url_for("admin.lista_empleados"))
 
+        except PinesAgotados as e:
+            db.session.rollback()
+            flash(str(e), "error")
         except Exception as e:
             db.session.rollback()
             flash(f"Error al crear el empleado: {str(e)}", "error")
@@ -219,243 +224,277 @@ def crear_empleado():
     return render_template("admin/crear_empleado.html", cargos=cargos)
 
 
+@admin_bp.route("/empleados/importar", methods=["POST"])
+@login_required
+@admin_required
+def importar_empleados_csv():
+    """Importa empleados en bloque desde un CSV y devuelve el resultado por fila"""
+    archivo = request.files.get("archivo")
+    if not archivo or not archivo.filename:
+        return jsonify({"success": False, "message": "Debe adjuntar un archivo CSV"}), 400
+
+    try:
+        resumen = importar_empleados(
+            archivo.read(), solo_validar=request.form.get("solo_validar") == "1"
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"success": False, "message": f"Archivo no válido: {str(e)}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return (
+            jsonify({"success": False, "message": f"Error al importar los empleados: {str(e)}"}),
+            500,
+        )
+
+    if request.form.get("solo_validar") == "1":
+        mensaje = f"{resumen['validos']} de {resumen['total']} filas válidas"
+    else:
+        mensaje = f"{resumen['creados']} de {resumen['total']} empleados creados"
+    return jsonify({"success": True, "message": mensaje, **resumen})
+
+
 @admin_bp.route("/reportes", methods=["GET"])
 def reportes():
     """Vista de reportes para administradores"""
-    # Obtener todos los empleados para el contador
-    empleados = (
-        Empleado.query.join(Persona, Empleado.id_persona == Persona.id_persona)
-        .add_columns(
-            Persona.primer_nombre,
-            Persona.segundo_nombre,
-            Persona.primer_apellido,
-            Persona.segundo_apellido,
-            Empleado.empleado_id,
-        )
-        .all()
-    )
+    # Obtener parámetros de filtro (la tabla se carga desde admin.reportes_datos)
+    filtros = parsear_filtros(request.args)
 
-    # Obtener parámetros de filtro
-    busqueda_nombre = request.args.get("busqueda_nombre", "").strip()
-    fecha_inicio = request.args.get("fecha_inicio")
-    fecha_fin = request.args.get("fecha_fin")
+    # Métricas del encabezado (cache en memoria)
+    contadores = contadores_panel.obtener()
 
-    # Validar fechas
-    if fecha_inicio and fecha_fin:
-        try:
-            fecha_inicio_obj = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
-            fecha_fin_obj = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
-
-            if fecha_inicio_obj > fecha_fin_obj:
-                # Si la fecha de inicio es mayor que la fecha de fin, intercambiar las fechas
-                fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
-                fecha_inicio_obj, fecha_fin_obj = fecha_fin_obj, fecha_inicio_obj
-        except ValueError:
-            # Si hay error en el formato de fechas, limpiar las fechas
-            fecha_inicio = None
-            fecha_fin = None
-
-    # Construir consulta base para registros
-    query = (
-        Registro.query.join(Persona, Registro.id_persona == Persona.id_persona)
-        .join(TipoRegistro, Registro.id_tipo_registro == TipoRegistro.id_tipo_registro)
-        .add_columns(
-            Persona.primer_nombre,
-            Persona.segundo_nombre,
-            Persona.primer_apellido,
-            Persona.segundo_apellido,
-            Registro.fecha_hora,
-            Registro.id_tipo_registro,
-            TipoRegistro.descripcion.label("tipo_registro"),
-        )
+    return render_template(
+        "admin/reportes.html",
+        total_empleados=contadores["total_empleados"],
+        entradas_hoy=contadores["entradas_hoy"],
+        salidas_hoy=contadores["salidas_hoy"],
+        busqueda_nombre=filtros.busqueda_nombre,
+        fecha_inicio=filtros.fecha_inicio.isoformat() if filtros.fecha_inicio else None,
+        fecha_fin=filtros.fecha_fin.isoformat() if filtros.fecha_fin else None,
     )
 
-    # Aplicar filtros
-    if busqueda_nombre:
-        # Buscar por nombre completo (primer nombre, segundo nombre, primer apellido, segundo apellido)
-        busqueda_terms = busqueda_nombre.split()
-        condiciones = []
-
-        for term in busqueda_terms:
-            term_like = f"%{term}%"
-            condiciones.append(
-                db.or_(
-                    Persona.primer_nombre.ilike(term_like),
-                    Persona.segundo_nombre.ilike(term_like),
-                    Persona.primer_apellido.ilike(term_like),
-                    Persona.segundo_apellido.ilike(term_like),
-                )
-            )
 
-        # Combinar todas las condiciones con AND (todos los términos deben coincidir)
-        if condiciones:
-            query = query.filter(db.and_(*condiciones))
-
-    if fecha_inicio:
-        fecha_inicio_obj = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
-        # Convertir a datetime para comparación precisa
-        fecha_inicio_datetime = datetime.combine(fecha_inicio_obj, datetime.min.time())
-        query = query.filter(Registro.fecha_hora >= fecha_inicio_datetime)
-
-    if fecha_fin:
-        # Para la fecha fin, incluir todo el día (hasta las 23:59:59)
-        fecha_fin_obj = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
-        fecha_fin_completa = datetime.combine(fecha_fin_obj, datetime.max.time())
-        query = query.filter(Registro.fecha_hora <= fecha_fin_completa)
-
-    # Ordenar por fecha descendente
-    registros = query.order_by(Registro.fecha_hora.desc()).all()
-
-    # Procesar registros para crear pares de ingreso-salida
-    registros_procesados = []
-
-    # Agrupar registros por empleado y fecha
-    registros_por_empleado_fecha = {}
-
-    for registro in registros:
-        empleado_nombre = f"{registro.primer_nombre} {registro.segundo_nombre if registro.segundo_nombre else ''} {registro.primer_apellido} {registro.segundo_apellido if registro.segundo_apellido else ''}".strip()
-        fecha = registro.fecha_hora.date()
-        hora = registro.fecha_hora.time()
-        tipo = registro.tipo_registro
-
-        # Crear clave única por empleado y fecha
-        clave = f"{empleado_nombre}_{fecha}"
-
-        if clave not in registros_por_empleado_fecha:
-            registros_por_empleado_fecha[clave] = {
-                "empleado": empleado_nombre,
-                "fecha": fecha,
-                "ingresos": [],
-                "salidas": [],
-            }
+@admin_bp.route("/reportes/datos", methods=["GET"])
+@login_required
+@admin_required
+def reportes_datos():
+    """Página de pares ingreso/salida para DataTables (procesamiento en servidor)"""
+    filtros = parsear_filtros(request.args)
+
+    draw = request.args.get("draw", 0, type=int)
+    inicio = max(request.args.get("start", 0, type=int), 0)
+    longitud = request.args.get("length", 25, type=int)
+    pagina_max = current_app.config.get("REPORTES_PAGINA_MAX", 500)
+    if longitud <= 0 or longitud > pagina_max:
+        longitud = pagina_max
+
+    # Solo se pueden ordenar las columnas de empleado (0) y fecha (1)
+    columna = "empleado" if request.args.get("order[0][column]") == "0" else "fecha"
+    descendente = request.args.get("order[0][dir]", "desc") != "asc"
+
+    busqueda = request.args.get("search[value]", "")
+
+    # Rangos acotados desde el cache por día; el resto se pagina en la base de datos
+    pares_cache = cache_reportes.obtener_pares(filtros)
+    if pares_cache is not None:
+        total, filtrados, pares = paginar_pares(
+            pares_cache, inicio, longitud, busqueda, columna, descendente
+        )
+    else:
+        total, filtrados, pares = pagina_pares(
+            filtros, inicio, longitud, busqueda, columna, descendente
+        )
 
-        # Agregar a la lista correspondiente
-        if registro.id_tipo_registro == 1:  # ID 1 = Ingreso
-            registros_por_empleado_fecha[clave]["ingresos"].append(hora)
-        elif registro.id_tipo_registro == 2:  # ID 2 = Salida
-            registros_por_empleado_fecha[clave]["salidas"].append(hora)
+    return jsonify(
+        {
+            "draw": draw,
+            "recordsTotal": total,
+            "recordsFiltered": filtrados,
+            "data": [
+                {
+                    "empleado": par["empleado"],
+                    "fecha": par["fecha"].strftime("%Y-%m-%d"),
+                    "hora_entrada": (
+                        par["hora_entrada"].strftime("%H:%M")
+                        if par["hora_entrada"]
+                        else "Sin registrar"
+                    ),
+                    "hora_salida": (
+                        par["hora_salida"].strftime("%H:%M")
+                        if par["hora_salida"]
+                        else "Sin registrar"
+                    ),
+                }
+                for par in pares
+            ],
+        }
+    )
 
-    # Crear pares de ingreso-salida
-    for clave, datos in registros_por_empleado_fecha.items():
-        ingresos = sorted(datos["ingresos"])
-        salidas = sorted(datos["salidas"])
 
-        # Crear registros separados para cada ingreso (todos los ingresos deben mostrarse)
-        for ingreso in ingresos:
-            registros_procesados.append(
+@admin_bp.route("/reportes/resumen", methods=["GET"])
+@login_required
+@admin_required
+def reportes_resumen():
+    """Totales de asistencia por empleado en el rango, desde la tabla jornada"""
+    filtros = parsear_filtros(request.args)
+
+    return jsonify(
+        {
+            "fecha_inicio": filtros.fecha_inicio.isoformat() if filtros.fecha_inicio else None,
+            "fecha_fin": filtros.fecha_fin.isoformat() if filtros.fecha_fin else None,
+            "data": [
                 {
-                    "empleado": datos["empleado"],
-                    "fecha": datos["fecha"],
-                    "hora_entrada": ingreso,
-                    "hora_salida": None,  # Inicialmente sin salida
+                    "id_persona": fila.id_persona,
+                    "empleado": nombre_completo(fila),
+                    "dias": fila.dias,
+                    "pares": int(fila.pares or 0),
+                    "minutos_trabajados": int(fila.minutos_trabajados or 0),
+                    "horas_trabajadas": round((fila.minutos_trabajados or 0) / 60, 2),
+                    "jornadas_abiertas": fila.jornadas_abiertas,
+                    "primer_ingreso": (
+                        fila.primer_ingreso.isoformat() if fila.primer_ingreso else None
+                    ),
+                    "ultima_salida": (
+                        fila.ultima_salida.isoformat() if fila.ultima_salida else None
+                    ),
                 }
-            )
-            
-        # Crear registros para cada salida que no tenga ingreso correspondiente
-        for salida in salidas:
-            # Intentar encontrar un registro existente que pueda emparejar con esta salida
-            match_found = False
-            for registro in registros_procesados:
-                # Si es del mismo empleado, misma fecha, tiene entrada pero no tiene salida y la entrada es anterior a la salida
-                if (registro["empleado"] == datos["empleado"] and 
-                    registro["fecha"] == datos["fecha"] and 
-                    registro["hora_entrada"] and 
-                    not registro["hora_salida"] and
-                    registro["hora_entrada"] < salida):
-                    
-                    # Asignar esta salida al registro
-                    registro["hora_salida"] = salida
-                    match_found = True
-                    break
-            
-            # Si no se encontró un registro para emparejar, crear uno nuevo
-            if not match_found:
-                registros_procesados.append(
-                    {
-                        "empleado": datos["empleado"],
-                        "fecha": datos["fecha"],
-                        "hora_entrada": None,
-                        "hora_salida": salida,
-                    }
-                )
-
-    # Filtrar registros procesados para asegurar que estén dentro del rango de fechas
-    registros_filtrados = []
-    for registro in registros_procesados:
-        fecha_registro = registro["fecha"]
+                for fila in consulta_resumen(filtros)
+            ],
+        }
+    )
 
-        # Verificar que la fecha esté dentro del rango especificado
-        fecha_valida = True
 
-        if fecha_inicio and fecha_registro < fecha_inicio_obj:
-            fecha_valida = False
-        if fecha_fin and fecha_registro > fecha_fin_obj:
-            fecha_valida = False
+@admin_bp.route("/reportes/exportar", methods=["GET"])
+@login_required
+@admin_required
+def exportar_reportes():
+    """Descarga el reporte filtrado en CSV o XLSX enviando las filas a medida que se leen"""
+    formato = request.args.get("formato", "csv")
+    if formato not in FORMATOS:
+        flash("Formato de exportación no válido", "error")
+        return redirect(url_for("admin.reportes"))
+
+    filtros = parsear_filtros(request.args)
+    generador = exportar_csv(filtros) if formato == "csv" else exportar_xlsx(filtros)
+
+    return Response(
+        stream_with_context(generador),
+        mimetype=FORMATOS[formato],
+        headers={
+            "Content-Disposition": f"attachment; filename={nombre_archivo(filtros, formato)}",
+            # Evitar que un proxy acumule la respuesta completa antes de enviarla
+            "X-Accel-Buffering": "no",
+        },
+    )
 
-        if fecha_valida:
-            registros_filtrados.append(registro)
 
-    # Ordenar por fecha descendente y luego por hora de entrada
-    registros_filtrados.sort(
-        key=lambda x: (x["fecha"], x["hora_entrada"] or x["hora_salida"]), reverse=True
+@admin_bp.route("/reportes/trabajos", methods=["GET"])
+@login_required
+@admin_required
+def listar_trabajos_reportes():
+    """Trabajos de reporte en segundo plano del usuario actual"""
+    return jsonify(
+        {
+            "success": True,
+            "trabajos": [
+                _trabajo_json(trabajo)
+                for trabajo in trabajos_reportes.listar(current_user.id_usuario)
+            ],
+        }
     )
 
-    # Calcular métricas
-    total_empleados = len(empleados)
-    hoy = datetime.now().date()
-    entradas_hoy = Registro.query.filter(
-        Registro.fecha_hora >= hoy, Registro.id_tipo_registro == 1  # Tipo ingreso
-    ).count()
-    salidas_hoy = Registro.query.filter(
-        Registro.fecha_hora >= hoy, Registro.id_tipo_registro == 2  # Tipo salida
-    ).count()
 
-    return render_template(
-        "admin/reportes.html",
-        registros=registros_filtrados,
-        total_empleados=total_empleados,
-        entradas_hoy=entradas_hoy,
-        salidas_hoy=salidas_hoy,
-        busqueda_nombre=busqueda_nombre,
-        fecha_inicio=fecha_inicio,
-        fecha_fin=fecha_fin,
+@admin_bp.route("/reportes/trabajos", methods=["POST"])
+@login_required
+@admin_required
+def crear_trabajo_reporte():
+    """Encola la generación de un reporte grande y devuelve el id del trabajo"""
+    datos = request.get_json(silent=True) or request.form
+    formato = datos.get("formato", "csv")
+    if formato not in FORMATOS:
+        return jsonify({"success": False, "message": "Formato de exportación no válido"}), 400
+
+    try:
+        trabajo = trabajos_reportes.enviar(
+            parsear_filtros(datos), formato, current_user.id_usuario
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 429
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "message": "El reporte se está generando",
+                "trabajo": _trabajo_json(trabajo),
+            }
+        ),
+        202,
     )
 
 
-def generate_pin(primer_nombre):
-    # Función para generar pin
-    nombre_seguro = primer_nombre.strip().upper()
-    while len(nombre_seguro) < 3:
-        nombre_seguro += "X"
-    letras = nombre_seguro[:3]
+@admin_bp.route("/reportes/trabajos/<id_trabajo>", methods=["GET"])
+@login_required
+@admin_required
+def estado_trabajo_reporte(id_trabajo):
+    """Estado de un trabajo de reporte"""
+    trabajo = _trabajo_usuario(id_trabajo)
+    if trabajo is None:
+        return jsonify({"success": False, "message": "Trabajo no encontrado"}), 404
+    return jsonify({"success": True, "trabajo": _trabajo_json(trabajo)})
 
-    numeros = "".join(random.choices(string.digits, k=4))
 
-    pin = letras + numeros
+@admin_bp.route("/reportes/trabajos/<id_trabajo>/cancelar", methods=["POST"])
+@login_required
+@admin_required
+def cancelar_trabajo_reporte(id_trabajo):
+    """Cancela un trabajo de reporte pendiente o en ejecución"""
+    if _trabajo_usuario(id_trabajo) is None:
+        return jsonify({"success": False, "message": "Trabajo no encontrado"}), 404
+
+    trabajo = trabajos_reportes.cancelar(id_trabajo)
+    if trabajo["estado"] in ("terminado", "error"):
+        return jsonify({"success": False, "message": "El reporte ya había terminado"}), 409
+    return jsonify(
+        {"success": True, "message": trabajo["mensaje"], "trabajo": _trabajo_json(trabajo)}
+    )
 
-    # Verificar que el PIN no exista
-    tries = 0
-    max_tries = 10
 
-    while tries < max_tries:
-        try:
-            existing = (
-                Credencial.query.join(TipoCredencial)
-                .filter(TipoCredencial.nombre == "PIN", Credencial.valor == pin)
-                .first()
-            )
-            if not existing:
-                break
-            # Si existe, generar nuevos números
-            numeros = "".join(random.choices(string.digits, k=4))
-            pin = letras + numeros
-            tries += 1
-        except Exception as e:
-            # Manejo de excepciones de base de datos
-            print(f"Error al verificar PIN existente: {str(e)}")
-            break
+@admin_bp.route("/reportes/trabajos/<id_trabajo>/descargar", methods=["GET"])
+@login_required
+@admin_required
+def descargar_trabajo_reporte(id_trabajo):
+    """Descarga el archivo de un trabajo de reporte terminado"""
+    trabajo = _trabajo_usuario(id_trabajo)
+    ruta = trabajos_reportes.ruta_resultado(trabajo) if trabajo else None
+    if ruta is None:
+        flash("El reporte no está disponible", "error")
+        return redirect(url_for("admin.reportes"))
+
+    return send_file(
+        ruta,
+        mimetype=FORMATOS[trabajo["formato"]],
+        as_attachment=True,
+        download_name=trabajo["archivo"],
+    )
+
 
-    return pin
+def _trabajo_usuario(id_trabajo):
+    # Cada usuario solo ve sus propios trabajos
+    trabajo = trabajos_reportes.obtener(id_trabajo)
+    if trabajo is None or trabajo["id_usuario"] != current_user.id_usuario:
+        return None
+    return trabajo
+
+
+def _trabajo_json(trabajo):
+    datos = {clave: valor for clave, valor in trabajo.items() if clave != "id_usuario"}
+    datos["url_estado"] = url_for("admin.estado_trabajo_reporte", id_trabajo=trabajo["id"])
+    datos["url_descarga"] = (
+        url_for("admin.descargar_trabajo_reporte", id_trabajo=trabajo["id"])
+        if trabajo["estado"] == "terminado"
+        else None
+    )
+    return datos
 
 
 @admin_bp.route("/empleados/ver/<int:empleado_id>", methods=["GET"])
@@ -613,7 +652,10 @@ def editar_empleado(empleado_id):
             empleado.cargo_id = cargo_id
             empleado.fecha_contratacion = fecha_contratacion_obj
 
+            # El nombre aparece en los reportes guardados en cache de todos los procesos
+            cache_reportes.invalidar_todo()
             db.session.commit()
+            cache_credenciales.invalidar_persona(persona.id_persona)
 
             flash("Empleado actualizado correctamente", "success")
             return redirect(url_for("admin.lista_empleados"))
@@ -658,6 +700,7 @@ def toggle_credencial_empleado(empleado_id):
         # Cambiar el estado de la credencial
         credencial.activo = not credencial.activo
         db.session.commit()
+        cache_credenciales.invalidar_pin(credencial.valor)
 
         nuevo_estado = "activada" if credencial.activo else "inactivada"
 
@@ -680,3 +723,92 @@ def toggle_credencial_empleado(empleado_id):
             ),
             500,
         )
+
+
+@admin_bp.route("/empleados/credenciales/estado", methods=["POST"])
+@login_required
+@admin_required
+def cambiar_credenciales_empleados():
+    """
+    Activa o desactiva en bloque las credenciales PIN de los empleados
+    indicados por id o por cargo y rango de fecha de contratación
+    """
+    datos = request.get_json(silent=True) or {}
+    activo = datos.get("activo")
+    if not isinstance(activo, bool):
+        return (
+            jsonify({"success": False, "message": "Debe indicar si se activan o desactivan"}),
+            400,
+        )
+
+    empleado_ids = datos.get("empleado_ids")
+    if empleado_ids is not None and (
+        not isinstance(empleado_ids, list)
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in empleado_ids)
+    ):
+        return (
+            jsonify({"success": False, "message": "Los ids de empleado no son válidos"}),
+            400,
+        )
+    cargo_id = datos.get("cargo_id")
+    if cargo_id is not None and (not isinstance(cargo_id, int) or isinstance(cargo_id, bool)):
+        return jsonify({"success": False, "message": "El cargo no es válido"}), 400
+
+    try:
+        fechas = [
+            datetime.strptime(datos[campo], "%Y-%m-%d").date() if datos.get(campo) else None
+            for campo in ("contratado_desde", "contratado_hasta")
+        ]
+    except (TypeError, ValueError):
+        return (
+            jsonify({"success": False, "message": "Formato de fecha inválido (AAAA-MM-DD)"}),
+            400,
+        )
+
+    try:
+        afectadas = cambiar_estado_credenciales(
+            activo,
+            empleado_ids=empleado_ids,
+            cargo_id=cargo_id,
+            contratado_desde=fechas[0],
+            contratado_hasta=fechas[1],
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"Error al actualizar las credenciales: {str(e)}",
+                }
+            ),
+            500,
+        )
+
+    estado = "activadas" if activo else "inactivadas"
+    return jsonify(
+        {
+            "success": True,
+            "message": f"{afectadas} credenciales {estado} exitosamente",
+            "afectadas": afectadas,
+        }
+    )
+
+
+@admin_bp.route("/metricas", methods=["GET"])
+@login_required
+@admin_required
+def metricas():
+    """Métricas internas de la aplicación en formato JSON"""
+    return jsonify(
+        {
+            "cache_credenciales": cache_credenciales.estadisticas(),
+            "limitador_intentos": limitador_intentos.estadisticas(),
+            "cola_registros": cola_registros.estadisticas(),
+            "contadores_panel": contadores_panel.estadisticas(),
+            "cache_reportes": cache_reportes.estadisticas(),
+            "trabajos_reportes": trabajos_reportes.estadisticas(),
+        }
+    )
@@ -1,11 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
-import random
-import string
 from .. import db
 from ..forms.auth import LoginForm, RegistrationForm
-from ..models import Usuario, Persona, Credencial, TipoCredencial
+from ..models import Usuario, Persona
+from ..utils.cache_credenciales import cache_credenciales
+from ..utils.pines import crear_credencial_pin
 
 
 auth_bp = Blueprint("auth", __name__)
@@ -86,26 +86,12 @@ def register():
             # Se envian los datos a la base de datos
             db.session.add(usuario)
 
-            # Generar PIN con formato: 3 primeras letras del nombre + 4 números
-            pin = generate_pin(form.primer_nombre.data)
-
-            # Obtener o crear el tipo de credencial PIN
-            tipo_pin = TipoCredencial.query.filter_by(nombre="PIN").first()
-            if not tipo_pin:
-                tipo_pin = TipoCredencial(nombre="PIN")
-                db.session.add(tipo_pin)
-                db.session.flush()
-
-            # Crear credencial PIN
-            credencial = Credencial(
-                id_persona=persona.id_persona,
-                id_tipo_credencial=tipo_pin.id_tipo_credencial,
-                valor=pin,
-                activo=True,
-            )
-            db.session.add(credencial)
+            # Credencial PIN: 3 primeras letras del nombre + 4 números libres
+            credencial = crear_credencial_pin(persona.id_persona, form.primer_nombre.data)
+            pin = credencial.valor
 
             db.session.commit()
+            cache_credenciales.invalidar_pin(pin)
 
             # Si es una petición AJAX, devolver JSON
             if (
@@ -155,32 +141,6 @@ def register():
     return render_template("auth/form.html", form=form, form_type="register")
 
 
-def generate_pin(primer_nombre):
-    """Genera un PIN con formato: 3 primeras letras del nombre + 4 números aleatorios"""
-    # Tomar las primeras 3 letras del nombre (en mayúsculas)
-    letras = primer_nombre[:3].upper()
-
-    # Generar 4 números aleatorios
-    numeros = "".join(random.choices(string.digits, k=4))
-
-    pin = letras + numeros
-
-    # Verificar que el PIN no exista
-    while True:
-        existing = (
-            Credencial.query.join(TipoCredencial)
-            .filter(TipoCredencial.nombre == "PIN", Credencial.valor == pin)
-            .first()
-        )
-        if not existing:
-            break
-        # Si existe, generar nuevos números
-        numeros = "".join(random.choices(string.digits, k=4))
-        pin = letras + numeros
-
-    return pin
-
-
 @auth_bp.route("/logout")
 @login_required
 def logout():
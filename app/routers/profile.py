@@ -1,4 +1,13 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import (
+    Blueprint,
+    render_template,
+    redirect,
+    url_for,
+    flash,
+    request,
+    jsonify,
+    current_app,
+)
 from flask_login import login_required, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime, timedelta
@@ -9,10 +18,11 @@ from ..models import (
     Credencial,
     TipoCredencial,
     Registro,
-    TipoRegistro,
     Empleado,
     CargoEmpleado,
 )
+from ..utils.cache_credenciales import cache_credenciales
+from ..utils.cache_reportes import cache_reportes
 
 profile_bp = Blueprint("profile", __name__)
 
@@ -84,7 +94,10 @@ def update_personal_data():
         persona.correo = data.get("correo", persona.correo)
         persona.celular = data.get("celular", persona.celular)
 
+        # El nombre aparece en los reportes guardados en cache de todos los procesos
+        cache_reportes.invalidar_todo()
         db.session.commit()
+        cache_credenciales.invalidar_persona(persona.id_persona)
 
         return jsonify({"success": True, "message": "Datos actualizados correctamente"})
 
@@ -208,9 +221,10 @@ def get_history():
         week_start = first_monday + timedelta(weeks=week - 1)
         week_end = week_start + timedelta(days=6, hours=23, minutes=59, seconds=59)
 
-        # Obtener el PIN del usuario actual
-        pin_credencial = (
-            Credencial.query.join(TipoCredencial)
+        # El historial semanal es para quien marca con PIN
+        tiene_pin = (
+            db.session.query(Credencial.id_credencial)
+            .join(TipoCredencial)
             .filter(
                 Credencial.id_persona == current_user.id_persona,
                 TipoCredencial.nombre == "PIN",
@@ -219,7 +233,7 @@ def get_history():
             .first()
         )
 
-        if not pin_credencial:
+        if not tiene_pin:
             return (
                 jsonify(
                     {
@@ -230,17 +244,17 @@ def get_history():
                 400,
             )
 
-        # Buscar registros por el PIN del usuario (no por id_persona)
-        # Esto permite que el usuario vea los registros hechos con su PIN
+        # Registros de la persona por el índice (id_persona, fecha_hora) con
+        # el tipo de registro cargado en la misma consulta; incluye los
+        # hechos con PIN anteriores de la persona
         registros = (
-            Registro.query.join(TipoRegistro)
-            .join(Credencial)
+            Registro.query.options(db.joinedload(Registro.tipo_registro, innerjoin=True))
             .filter(
-                Credencial.valor == pin_credencial.valor,
+                Registro.id_persona == current_user.id_persona,
                 Registro.fecha_hora >= week_start,
                 Registro.fecha_hora <= week_end,
             )
-            .order_by(Registro.fecha_hora)
+            .order_by(Registro.fecha_hora, Registro.registro_id)
             .all()
         )
 
@@ -273,3 +287,87 @@ def get_history():
             ),
             500,
         )
+
+
+@profile_bp.route("/profile/history/registros", methods=["GET"])
+@login_required
+def get_history_page():
+    """
+    Historial de registros en un rango de fechas arbitrario, paginado por
+    cursor (fecha_hora, registro_id) del último registro de la página anterior.
+    """
+    if current_user.id_rol == 1:
+        return jsonify({"success": False, "message": "Acceso denegado"}), 403
+
+    try:
+        desde = _parsear_dia(request.args.get("desde"))
+        hasta = _parsear_dia(request.args.get("hasta"))
+        if desde and hasta and desde > hasta:
+            desde, hasta = hasta, desde
+        cursor = _parsear_cursor(request.args.get("cursor_fecha_hora"), request.args.get("cursor_id"))
+    except ValueError:
+        return jsonify({"success": False, "message": "Parámetros de historial inválidos"}), 400
+
+    descendente = request.args.get("orden", "desc") != "asc"
+    limite = request.args.get("limite", 50, type=int)
+    limite = max(1, min(limite, current_app.config.get("HISTORIAL_PAGINA_MAX", 200)))
+
+    consulta = Registro.query.options(
+        db.joinedload(Registro.tipo_registro, innerjoin=True)
+    ).filter(Registro.id_persona == current_user.id_persona)
+    if desde:
+        consulta = consulta.filter(Registro.fecha_hora >= datetime.combine(desde, datetime.min.time()))
+    if hasta:
+        consulta = consulta.filter(
+            Registro.fecha_hora < datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+        )
+
+    clave = db.tuple_(Registro.fecha_hora, Registro.registro_id)
+    if cursor:
+        consulta = consulta.filter(clave < cursor if descendente else clave > cursor)
+    if descendente:
+        consulta = consulta.order_by(Registro.fecha_hora.desc(), Registro.registro_id.desc())
+    else:
+        consulta = consulta.order_by(Registro.fecha_hora, Registro.registro_id)
+
+    # Un registro adicional indica si hay una página siguiente
+    registros = consulta.limit(limite + 1).all()
+    hay_mas = len(registros) > limite
+    registros = registros[:limite]
+
+    siguiente = None
+    if hay_mas:
+        ultimo = registros[-1]
+        siguiente = {
+            "fecha_hora": ultimo.fecha_hora.isoformat(),
+            "registro_id": ultimo.registro_id,
+        }
+
+    return jsonify(
+        {
+            "success": True,
+            "registros": [
+                {
+                    "registro_id": registro.registro_id,
+                    "fecha_hora": registro.fecha_hora.isoformat(),
+                    "tipo_registro": registro.tipo_registro.descripcion,
+                    "observacion": registro.observacion,
+                }
+                for registro in registros
+            ],
+            "siguiente_cursor": siguiente,
+        }
+    )
+
+
+def _parsear_dia(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").date() if valor else None
+
+
+def _parsear_cursor(fecha_hora, registro_id):
+    # El cursor llega como dos parámetros; ambos son obligatorios si se envía uno
+    if not fecha_hora and not registro_id:
+        return None
+    if not fecha_hora or not registro_id:
+        raise ValueError("Cursor incompleto")
+    return datetime.fromisoformat(fecha_hora), int(registro_id)
@@ -10,11 +10,8 @@ from flask import (
 )
 from datetime import datetime
 from app import db
-from app.models.credencial import Credencial
-from app.models.tipo_credencial import TipoCredencial
-from app.models.registro import Registro
-from app.models.tipo_registro import TipoRegistro
-from app.models.persona import Persona
+from app.utils.asistencia import registrar_marcacion, procesar_lote, MENSAJE_LIMITE
+from app.utils.limitador import limitador_intentos
 
 registro_bp = Blueprint("registro", __name__, url_prefix="/registro")
 
@@ -25,126 +22,10 @@ def index():
     Maneja la página principal de registro de ingreso/salida
     """
     if request.method == "POST":
-        pin = request.form.get("pin")
-        accion = request.form.get("accion")
-
-        if not pin:
-            flash("Por favor ingrese un PIN válido", "error")
-            return redirect(url_for("registro.index"))
-
-        # Buscar la credencial asociada con el PIN
-        credencial = (
-            db.session.query(Credencial)
-            .join(TipoCredencial, Credencial.id_tipo_credencial == TipoCredencial.id_tipo_credencial)
-            .filter(
-                Credencial.valor == pin,
-                Credencial.activo == True,
-                TipoCredencial.nombre == "PIN"
-            )
-            .first()
+        resultado = registrar_marcacion(
+            request.form.get("pin"), request.form.get("accion"), request.remote_addr
         )
-
-        if not credencial:
-            flash("Credencial no reconocida o inactiva", "error")
-            return redirect(url_for("registro.index"))
-
-        # Obtener la persona asociada con la credencial
-        persona = Persona.query.get(credencial.id_persona)
-
-        if not persona:
-            flash(
-                "No se encontró información de la persona asociada a esta credencial",
-                "error",
-            )
-            return redirect(url_for("registro.index"))
-
-        # Determinar el tipo de registro (ingreso o salida)
-        tipo_registro_id = 1 if accion == "ingreso" else 2
-
-        # Si es un ingreso, verificar si ya existe un ingreso sin salida
-        if accion == "ingreso":
-            # Buscar el último ingreso de la persona
-            ultimo_ingreso = (
-                Registro.query.filter_by(
-                    id_persona=persona.id_persona, id_tipo_registro=1  # Tipo ingreso
-                )
-                .order_by(Registro.fecha_hora.desc())
-                .first()
-            )
-
-            if ultimo_ingreso:
-                # Buscar si hay una salida después de ese ingreso
-                salida_posterior = Registro.query.filter(
-                    Registro.id_persona == persona.id_persona,
-                    Registro.id_tipo_registro == 2,
-                    Registro.fecha_hora > ultimo_ingreso.fecha_hora,
-                ).first()
-
-                # Si no hay salida posterior al último ingreso, no permitir un nuevo ingreso
-                if not salida_posterior:
-                    flash(
-                        f'Ya tiene un registro de ingreso activo desde {ultimo_ingreso.fecha_hora.strftime("%d-%m-%Y %H:%M:%S")}. '
-                        f"Debe registrar una salida antes de poder registrar un nuevo ingreso.",
-                        "warning",
-                    )
-                    return redirect(url_for("registro.index"))
-
-        # Verificar si ya hay un registro de ingreso sin salida correspondiente
-        if accion == "salida":
-            ultimo_registro = (
-                Registro.query.filter_by(
-                    id_persona=persona.id_persona, id_tipo_registro=1
-                )
-                .order_by(Registro.fecha_hora.desc())
-                .first()
-            )
-
-            if not ultimo_registro:
-                flash(
-                    "No se encontró un registro de ingreso para esta persona", "warning"
-                )
-                return redirect(url_for("registro.index"))
-
-            # Verificamos si ya tiene un registro de salida después del último ingreso
-            ultimo_salida = (
-                Registro.query.filter_by(
-                    id_persona=persona.id_persona, id_tipo_registro=2
-                )
-                .order_by(Registro.fecha_hora.desc())
-                .first()
-            )
-
-            if ultimo_salida and ultimo_salida.fecha_hora > ultimo_registro.fecha_hora:
-                flash(
-                    "Ya tiene un registro de salida después de su último ingreso",
-                    "warning",
-                )
-                return redirect(url_for("registro.index"))
-
-        # Crear el nuevo registro
-        nuevo_registro = Registro(
-            id_persona=persona.id_persona,
-            id_credencial=credencial.id_credencial,
-            id_tipo_registro=tipo_registro_id,
-            fecha_hora=datetime.now(),
-            observacion=f"Registro de {'ingreso' if accion == 'ingreso' else 'salida'} automático",
-        )
-
-        try:
-            db.session.add(nuevo_registro)
-            db.session.commit()
-
-            mensaje = f"Registro de {'ingreso' if accion == 'ingreso' else 'salida'} exitoso para {persona.primer_nombre} {persona.primer_apellido}"
-            flash(mensaje, "success")
-
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"Error al guardar registro: {str(e)}")
-            flash(
-                "Error al procesar el registro. Por favor, inténtelo nuevamente.",
-                "error",
-            )
-
+        flash(resultado["mensaje"], resultado["categoria"])
         return redirect(url_for("registro.index"))
 
     # Formatear fecha en español
@@ -166,3 +47,96 @@ def index():
     fecha_actual = f"{now.day}-{meses_es[now.month]}-{now.year}"
 
     return render_template("registro/registro.html", fecha_actual=fecha_actual)
+
+
+@registro_bp.route("/marcar", methods=["POST"])
+def marcar():
+    """
+    Registra un ingreso/salida y responde en JSON para que el quiosco
+    actualice la página sin redirección ni recarga
+    """
+    data = request.get_json(silent=True) or request.form
+    resultado = registrar_marcacion(
+        data.get("pin"), data.get("accion"), request.remote_addr
+    )
+
+    codigos = {
+        "registrado": 200,
+        "invalido": 400,
+        "rechazado": 409,
+        "limitado": 429,
+        "error": 500,
+    }
+    return (
+        jsonify(
+            {
+                "success": resultado["estado"] == "registrado",
+                "message": resultado["mensaje"],
+                "categoria": resultado["categoria"],
+                "nombre": resultado["nombre"],
+                "fecha_hora": resultado["fecha_hora"].isoformat(),
+            }
+        ),
+        codigos[resultado["estado"]],
+    )
+
+
+@registro_bp.route("/lote", methods=["POST"])
+def registrar_lote():
+    """
+    Recibe marcaciones encoladas por quioscos sin conexión y las registra en bloque
+    """
+    data = request.get_json(silent=True)
+    items = data.get("registros") if isinstance(data, dict) else data
+
+    if not isinstance(items, list) or not items:
+        return (
+            jsonify({"success": False, "message": "Se requiere una lista de registros"}),
+            400,
+        )
+
+    max_items = current_app.config["REGISTRO_LOTE_MAX"]
+    if len(items) > max_items:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"El lote no puede tener más de {max_items} registros",
+                }
+            ),
+            413,
+        )
+
+    # Rechazar barridos de PIN antes de consultar la base de datos
+    if not limitador_intentos.permitir(request.remote_addr):
+        return jsonify({"success": False, "message": MENSAJE_LIMITE}), 429
+
+    try:
+        resultados = procesar_lote(items, request.remote_addr)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error al guardar lote de registros: {str(e)}")
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "Error al procesar el lote. Por favor, inténtelo nuevamente.",
+                }
+            ),
+            500,
+        )
+
+    resumen = {"registrado": 0, "duplicado": 0, "rechazado": 0, "limitado": 0}
+    for resultado in resultados:
+        resumen[resultado["estado"]] += 1
+
+    return jsonify(
+        {
+            "success": True,
+            "registrados": resumen["registrado"],
+            "duplicados": resumen["duplicado"],
+            "rechazados": resumen["rechazado"],
+            "limitados": resumen["limitado"],
+            "resultados": resultados,
+        }
+    )
@@ -1,3 +1,6 @@
+// Ids de los empleados seleccionados; se conservan al cambiar de página
+const seleccionados = new Set();
+
 function navegarA(url) {
     window.location.href = url;
 }
@@ -34,10 +37,24 @@ document.addEventListener('DOMContentLoaded', function() {
                         next: "Siguiente",
                         previous: "Anterior"
                     },
-                    zeroRecords: "No se encontraron registros coincidentes"
+                    zeroRecords: "No se encontraron registros coincidentes",
+                    emptyTable: "No hay empleados registrados",
+                    processing: "Cargando empleados..."
                 },
                 responsive: true,
-                lengthMenu: [[5, 10, 25, 50, -1], [5, 10, 25, 50, "Todos"]],
+                // Búsqueda, orden y paginación se resuelven en el servidor
+                processing: true,
+                serverSide: true,
+                searchDelay: 400,
+                ajax: empleadosTable.dataset.url,
+                columns: [
+                    { data: 'nombre', className: 'name-cell', render: celdaTextoConTitulo },
+                    { data: 'documento', render: celdaTextoConTitulo },
+                    { data: 'cargo', render: celdaTextoConTitulo },
+                    { data: 'fecha_contratacion', render: celdaTextoConTitulo },
+                    { data: null, className: 'actions-cell text-center', render: celdaAcciones }
+                ],
+                lengthMenu: [[5, 10, 25, 50, 100], [5, 10, 25, 50, 100]],
                 pageLength: 10,
                 order: [[0, 'asc']],
                 columnDefs: [
@@ -45,71 +62,165 @@ document.addEventListener('DOMContentLoaded', function() {
                 ]
             });
         }
-        
-        document.querySelectorAll('.btn-ver').forEach(btn => {
-            btn.addEventListener('click', function() {
-                const empleadoId = this.getAttribute('data-id');
+
+        // Las filas se redibujan en cada página: los eventos se delegan desde la tabla
+        empleadosTable.addEventListener('click', function(event) {
+            const btn = event.target.closest('button[data-id]');
+            if (!btn) {
+                return;
+            }
+            const empleadoId = btn.getAttribute('data-id');
+            if (btn.classList.contains('btn-ver')) {
                 window.location.href = `/admin/empleados/ver/${empleadoId}`;
-            });
+            } else if (btn.classList.contains('btn-editar')) {
+                window.location.href = `/admin/empleados/editar/${empleadoId}`;
+            } else if (btn.classList.contains('btn-toggle-credencial')) {
+                cambiarCredencial(btn);
+            }
+        });
+
+        empleadosTable.addEventListener('change', function(event) {
+            const selector = event.target.closest('.selector-empleado');
+            if (!selector) {
+                return;
+            }
+            if (selector.checked) {
+                seleccionados.add(selector.dataset.id);
+            } else {
+                seleccionados.delete(selector.dataset.id);
+            }
+            actualizarSeleccion();
         });
 
-        document.querySelectorAll('.btn-editar').forEach(btn => {
+        document.querySelectorAll('#accionesMasivas .btn-masivo').forEach(function(btn) {
             btn.addEventListener('click', function() {
-                const empleadoId = this.getAttribute('data-id');
-                window.location.href = `/admin/empleados/editar/${empleadoId}`;
+                cambiarCredencialesSeleccionadas(btn.dataset.activo === 'true');
             });
         });
-        
-        document.querySelectorAll('.btn-toggle-credencial').forEach(btn => {
-            btn.addEventListener('click', function() {
-                const empleadoId = this.getAttribute('data-id');
-                const row = this.closest('tr');
-                const nombre = row.querySelector('.name-cell').textContent.trim();
-                const esActiva = this.classList.contains('activa');
-                const accion = esActiva ? 'desactivar' : 'activar';
-                
-                if (confirm(`¿Está seguro que desea ${accion} la credencial de ${nombre}?`)) {
-                    // Hacer la solicitud AJAX para cambiar el estado de la credencial
-                    fetch(`/admin/empleados/credencial/${empleadoId}/toggle`, {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                            'X-Requested-With': 'XMLHttpRequest'
-                        }
-                    })
-                    .then(response => {
-                        if (!response.ok) {
-                            throw new Error('Error al cambiar el estado de la credencial');
-                        }
-                        return response.json();
-                    })
-                    .then(data => {
-                        if (data.success) {
-                            // Actualizar el botón según el nuevo estado
-                            if (data.activo) {
-                                this.classList.remove('inactiva');
-                                this.classList.add('activa');
-                                this.setAttribute('title', 'Desactivar credencial');
-                                this.querySelector('span').textContent = 'badge';
-                            } else {
-                                this.classList.remove('activa');
-                                this.classList.add('inactiva');
-                                this.setAttribute('title', 'Activar credencial');
-                                this.querySelector('span').textContent = 'no_accounts';
-                            }
-                            
-                            // Mostrar mensaje de éxito
-                            alert(data.message);
-                        } else {
-                            alert('Error: ' + data.message);
-                        }
-                    })
-                    .catch(error => {
-                        console.error('Error:', error);
-                        alert('No se pudo cambiar el estado de la credencial');
-                    });
+    }
+});
+
+function celdaAcciones(empleado, tipo) {
+    if (tipo !== 'display') {
+        return '';
+    }
+    let credencial = `
+        <button type="button" class="btn btn-action btn-no-credencial" title="Sin credencial" disabled>
+            <span class="material-symbols-outlined">not_interested</span>
+        </button>`;
+    if (empleado.tiene_credencial) {
+        const activa = empleado.credencial_activa;
+        credencial = `
+        <button type="button" class="btn btn-action btn-toggle-credencial ${activa ? 'activa' : 'inactiva'}"
+            data-id="${empleado.empleado_id}" title="${activa ? 'Desactivar credencial' : 'Activar credencial'}">
+            <span class="material-symbols-outlined">${activa ? 'badge' : 'no_accounts'}</span>
+        </button>`;
+    }
+    const seleccionado = seleccionados.has(String(empleado.empleado_id)) ? 'checked' : '';
+    return `
+        <div class="action-buttons">
+            <input type="checkbox" class="selector-empleado" data-id="${empleado.empleado_id}"
+                title="Seleccionar" ${seleccionado}>
+            <button type="button" class="btn btn-action btn-ver" data-id="${empleado.empleado_id}" title="Ver detalles">
+                <span class="material-symbols-outlined">visibility</span>
+            </button>
+            <button type="button" class="btn btn-action btn-editar" data-id="${empleado.empleado_id}" title="Editar">
+                <span class="material-symbols-outlined">edit</span>
+            </button>
+            ${credencial}
+        </div>`;
+}
+
+function cambiarCredencial(btn) {
+    const empleadoId = btn.getAttribute('data-id');
+    const row = btn.closest('tr');
+    const nombre = row.querySelector('.name-cell').textContent.trim();
+    const esActiva = btn.classList.contains('activa');
+    const accion = esActiva ? 'desactivar' : 'activar';
+
+    if (confirm(`¿Está seguro que desea ${accion} la credencial de ${nombre}?`)) {
+        // Hacer la solicitud AJAX para cambiar el estado de la credencial
+        fetch(`/admin/empleados/credencial/${empleadoId}/toggle`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Error al cambiar el estado de la credencial');
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (data.success) {
+                // Actualizar el botón según el nuevo estado
+                if (data.activo) {
+                    btn.classList.remove('inactiva');
+                    btn.classList.add('activa');
+                    btn.setAttribute('title', 'Desactivar credencial');
+                    btn.querySelector('span').textContent = 'badge';
+                } else {
+                    btn.classList.remove('activa');
+                    btn.classList.add('inactiva');
+                    btn.setAttribute('title', 'Activar credencial');
+                    btn.querySelector('span').textContent = 'no_accounts';
                 }
-            });
+
+                // Mostrar mensaje de éxito
+                alert(data.message);
+            } else {
+                alert('Error: ' + data.message);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('No se pudo cambiar el estado de la credencial');
         });
     }
-});
\ No newline at end of file
+}
+
+function actualizarSeleccion() {
+    const cantidad = seleccionados.size;
+    document.getElementById('seleccionadosTexto').textContent =
+        `${cantidad} ${cantidad === 1 ? 'empleado seleccionado' : 'empleados seleccionados'}`;
+    document.querySelectorAll('#accionesMasivas .btn-masivo').forEach(function(btn) {
+        btn.disabled = cantidad === 0;
+    });
+}
+
+// Activa o desactiva en una sola petición las credenciales de los seleccionados
+function cambiarCredencialesSeleccionadas(activo) {
+    const accion = activo ? 'activar' : 'desactivar';
+    if (!confirm(`¿Está seguro que desea ${accion} las credenciales de ${seleccionados.size} empleados?`)) {
+        return;
+    }
+
+    fetch(document.getElementById('empleadosTable').dataset.urlCredenciales, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: JSON.stringify({
+            activo: activo,
+            empleado_ids: Array.from(seleccionados, Number)
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            seleccionados.clear();
+            actualizarSeleccion();
+            $('#empleadosTable').DataTable().ajax.reload(null, false);
+            alert(data.message);
+        } else {
+            alert('Error: ' + data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('No se pudieron actualizar las credenciales');
+    });
+}
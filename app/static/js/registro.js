@@ -31,7 +31,7 @@
     }
 
     const messageEl = document.createElement("div");
-    messageEl.className = `flash-message ${type}`;
+    messageEl.className = `alert alert-${type}`;
     messageEl.textContent = message;
     flashContainer.appendChild(messageEl);
 
@@ -43,15 +43,51 @@
     }, 5000);
   }
 
-    // Manejar la validación del formulario
+    // Manejar la validación del formulario y el envío sin recargar la página
     if (pinEl) {
       const form = document.querySelector("form");
       if (form) {
+        let enviando = false;
+
         form.addEventListener("submit", function(e) {
           if (!pinEl.value) {
             e.preventDefault();
             showFlashMessage("Por favor ingrese su PIN", "error");
+            return;
           }
+
+          const apiUrl = form.dataset.apiUrl;
+          if (!apiUrl || !window.fetch) return;
+
+          e.preventDefault();
+          if (enviando) return;
+          enviando = true;
+
+          const boton = e.submitter;
+          const accion = boton && boton.value ? boton.value : "ingreso";
+          const botones = form.querySelectorAll("button[type='submit']");
+          botones.forEach((b) => (b.disabled = true));
+
+          fetch(apiUrl, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ pin: pinEl.value, accion: accion }),
+          })
+            .then((response) => response.json())
+            .then((data) => {
+              showFlashMessage(data.message, data.categoria || (data.success ? "success" : "error"));
+              if (data.success) {
+                pinEl.value = "";
+              }
+            })
+            .catch(() => {
+              showFlashMessage("Error al procesar el registro. Por favor, inténtelo nuevamente.", "error");
+            })
+            .finally(() => {
+              enviando = false;
+              botones.forEach((b) => (b.disabled = false));
+              pinEl.focus();
+            });
         });
       }
     }
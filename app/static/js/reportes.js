@@ -12,6 +12,20 @@ document.addEventListener("DOMContentLoaded", function () {
   const registrosTable = document.getElementById("registrosTable");
   if (registrosTable) {
     if (!$.fn.dataTable.isDataTable("#registrosTable")) {
+      // Los filtros aplicados son los de la URL, no los valores por defecto del formulario
+      const filtros = new URLSearchParams(window.location.search);
+      const fechaInicioFiltro = filtros.get("fecha_inicio") || "";
+      const fechaFinFiltro = filtros.get("fecha_fin") || "";
+
+      let mensajeVacio = "No hay registros para mostrar";
+      if (fechaInicioFiltro && fechaFinFiltro) {
+        mensajeVacio = `No se encontraron registros para el rango de fechas seleccionado (del ${fechaInicioFiltro} al ${fechaFinFiltro})`;
+      } else if (fechaInicioFiltro) {
+        mensajeVacio = `No se encontraron registros desde el ${fechaInicioFiltro}`;
+      } else if (fechaFinFiltro) {
+        mensajeVacio = `No se encontraron registros hasta el ${fechaFinFiltro}`;
+      }
+
       $("#registrosTable").DataTable({
         language: {
           url: "//cdn.datatables.net/plug-ins/1.13.6/i18n/es-ES.json",
@@ -27,11 +41,31 @@ document.addEventListener("DOMContentLoaded", function () {
             previous: "Anterior",
           },
           zeroRecords: "No se encontraron registros coincidentes",
+          emptyTable: mensajeVacio,
+          processing: "Cargando registros...",
         },
         responsive: true,
+        // Paginación, búsqueda y orden se resuelven en el servidor
+        processing: true,
+        serverSide: true,
+        searchDelay: 400,
+        ajax: {
+          url: registrosTable.dataset.url,
+          data: function (d) {
+            d.busqueda_nombre = filtros.get("busqueda_nombre") || "";
+            d.fecha_inicio = fechaInicioFiltro;
+            d.fecha_fin = fechaFinFiltro;
+          },
+        },
+        columns: [
+          { data: "empleado", className: "name-cell", render: celdaTexto },
+          { data: "fecha", render: celdaTexto },
+          { data: "hora_entrada", render: celdaTexto },
+          { data: "hora_salida", render: celdaTexto },
+        ],
         lengthMenu: [
-          [10, 25, 50, 100, -1],
-          [10, 25, 50, 100, "Todos"],
+          [10, 25, 50, 100],
+          [10, 25, 50, 100],
         ],
         pageLength: 25,
         order: [[1, "desc"]], // Ordenar por fecha descendente por defecto
@@ -42,6 +76,102 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   }
 
+  // Reporte en segundo plano: enviar el trabajo, consultar su estado y descargar al terminar
+  const generarReporte = document.getElementById("generarReporte");
+  const estadoReporte = document.getElementById("estadoReporte");
+  if (generarReporte && estadoReporte) {
+    const filtros = new URLSearchParams(window.location.search);
+    let consultaEstado = null;
+
+    function mostrarEstado(texto, trabajo) {
+      estadoReporte.textContent = texto;
+      if (trabajo && (trabajo.estado === "pendiente" || trabajo.estado === "ejecutando")) {
+        const cancelar = document.createElement("button");
+        cancelar.type = "button";
+        cancelar.className = "btn-secondary";
+        cancelar.textContent = "Cancelar";
+        cancelar.addEventListener("click", function () {
+          fetch(`${generarReporte.dataset.url}/${trabajo.id}/cancelar`, {
+            method: "POST",
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+          })
+            .then((response) => response.json())
+            .then((data) => {
+              if (!data.success) {
+                alert("Error: " + data.message);
+              }
+            });
+        });
+        estadoReporte.appendChild(cancelar);
+      }
+    }
+
+    function consultarTrabajo(trabajo) {
+      fetch(trabajo.url_estado, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+        .then((response) => response.json())
+        .then((data) => {
+          if (!data.success) {
+            throw new Error(data.message);
+          }
+          const actual = data.trabajo;
+          if (actual.estado === "terminado") {
+            clearInterval(consultaEstado);
+            generarReporte.disabled = false;
+            mostrarEstado("Reporte listo, descargando...");
+            window.location.href = actual.url_descarga;
+          } else if (actual.estado === "error" || actual.estado === "cancelado") {
+            clearInterval(consultaEstado);
+            generarReporte.disabled = false;
+            mostrarEstado(actual.mensaje);
+          } else {
+            const kb = Math.round(actual.bytes / 1024);
+            mostrarEstado(
+              actual.estado === "pendiente" ? "En cola..." : `Generando (${kb} KB)...`,
+              actual
+            );
+          }
+        })
+        .catch((error) => {
+          clearInterval(consultaEstado);
+          generarReporte.disabled = false;
+          mostrarEstado("No se pudo consultar el estado del reporte");
+          console.error("Error:", error);
+        });
+    }
+
+    generarReporte.addEventListener("click", function () {
+      generarReporte.disabled = true;
+      fetch(generarReporte.dataset.url, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "X-Requested-With": "XMLHttpRequest",
+        },
+        body: JSON.stringify({
+          formato: generarReporte.dataset.formato,
+          busqueda_nombre: filtros.get("busqueda_nombre") || "",
+          fecha_inicio: filtros.get("fecha_inicio") || "",
+          fecha_fin: filtros.get("fecha_fin") || "",
+        }),
+      })
+        .then((response) => response.json())
+        .then((data) => {
+          if (!data.success) {
+            generarReporte.disabled = false;
+            alert("Error: " + data.message);
+            return;
+          }
+          mostrarEstado("En cola...", data.trabajo);
+          consultaEstado = setInterval(() => consultarTrabajo(data.trabajo), 2000);
+        })
+        .catch((error) => {
+          generarReporte.disabled = false;
+          console.error("Error:", error);
+          alert("No se pudo iniciar el reporte");
+        });
+    });
+  }
+
   // Validación de fechas en el formulario de filtros
   const fechaInicio = document.getElementById("fecha_inicio");
   const fechaFin = document.getElementById("fecha_fin");
@@ -0,0 +1,25 @@
+// Funciones compartidas por las tablas de DataTables del panel de administración
+
+// Escapa el texto recibido del servidor antes de insertarlo en la tabla
+function escaparHtml(texto) {
+    const div = document.createElement('div');
+    div.textContent = texto == null ? '' : texto;
+    return div.innerHTML;
+}
+
+// Celda de texto escapada (para render de DataTables)
+function celdaTexto(valor, tipo) {
+    if (tipo !== 'display') {
+        return valor;
+    }
+    return escaparHtml(valor);
+}
+
+// Celda de texto escapada que muestra el valor completo al pasar el cursor
+function celdaTextoConTitulo(valor, tipo) {
+    if (tipo !== 'display') {
+        return valor;
+    }
+    const texto = escaparHtml(valor);
+    return `<span title="${texto}">${texto}</span>`;
+}
@@ -0,0 +1,273 @@
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models.persona import Persona
+from app.models.registro import Registro
+
+# Columnas de los archivos; se guarda una copia del nombre para que el
+# archivo sea legible aunque la persona se elimine después
+COLUMNAS = [
+    "registro_id",
+    "id_persona",
+    "id_credencial",
+    "id_tipo_registro",
+    "fecha_hora",
+    "observacion",
+    "primer_nombre",
+    "segundo_nombre",
+    "primer_apellido",
+    "segundo_apellido",
+]
+
+MANIFIESTO = "manifiesto.json"
+
+# Filas leídas por viaje y filas borradas por transacción
+LOTE_ARCHIVO = 5000
+
+
+def directorio_archivo():
+    return current_app.config.get("ARCHIVO_REGISTROS_DIR") or os.path.join(
+        current_app.instance_path, "archivo_registros"
+    )
+
+
+def leer_manifiesto():
+    """
+    Devuelve el manifiesto del archivo: la fecha hasta la que se archivó
+    (exclusiva) y la lista de archivos con su rango de fechas y filas.
+    """
+    ruta = os.path.join(directorio_archivo(), MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {"archivado_hasta": None, "archivos": []}
+
+    with open(ruta, encoding="utf-8") as archivo:
+        manifiesto = json.load(archivo)
+    if manifiesto.get("archivado_hasta"):
+        manifiesto["archivado_hasta"] = date.fromisoformat(manifiesto["archivado_hasta"])
+    for entrada in manifiesto["archivos"]:
+        entrada["desde"] = date.fromisoformat(entrada["desde"])
+        entrada["hasta"] = date.fromisoformat(entrada["hasta"])
+    return manifiesto
+
+
+def archivado_hasta():
+    """Primer día que sigue en la tabla registro (None si no hay archivo)"""
+    return leer_manifiesto()["archivado_hasta"]
+
+
+def archivar_registros(fecha_corte, lote=LOTE_ARCHIVO):
+    """
+    Mueve los registros anteriores a `fecha_corte` (días completos) a
+    archivos CSV comprimidos con gzip, uno por mes y ejecución, y luego los
+    borra de la tabla registro por lotes. Cada archivo se escribe y se anota
+    en el manifiesto, y archivado_hasta avanza hasta el fin de su mes, antes
+    de borrar sus filas; si el proceso se interrumpe,
+    la siguiente ejecución vuelve a archivar lo que quedó y la lectura
+    descarta los registro_id repetidos. Solo se borran los registro_id que
+    quedaron en el archivo: una marcación con id menor que id_maximo que se
+    confirma durante la escritura (por ejemplo un lote sincronizado con
+    fechas pasadas) sigue en la tabla y se archiva en la siguiente ejecución.
+    Devuelve (archivos, filas).
+    """
+    minimo = db.session.query(db.func.min(Registro.fecha_hora)).scalar()
+    corte = datetime.combine(fecha_corte, datetime.min.time())
+    if minimo is None or minimo >= corte:
+        _guardar_archivado_hasta(fecha_corte)
+        return 0, 0
+
+    archivos = 0
+    filas = 0
+    mes = minimo.date().replace(day=1)
+    while datetime.combine(mes, datetime.min.time()) < corte:
+        siguiente = _mes_siguiente(mes)
+        desde = datetime.combine(mes, datetime.min.time())
+        hasta = min(datetime.combine(siguiente, datetime.min.time()), corte)
+
+        id_maximo = (
+            db.session.query(db.func.max(Registro.registro_id))
+            .filter(Registro.fecha_hora >= desde, Registro.fecha_hora < hasta)
+            .scalar()
+        )
+        if id_maximo is not None:
+            ruta, escritas = _escribir_mes(mes, desde, hasta, id_maximo)
+            # Los reportes deben leer el mes del archivo antes de que falten sus filas
+            _guardar_archivado_hasta(hasta.date())
+            _borrar_archivados(ruta, lote)
+            archivos += 1
+            filas += escritas
+        mes = siguiente
+
+    _guardar_archivado_hasta(fecha_corte)
+    return archivos, filas
+
+
+def leer_archivados(fecha_inicio=None, fecha_fin=None):
+    """
+    Recorre los registros archivados entre dos fechas (inclusive), leyendo
+    solo los archivos cuyo rango se cruza con el pedido. Devuelve
+    diccionarios con las columnas del archivo y sin registro_id repetidos.
+    """
+    directorio = directorio_archivo()
+    vistos = set()
+    for entrada in leer_manifiesto()["archivos"]:
+        if fecha_inicio and entrada["hasta"] < fecha_inicio:
+            continue
+        if fecha_fin and entrada["desde"] > fecha_fin:
+            continue
+
+        with gzip.open(
+            os.path.join(directorio, entrada["archivo"]), "rt", encoding="utf-8", newline=""
+        ) as archivo:
+            for fila in csv.DictReader(archivo):
+                fila = _convertir(fila)
+                fecha = fila["fecha_hora"].date()
+                if fecha_inicio and fecha < fecha_inicio:
+                    continue
+                if fecha_fin and fecha > fecha_fin:
+                    continue
+                if fila["registro_id"] in vistos:
+                    continue
+                vistos.add(fila["registro_id"])
+                yield fila
+
+
+def _escribir_mes(mes, desde, hasta, id_maximo):
+    # Escribe el archivo del mes en un temporal y lo anota en el manifiesto al terminar
+    directorio = directorio_archivo()
+    marca = datetime.now().strftime("%Y%m%d%H%M%S")
+    relativo = os.path.join(
+        f"{mes.year:04d}", f"registro_{mes.year:04d}_{mes.month:02d}_{marca}.csv.gz"
+    )
+    ruta = os.path.join(directorio, relativo)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    consulta = (
+        db.session.query(
+            Registro.registro_id,
+            Registro.id_persona,
+            Registro.id_credencial,
+            Registro.id_tipo_registro,
+            Registro.fecha_hora,
+            Registro.observacion,
+            Persona.primer_nombre,
+            Persona.segundo_nombre,
+            Persona.primer_apellido,
+            Persona.segundo_apellido,
+        )
+        .join(Persona, Persona.id_persona == Registro.id_persona)
+        .filter(
+            Registro.fecha_hora >= desde,
+            Registro.fecha_hora < hasta,
+            Registro.registro_id <= id_maximo,
+        )
+        .order_by(Registro.fecha_hora, Registro.registro_id)
+        .yield_per(LOTE_ARCHIVO)
+    )
+
+    escritas = 0
+    with open(f"{ruta}.tmp", "wb") as binario:
+        with gzip.GzipFile(fileobj=binario, mode="wb") as comprimido:
+            texto = io.TextIOWrapper(comprimido, encoding="utf-8", newline="")
+            escritor = csv.writer(texto)
+            escritor.writerow(COLUMNAS)
+            for fila in consulta:
+                escritor.writerow(
+                    [
+                        fila.registro_id,
+                        fila.id_persona,
+                        fila.id_credencial,
+                        fila.id_tipo_registro,
+                        fila.fecha_hora.isoformat(),
+                        fila.observacion or "",
+                        fila.primer_nombre,
+                        fila.segundo_nombre or "",
+                        fila.primer_apellido,
+                        fila.segundo_apellido or "",
+                    ]
+                )
+                escritas += 1
+            texto.flush()
+            texto.detach()
+        binario.flush()
+        os.fsync(binario.fileno())
+    os.replace(f"{ruta}.tmp", ruta)
+
+    manifiesto = leer_manifiesto()
+    manifiesto["archivos"].append(
+        {
+            "archivo": relativo,
+            "desde": desde.date(),
+            "hasta": (hasta - timedelta(microseconds=1)).date(),
+            "filas": escritas,
+            "registro_id_maximo": id_maximo,
+        }
+    )
+    _guardar_manifiesto(manifiesto)
+    return ruta, escritas
+
+
+def _borrar_archivados(ruta, lote):
+    # Borra por lotes (sin una transacción larga) los registro_id leídos del
+    # archivo ya escrito, no los del rango, que pudo recibir filas mientras tanto
+    with gzip.open(ruta, "rt", encoding="utf-8", newline="") as archivo:
+        ids = []
+        for fila in csv.DictReader(archivo):
+            ids.append(int(fila["registro_id"]))
+            if len(ids) >= lote:
+                _borrar_ids(ids)
+                ids = []
+        if ids:
+            _borrar_ids(ids)
+
+
+def _borrar_ids(ids):
+    db.session.query(Registro).filter(Registro.registro_id.in_(ids)).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def _guardar_archivado_hasta(fecha_corte):
+    manifiesto = leer_manifiesto()
+    anterior = manifiesto["archivado_hasta"]
+    if anterior is None or fecha_corte > anterior:
+        manifiesto["archivado_hasta"] = fecha_corte
+        _guardar_manifiesto(manifiesto)
+
+
+def _guardar_manifiesto(manifiesto):
+    # Escritura atómica: archivo temporal y reemplazo
+    directorio = directorio_archivo()
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, MANIFIESTO)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+        json.dump(manifiesto, archivo, indent=2, default=str)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def _convertir(fila):
+    return {
+        "registro_id": int(fila["registro_id"]),
+        "id_persona": int(fila["id_persona"]),
+        "id_credencial": int(fila["id_credencial"]) if fila["id_credencial"] else None,
+        "id_tipo_registro": int(fila["id_tipo_registro"]),
+        "fecha_hora": datetime.fromisoformat(fila["fecha_hora"]),
+        "observacion": fila["observacion"] or None,
+        "primer_nombre": fila["primer_nombre"],
+        "segundo_nombre": fila["segundo_nombre"] or None,
+        "primer_apellido": fila["primer_apellido"],
+        "segundo_apellido": fila["segundo_apellido"] or None,
+    }
+
+
+def _mes_siguiente(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
@@ -0,0 +1,610 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.registro import Registro
+from app.models.estado_asistencia import EstadoAsistencia
+from app.utils.cache_credenciales import cache_credenciales
+from app.utils.cache_reportes import cache_reportes
+from app.utils.cola_registros import cola_registros
+from app.utils.contadores import contadores_panel
+from app.utils.limitador import limitador_intentos
+from app.utils.bloqueos import bloqueo_persona, bloqueo_personas
+from app.utils.jornadas import aplicar_jornada, cargar_jornadas, obtener_jornada
+
+TIPO_INGRESO = 1
+TIPO_SALIDA = 2
+
+MENSAJE_LIMITE = "Demasiados intentos fallidos. Intente de nuevo más tarde."
+
+
+def obtener_estado(id_persona):
+    """
+    Obtiene el estado de asistencia de una persona por llave primaria.
+    Si la persona aún no tiene estado se deriva de sus registros y se agrega
+    a la sesión para que se guarde junto con el siguiente registro.
+    """
+    estado = db.session.get(EstadoAsistencia, id_persona)
+    if estado is None:
+        estado = derivar_estado(id_persona)
+        db.session.add(estado)
+    return estado
+
+
+def derivar_estado(id_persona):
+    """
+    Calcula el estado de asistencia de una persona a partir de la tabla registro
+    """
+    ultimo_ingreso = (
+        Registro.query.filter_by(id_persona=id_persona, id_tipo_registro=TIPO_INGRESO)
+        .order_by(Registro.fecha_hora.desc())
+        .first()
+    )
+    ultima_salida = (
+        Registro.query.filter_by(id_persona=id_persona, id_tipo_registro=TIPO_SALIDA)
+        .order_by(Registro.fecha_hora.desc())
+        .first()
+    )
+
+    return _construir_estado(
+        id_persona,
+        ultimo_ingreso.registro_id if ultimo_ingreso else None,
+        ultimo_ingreso.fecha_hora if ultimo_ingreso else None,
+        ultima_salida.fecha_hora if ultima_salida else None,
+    )
+
+
+def validar_accion(estado, accion):
+    """
+    Valida la alternancia ingreso/salida contra el estado de la persona.
+    Devuelve una tupla (mensaje, categoria) si la acción no es válida o None.
+    """
+    if accion == "ingreso":
+        if estado.turno_abierto:
+            return (
+                f'Ya tiene un registro de ingreso activo desde {estado.fecha_hora_ultimo_ingreso.strftime("%d-%m-%Y %H:%M:%S")}. '
+                f"Debe registrar una salida antes de poder registrar un nuevo ingreso.",
+                "warning",
+            )
+        return None
+
+    if not estado.fecha_hora_ultimo_ingreso:
+        return ("No se encontró un registro de ingreso para esta persona", "warning")
+
+    if not estado.turno_abierto:
+        return (
+            "Ya tiene un registro de salida después de su último ingreso",
+            "warning",
+        )
+
+    return None
+
+
+def aplicar_registro(estado, registro, jornada=None):
+    """
+    Actualiza el estado de asistencia y la jornada del día con un nuevo
+    registro. Debe llamarse en la misma transacción en la que se inserta el
+    registro; sin `jornada` se obtiene por llave primaria.
+    """
+    if registro.registro_id is None:
+        db.session.flush()
+
+    if jornada is None:
+        jornada = obtener_jornada(registro.id_persona, registro.fecha_hora.date())
+    aplicar_jornada(jornada, registro.id_tipo_registro, registro.fecha_hora)
+
+    if registro.id_tipo_registro == TIPO_INGRESO:
+        estado.fecha_hora_ultimo_ingreso = registro.fecha_hora
+        estado.id_registro_abierto = registro.registro_id
+    else:
+        estado.fecha_hora_ultima_salida = registro.fecha_hora
+        estado.id_registro_abierto = None
+
+
+def registrar_marcacion(pin, accion, direccion=None):
+    """
+    Registra una marcación de ingreso o salida con la hora del servidor.
+    Devuelve un diccionario con el estado ("registrado", "invalido",
+    "limitado", "rechazado" o "error"), el mensaje, su categoría, el nombre
+    de la persona y la fecha. Con `direccion` se aplican los límites de
+    intentos fallidos por cliente.
+    """
+    if not pin:
+        return _marcacion("invalido", "Por favor ingrese un PIN válido", "error")
+
+    # Rechazar barridos de PIN antes de consultar la base de datos
+    if direccion is not None and not limitador_intentos.permitir(direccion):
+        return _marcacion("limitado", MENSAJE_LIMITE, "error")
+
+    # Buscar la credencial asociada con el PIN (cache en memoria)
+    credencial = cache_credenciales.obtener(pin)
+
+    if not credencial or not credencial.activo:
+        if direccion is not None:
+            limitador_intentos.registrar_fallo(direccion)
+        return _marcacion("rechazado", "Credencial no reconocida o inactiva", "error")
+
+    if cola_registros.activa:
+        return _encolar_marcacion(credencial, accion)
+
+    # Validar e insertar de forma atómica para la persona (doble toque, varios quioscos)
+    with bloqueo_persona(credencial.id_persona):
+        return _guardar_marcacion(credencial, accion)
+
+
+def _guardar_marcacion(credencial, accion):
+    # Validar la alternancia ingreso/salida con el estado de la persona
+    estado = obtener_estado(credencial.id_persona)
+    error = validar_accion(estado, accion)
+
+    if error:
+        return _marcacion("rechazado", *error, nombre=credencial.nombre)
+
+    accion = "ingreso" if accion == "ingreso" else "salida"
+    fecha_hora = datetime.now()
+    nuevo_registro = Registro(
+        id_persona=credencial.id_persona,
+        id_credencial=credencial.id_credencial,
+        id_tipo_registro=TIPO_INGRESO if accion == "ingreso" else TIPO_SALIDA,
+        fecha_hora=fecha_hora,
+        observacion=f"Registro de {accion} automático",
+    )
+
+    try:
+        db.session.add(nuevo_registro)
+        aplicar_registro(estado, nuevo_registro)
+        # Solo cambia algo si la marcación se confirma después de medianoche
+        cache_reportes.invalidar_dias({fecha_hora.date()})
+        db.session.commit()
+        contadores_panel.registrar_marcaciones([(nuevo_registro.id_tipo_registro, fecha_hora)])
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error al guardar registro: {str(e)}")
+        return _marcacion(
+            "error",
+            "Error al procesar el registro. Por favor, inténtelo nuevamente.",
+            "error",
+            nombre=credencial.nombre,
+        )
+
+    return _marcacion(
+        "registrado",
+        f"Registro de {accion} exitoso para {credencial.nombre}",
+        "success",
+        nombre=credencial.nombre,
+        fecha_hora=fecha_hora,
+    )
+
+
+def _encolar_marcacion(credencial, accion):
+    """
+    Valida la marcación contra el estado guardado más las marcaciones
+    pendientes de la cola y la encola para escritura diferida.
+    """
+    accion = "ingreso" if accion == "ingreso" else "salida"
+    tipo = TIPO_INGRESO if accion == "ingreso" else TIPO_SALIDA
+
+    while True:
+        base, generacion = cola_registros.estado_pendiente(credencial.id_persona)
+        if base is None:
+            estado = db.session.get(EstadoAsistencia, credencial.id_persona)
+            simulado = copiar_estado(estado or derivar_estado(credencial.id_persona))
+        else:
+            simulado = copiar_estado(base)
+
+        error = validar_accion(simulado, accion)
+        if error:
+            return _marcacion("rechazado", *error, nombre=credencial.nombre)
+
+        fecha_hora = datetime.now()
+        simular_registro(simulado, tipo, fecha_hora)
+        marcacion = {
+            "id_persona": credencial.id_persona,
+            "id_credencial": credencial.id_credencial,
+            "id_tipo_registro": tipo,
+            "fecha_hora": fecha_hora,
+            "observacion": f"Registro de {accion} automático",
+        }
+        if cola_registros.encolar(marcacion, simulado, base, generacion):
+            break
+
+        # El estado cambió mientras se validaba; descartar lecturas en cache
+        db.session.expire_all()
+
+    return _marcacion(
+        "registrado",
+        f"Registro de {accion} exitoso para {credencial.nombre}",
+        "success",
+        nombre=credencial.nombre,
+        fecha_hora=fecha_hora,
+    )
+
+
+def reconstruir_estados():
+    """
+    Reconstruye el estado de asistencia de todas las personas con registros.
+    Devuelve la cantidad de estados creados o actualizados.
+    """
+    estados = {estado.id_persona: estado for estado in EstadoAsistencia.query.all()}
+
+    total = 0
+    for id_persona, id_ingreso, ultimo_ingreso, ultima_salida in _ultimos_registros():
+        nuevo = _construir_estado(id_persona, id_ingreso, ultimo_ingreso, ultima_salida)
+        estado = estados.pop(id_persona, None)
+        if estado is None:
+            db.session.add(nuevo)
+        else:
+            estado.id_registro_abierto = nuevo.id_registro_abierto
+            estado.fecha_hora_ultimo_ingreso = nuevo.fecha_hora_ultimo_ingreso
+            estado.fecha_hora_ultima_salida = nuevo.fecha_hora_ultima_salida
+        total += 1
+
+    # Personas con estado pero sin registros (por ejemplo, registros eliminados)
+    for estado in estados.values():
+        estado.id_registro_abierto = None
+        estado.fecha_hora_ultimo_ingreso = None
+        estado.fecha_hora_ultima_salida = None
+
+    db.session.commit()
+    return total
+
+
+def verificar_estados():
+    """
+    Compara el estado almacenado con el derivado de la tabla registro.
+    Devuelve una lista de diferencias (id_persona, campo, esperado, actual).
+    """
+    estados = {estado.id_persona: estado for estado in EstadoAsistencia.query.all()}
+    campos = (
+        "id_registro_abierto",
+        "fecha_hora_ultimo_ingreso",
+        "fecha_hora_ultima_salida",
+    )
+
+    diferencias = []
+    for id_persona, id_ingreso, ultimo_ingreso, ultima_salida in _ultimos_registros():
+        esperado = _construir_estado(id_persona, id_ingreso, ultimo_ingreso, ultima_salida)
+        actual = estados.pop(id_persona, None)
+        for campo in campos:
+            valor_esperado = getattr(esperado, campo)
+            valor_actual = getattr(actual, campo) if actual else None
+            if valor_esperado != valor_actual:
+                diferencias.append((id_persona, campo, valor_esperado, valor_actual))
+
+    for id_persona, actual in estados.items():
+        for campo in campos:
+            if getattr(actual, campo) is not None:
+                diferencias.append((id_persona, campo, None, getattr(actual, campo)))
+
+    return diferencias
+
+
+def _construir_estado(id_persona, id_ingreso, ultimo_ingreso, ultima_salida):
+    # El turno está abierto si no hay una salida posterior al último ingreso
+    abierto = ultimo_ingreso is not None and not (
+        ultima_salida is not None and ultima_salida > ultimo_ingreso
+    )
+    return EstadoAsistencia(
+        id_persona=id_persona,
+        id_registro_abierto=id_ingreso if abierto else None,
+        fecha_hora_ultimo_ingreso=ultimo_ingreso,
+        fecha_hora_ultima_salida=ultima_salida,
+    )
+
+
+def _ultimos_registros():
+    """
+    Devuelve por persona (id_persona, id del último ingreso, fecha del último
+    ingreso, fecha de la última salida) en una sola consulta.
+    """
+    ultimos = (
+        db.session.query(
+            Registro.id_persona.label("id_persona"),
+            db.func.max(
+                db.case(
+                    (Registro.id_tipo_registro == TIPO_INGRESO, Registro.fecha_hora)
+                )
+            ).label("ultimo_ingreso"),
+            db.func.max(
+                db.case(
+                    (Registro.id_tipo_registro == TIPO_SALIDA, Registro.fecha_hora)
+                )
+            ).label("ultima_salida"),
+        )
+        .group_by(Registro.id_persona)
+        .subquery()
+    )
+
+    # Id del registro correspondiente al último ingreso
+    id_ingreso = (
+        db.session.query(db.func.max(Registro.registro_id))
+        .filter(
+            Registro.id_persona == ultimos.c.id_persona,
+            Registro.id_tipo_registro == TIPO_INGRESO,
+            Registro.fecha_hora == ultimos.c.ultimo_ingreso,
+        )
+        .scalar_subquery()
+    )
+
+    return db.session.query(
+        ultimos.c.id_persona,
+        id_ingreso,
+        ultimos.c.ultimo_ingreso,
+        ultimos.c.ultima_salida,
+    ).all()
+
+
+def procesar_lote(items, direccion=None):
+    """
+    Procesa un lote de marcaciones diferidas {pin, accion, timestamp}.
+    Valida la alternancia ingreso/salida en una sola pasada ordenada por
+    persona usando las fechas del cliente e inserta los registros válidos en
+    una sola transacción. Se rechazan las fechas posteriores a la hora del
+    servidor más REGISTRO_LOTE_DESFASE_MAX segundos y las anteriores a
+    REGISTRO_LOTE_ANTIGUEDAD_DIAS días. Con `direccion`, al alcanzar el límite de intentos
+    fallidos el resto del lote se marca como "limitado" sin consultar sus PIN.
+    Devuelve un resultado por cada elemento del lote.
+    """
+    resultados = [None] * len(items)
+    por_persona = {}
+
+    # Ventana aceptada para las fechas del cliente: un reloj adelantado
+    # bloquearía las marcaciones siguientes de la persona
+    ahora = datetime.now()
+    fecha_max = ahora + timedelta(seconds=current_app.config.get("REGISTRO_LOTE_DESFASE_MAX", 300))
+    fecha_min = ahora - timedelta(days=current_app.config.get("REGISTRO_LOTE_ANTIGUEDAD_DIAS", 7))
+
+    # Validar formato y resolver credenciales
+    for indice, item in enumerate(items):
+        if not isinstance(item, dict):
+            resultados[indice] = _resultado(indice, "rechazado", "Elemento inválido")
+            continue
+
+        pin = item.get("pin")
+        accion = item.get("accion")
+        fecha_hora = _parsear_fecha(item.get("timestamp"))
+
+        if not pin:
+            resultados[indice] = _resultado(indice, "rechazado", "PIN requerido")
+            continue
+        if accion not in ("ingreso", "salida"):
+            resultados[indice] = _resultado(indice, "rechazado", "Acción inválida")
+            continue
+        if fecha_hora is None:
+            resultados[indice] = _resultado(indice, "rechazado", "Fecha y hora inválida")
+            continue
+        if fecha_hora > fecha_max:
+            resultados[indice] = _resultado(
+                indice, "rechazado", "La fecha es posterior a la hora del servidor"
+            )
+            continue
+        if fecha_hora < fecha_min:
+            resultados[indice] = _resultado(
+                indice, "rechazado", "La fecha es demasiado antigua para sincronizarse"
+            )
+            continue
+
+        # Un lote no puede probar más PIN de los que permite el limitador
+        if direccion is not None and not limitador_intentos.permitir(direccion):
+            for resto in range(indice, len(items)):
+                if resultados[resto] is None:
+                    resultados[resto] = _resultado(resto, "limitado", MENSAJE_LIMITE)
+            break
+
+        credencial = cache_credenciales.obtener(pin)
+        if not credencial or not credencial.activo:
+            if direccion is not None:
+                limitador_intentos.registrar_fallo(direccion)
+            resultados[indice] = _resultado(
+                indice, "rechazado", "Credencial no reconocida o inactiva"
+            )
+            continue
+
+        por_persona.setdefault(credencial.id_persona, []).append(
+            (fecha_hora, indice, accion, credencial)
+        )
+
+    if not por_persona:
+        return resultados
+
+    with bloqueo_personas(por_persona):
+        return _guardar_lote(por_persona, resultados)
+
+
+def _guardar_lote(por_persona, resultados):
+    ids_persona = list(por_persona)
+    estados = _cargar_estados(ids_persona)
+
+    # Registros ya guardados en el rango del lote (reintentos del quiosco)
+    fechas = [marcacion[0] for marcaciones in por_persona.values() for marcacion in marcaciones]
+    existentes = set(
+        db.session.query(
+            Registro.id_persona, Registro.id_tipo_registro, Registro.fecha_hora
+        ).filter(
+            Registro.id_persona.in_(ids_persona),
+            Registro.fecha_hora >= min(fechas),
+            Registro.fecha_hora <= max(fechas),
+        )
+    )
+
+    nuevos = []
+    for id_persona, marcaciones in por_persona.items():
+        simulado = copiar_estado(estados[id_persona])
+
+        for fecha_hora, indice, accion, credencial in sorted(marcaciones, key=lambda m: m[:2]):
+            tipo = TIPO_INGRESO if accion == "ingreso" else TIPO_SALIDA
+            clave = (id_persona, tipo, fecha_hora)
+
+            if clave in existentes:
+                resultados[indice] = _resultado(indice, "duplicado", "Registro ya existente")
+                continue
+
+            ultimo = max(
+                filter(None, (simulado.fecha_hora_ultimo_ingreso, simulado.fecha_hora_ultima_salida)),
+                default=None,
+            )
+            if ultimo and fecha_hora <= ultimo:
+                resultados[indice] = _resultado(
+                    indice, "rechazado", "La fecha es anterior al último registro de la persona"
+                )
+                continue
+
+            error = validar_accion(simulado, accion)
+            if error:
+                resultados[indice] = _resultado(indice, "rechazado", error[0])
+                continue
+
+            registro = Registro(
+                id_persona=id_persona,
+                id_credencial=credencial.id_credencial,
+                id_tipo_registro=tipo,
+                fecha_hora=fecha_hora,
+                observacion=f"Registro de {accion} sincronizado",
+            )
+            nuevos.append(registro)
+            existentes.add(clave)
+
+            simular_registro(simulado, tipo, fecha_hora)
+
+            resultados[indice] = _resultado(
+                indice, "registrado", f"Registro de {accion} exitoso para {credencial.nombre}"
+            )
+
+    _insertar_registros(nuevos, estados)
+    return resultados
+
+
+def guardar_marcaciones(marcaciones):
+    """
+    Inserta en una sola transacción marcaciones ya validadas (diccionarios
+    con las columnas de Registro) y actualiza el estado de cada persona.
+    Omite las que ya existen en la tabla registro. La alternancia se vuelve
+    a validar contra el estado guardado, con las personas bloqueadas: otro
+    proceso con escritura diferida pudo aceptar la misma marcación con su
+    propia cola. Devuelve (insertados, rechazadas), donde cada rechazada es
+    (marcación, mensaje).
+    """
+    if not marcaciones:
+        return 0, []
+
+    ids_persona = list({marcacion["id_persona"] for marcacion in marcaciones})
+    with bloqueo_personas(ids_persona):
+        return _guardar_marcaciones(marcaciones, ids_persona)
+
+
+def _guardar_marcaciones(marcaciones, ids_persona):
+    fechas = [marcacion["fecha_hora"] for marcacion in marcaciones]
+    existentes = set(
+        db.session.query(
+            Registro.id_persona, Registro.id_tipo_registro, Registro.fecha_hora
+        ).filter(
+            Registro.id_persona.in_(ids_persona),
+            Registro.fecha_hora >= min(fechas),
+            Registro.fecha_hora <= max(fechas),
+        )
+    )
+    estados = _cargar_estados(ids_persona)
+    simulados = {id_persona: copiar_estado(estado) for id_persona, estado in estados.items()}
+
+    nuevos = []
+    rechazadas = []
+    for marcacion in sorted(marcaciones, key=lambda m: m["fecha_hora"]):
+        clave = (
+            marcacion["id_persona"],
+            marcacion["id_tipo_registro"],
+            marcacion["fecha_hora"],
+        )
+        if clave in existentes:
+            continue
+
+        simulado = simulados[marcacion["id_persona"]]
+        accion = "ingreso" if marcacion["id_tipo_registro"] == TIPO_INGRESO else "salida"
+        error = validar_accion(simulado, accion)
+        if error:
+            rechazadas.append((marcacion, error[0]))
+            continue
+
+        nuevos.append(Registro(**marcacion))
+        existentes.add(clave)
+        simular_registro(simulado, marcacion["id_tipo_registro"], marcacion["fecha_hora"])
+
+    _insertar_registros(nuevos, estados)
+    return len(nuevos), rechazadas
+
+
+def copiar_estado(estado):
+    """Copia un estado de asistencia fuera de la sesión para simular marcaciones"""
+    return _construir_estado(
+        estado.id_persona,
+        estado.id_registro_abierto,
+        estado.fecha_hora_ultimo_ingreso,
+        estado.fecha_hora_ultima_salida,
+    )
+
+
+def simular_registro(estado, tipo, fecha_hora):
+    """Aplica una marcación a un estado simulado, sin id de registro aún"""
+    if tipo == TIPO_INGRESO:
+        estado.fecha_hora_ultimo_ingreso = fecha_hora
+        estado.id_registro_abierto = -1
+    else:
+        estado.fecha_hora_ultima_salida = fecha_hora
+        estado.id_registro_abierto = None
+
+
+def _cargar_estados(ids_persona):
+    # Estados de varias personas en una consulta; los faltantes se derivan
+    estados = {
+        estado.id_persona: estado
+        for estado in EstadoAsistencia.query.filter(
+            EstadoAsistencia.id_persona.in_(ids_persona)
+        )
+    }
+    for id_persona in ids_persona:
+        if id_persona not in estados:
+            estados[id_persona] = derivar_estado(id_persona)
+            db.session.add(estados[id_persona])
+    return estados
+
+
+def _insertar_registros(nuevos, estados):
+    # Inserción en bloque y actualización del estado y las jornadas en la misma transacción
+    jornadas = cargar_jornadas(nuevos)
+    db.session.add_all(nuevos)
+    db.session.flush()
+    for registro in sorted(nuevos, key=lambda r: r.fecha_hora):
+        clave = (registro.id_persona, registro.fecha_hora.date())
+        aplicar_registro(estados[registro.id_persona], registro, jornadas[clave])
+    # Las marcaciones con fechas pasadas cambian días que el cache daba por
+    # cerrados; la versión compartida se confirma junto con los registros
+    cache_reportes.invalidar_dias({registro.fecha_hora.date() for registro in nuevos})
+    db.session.commit()
+    contadores_panel.registrar_marcaciones(
+        [(registro.id_tipo_registro, registro.fecha_hora) for registro in nuevos]
+    )
+
+
+def _parsear_fecha(valor):
+    # Fechas ISO 8601; las fechas con zona horaria se pasan a hora local
+    if not isinstance(valor, str):
+        return None
+    try:
+        fecha_hora = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if fecha_hora.tzinfo is not None:
+        fecha_hora = fecha_hora.astimezone().replace(tzinfo=None)
+    return fecha_hora
+
+
+def _marcacion(estado, mensaje, categoria, nombre=None, fecha_hora=None):
+    return {
+        "estado": estado,
+        "mensaje": mensaje,
+        "categoria": categoria,
+        "nombre": nombre,
+        "fecha_hora": fecha_hora or datetime.now(),
+    }
+
+
+def _resultado(indice, estado, mensaje):
+    return {"indice": indice, "estado": estado, "mensaje": mensaje}
@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+
+from app import db
+
+# Espacio de nombres de los bloqueos consultivos de PostgreSQL para personas
+ESPACIO_PERSONA = 1001
+
+# Candados en memoria repartidos por franjas para motores sin bloqueos consultivos
+FRANJAS = 256
+_candados = [threading.Lock() for _ in range(FRANJAS)]
+
+
+@contextmanager
+def bloqueo_personas(ids_persona):
+    """
+    Serializa la validación y el registro de marcaciones por persona.
+    En PostgreSQL usa pg_advisory_xact_lock, que se libera al terminar la
+    transacción; en otros motores usa candados en memoria por franjas. Las
+    personas se bloquean en orden para evitar interbloqueos y personas
+    distintas pueden marcar en paralelo.
+
+    Al salir se revierte la transacción si quedó abierta (por ejemplo, cuando
+    la validación rechazó la marcación), lo que libera los bloqueos.
+    """
+    ids_persona = sorted(set(ids_persona))
+
+    if db.engine.dialect.name == "postgresql":
+        try:
+            for id_persona in ids_persona:
+                db.session.execute(
+                    db.text("SELECT pg_advisory_xact_lock(:espacio, :id_persona)"),
+                    {"espacio": ESPACIO_PERSONA, "id_persona": id_persona},
+                )
+            yield
+        finally:
+            if db.session().in_transaction():
+                db.session.rollback()
+        return
+
+    franjas = sorted({id_persona % FRANJAS for id_persona in ids_persona})
+    for franja in franjas:
+        _candados[franja].acquire()
+    try:
+        yield
+    finally:
+        if db.session().in_transaction():
+            db.session.rollback()
+        for franja in reversed(franjas):
+            _candados[franja].release()
+
+
+def bloqueo_persona(id_persona):
+    """Bloqueo de una sola persona; ver bloqueo_personas"""
+    return bloqueo_personas([id_persona])
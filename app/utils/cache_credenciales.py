@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+
+from app import db
+from app.models.credencial import Credencial
+from app.models.tipo_credencial import TipoCredencial
+from app.models.persona import Persona
+from app.models.version_cache import VersionCache
+
+# Fila de version_cache que comparten todos los procesos
+NOMBRE_VERSION = "credenciales"
+
+
+# Datos mínimos que necesita el registro de asistencia para validar un PIN
+CredencialPIN = namedtuple(
+    "CredencialPIN", ["id_credencial", "id_persona", "activo", "nombre"]
+)
+
+
+class CacheCredenciales:
+    """
+    Cache de lectura (read-through) de PIN a credencial con tamaño acotado.
+    Usa desalojo LRU y un tiempo de vida por entrada. Los PIN inexistentes se
+    guardan en un cache negativo de corta duración para no consultarlos de
+    nuevo.
+
+    Las invalidaciones (PIN creados, activados o desactivados, personas
+    editadas) incrementan el contador de la tabla version_cache; cada
+    proceso lo consulta como máximo cada `sincronizacion` segundos y vacía su
+    cache si cambió. Ese intervalo es la desactualización máxima entre
+    procesos a cambio de una consulta por intervalo: 0 consulta en cada
+    búsqueda y un valor negativo desactiva la sincronización (solo queda el
+    tiempo de vida, que además acota los cambios hechos fuera de la
+    aplicación).
+    """
+
+    def __init__(self, app=None):
+        self.max_entradas = 2048
+        self.ttl = 300
+        self.max_negativos = 4096
+        self.ttl_negativo = 60
+        self.sincronizacion = 5
+        self._entradas = OrderedDict()
+        self._negativos = OrderedDict()
+        self._pines_por_persona = {}
+        # Cambia con cada invalidación; una consulta iniciada antes no se guarda
+        self._generacion = 0
+        self._version = None
+        self._proxima_sincronizacion = 0.0
+        self._lock = threading.Lock()
+        self._metricas = {
+            "aciertos": 0,
+            "fallos": 0,
+            "aciertos_negativos": 0,
+            "invalidaciones_compartidas": 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entradas = app.config.get("PIN_CACHE_MAX", self.max_entradas)
+        self.ttl = app.config.get("PIN_CACHE_TTL", self.ttl)
+        self.max_negativos = app.config.get("PIN_CACHE_NEGATIVO_MAX", self.max_negativos)
+        self.ttl_negativo = app.config.get("PIN_CACHE_NEGATIVO_TTL", self.ttl_negativo)
+        self.sincronizacion = app.config.get("PIN_CACHE_SINCRONIZACION", self.sincronizacion)
+        self.limpiar()
+        self._version = None
+        self._proxima_sincronizacion = 0.0
+        app.extensions["cache_credenciales"] = self
+
+    def obtener(self, pin):
+        """
+        Devuelve la credencial PIN asociada al valor o None si no existe.
+        Solo consulta la base de datos cuando el valor no está en cache.
+        """
+        ahora = time.monotonic()
+        self._sincronizar(ahora)
+        with self._lock:
+            entrada = self._entradas.get(pin)
+            if entrada is not None:
+                credencial, expira = entrada
+                if expira > ahora:
+                    self._entradas.move_to_end(pin)
+                    self._metricas["aciertos"] += 1
+                    return credencial
+                self._eliminar(pin)
+
+            expira = self._negativos.get(pin)
+            if expira is not None:
+                if expira > ahora:
+                    self._metricas["aciertos_negativos"] += 1
+                    return None
+                del self._negativos[pin]
+
+            self._metricas["fallos"] += 1
+            generacion = self._generacion
+
+        credencial = self._consultar(pin)
+        if credencial is not None:
+            self._guardar(pin, credencial, ahora + self.ttl, generacion)
+        else:
+            self._guardar_negativo(pin, ahora + self.ttl_negativo, generacion)
+        return credencial
+
+    def invalidar_pin(self, pin):
+        """
+        Elimina un valor de PIN del cache (incluido el cache negativo). Como
+        las demás invalidaciones, se llama después del commit del cambio y
+        avisa a los demás procesos en una transacción propia.
+        """
+        self.invalidar_pines([pin])
+
+    def invalidar_pines(self, pines):
+        """Elimina varios valores de PIN del cache con una sola toma del lock"""
+        with self._lock:
+            self._generacion += 1
+            for pin in pines:
+                self._eliminar(pin)
+                self._negativos.pop(pin, None)
+        self._publicar()
+
+    def invalidar_persona(self, id_persona):
+        """Elimina del cache todos los PIN de una persona"""
+        with self._lock:
+            self._generacion += 1
+            for pin in list(self._pines_por_persona.get(id_persona, ())):
+                self._eliminar(pin)
+        self._publicar()
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._negativos.clear()
+            self._pines_por_persona.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["entradas"] = len(self._entradas)
+            metricas["negativos"] = len(self._negativos)
+            metricas["version"] = self._version
+        return metricas
+
+    def _sincronizar(self, ahora):
+        # Compara la versión compartida a lo sumo una vez por intervalo
+        if self.sincronizacion < 0 or ahora < self._proxima_sincronizacion:
+            return
+        version = VersionCache.leer(NOMBRE_VERSION)
+        with self._lock:
+            self._proxima_sincronizacion = ahora + self.sincronizacion
+            if version == self._version:
+                return
+            if self._version is not None:
+                self._metricas["invalidaciones_compartidas"] += 1
+            self._version = version
+            self._generacion += 1
+            self._entradas.clear()
+            self._negativos.clear()
+            self._pines_por_persona.clear()
+
+    def _publicar(self):
+        # Los demás procesos vacían su cache en la siguiente sincronización;
+        # si falla, el cambio les llega al vencer el tiempo de vida
+        if self.sincronizacion < 0:
+            return
+        try:
+            VersionCache.incrementar(NOMBRE_VERSION)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error al publicar la invalidación de PIN: {str(e)}")
+
+    def _consultar(self, pin):
+        fila = (
+            db.session.query(
+                Credencial.id_credencial,
+                Credencial.id_persona,
+                Credencial.activo,
+                Persona.primer_nombre,
+                Persona.primer_apellido,
+            )
+            .join(
+                TipoCredencial,
+                Credencial.id_tipo_credencial == TipoCredencial.id_tipo_credencial,
+            )
+            .join(Persona, Credencial.id_persona == Persona.id_persona)
+            .filter(Credencial.valor == pin, TipoCredencial.nombre == "PIN")
+            .order_by(Credencial.activo.desc())
+            .first()
+        )
+        if not fila:
+            return None
+
+        return CredencialPIN(
+            id_credencial=fila.id_credencial,
+            id_persona=fila.id_persona,
+            activo=bool(fila.activo),
+            nombre=f"{fila.primer_nombre} {fila.primer_apellido}",
+        )
+
+    def _guardar(self, pin, credencial, expira, generacion):
+        with self._lock:
+            if generacion != self._generacion:
+                # Hubo una invalidación durante la consulta: el dato puede ser viejo
+                return
+            self._eliminar(pin)
+            self._entradas[pin] = (credencial, expira)
+            self._pines_por_persona.setdefault(credencial.id_persona, set()).add(pin)
+            while len(self._entradas) > self.max_entradas:
+                pin_antiguo = next(iter(self._entradas))
+                self._eliminar(pin_antiguo)
+
+    def _guardar_negativo(self, pin, expira, generacion):
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            self._negativos[pin] = expira
+            self._negativos.move_to_end(pin)
+            while len(self._negativos) > self.max_negativos:
+                self._negativos.popitem(last=False)
+
+    def _eliminar(self, pin):
+        # Debe llamarse con el lock adquirido
+        entrada = self._entradas.pop(pin, None)
+        if entrada is None:
+            return
+        id_persona = entrada[0].id_persona
+        pines = self._pines_por_persona.get(id_persona)
+        if pines is not None:
+            pines.discard(pin)
+            if not pines:
+                del self._pines_por_persona[id_persona]
+
+
+cache_credenciales = CacheCredenciales()
@@ -0,0 +1,210 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from app.models.persona import normalizar_texto
+from app.models.version_cache import VersionCache
+from app.utils.reportes import FiltrosReporte, obtener_pares
+
+# Fila de version_cache que comparten todos los procesos
+NOMBRE_VERSION = "reportes"
+
+
+class CacheReportes:
+    """
+    Cache de resultados del reporte de asistencia por búsqueda y día.
+    Los días anteriores a hoy se guardan sin vencimiento, con desalojo LRU
+    acotado por cantidad total de pares; el día de hoy (y el anterior durante
+    los primeros `margen` segundos del día, mientras se confirman marcaciones
+    hechas antes de medianoche) se recalcula siempre.
+
+    El cache es por proceso, pero la invalidación es compartida: quien
+    modifica días pasados (marcaciones sincronizadas, edición de personas,
+    archivado) incrementa en la misma transacción el contador de la tabla
+    version_cache, y cada consulta compara ese contador con el del proceso y
+    vacía el cache si cambió. Cuesta una consulta por clave primaria por
+    reporte.
+    """
+
+    def __init__(self, app=None):
+        self.activo = True
+        self.max_pares = 200000
+        self.max_dias_rango = 93
+        self.margen = 300
+        self._dias = OrderedDict()
+        self._total_pares = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._metricas = {
+            "aciertos": 0,
+            "fallos": 0,
+            "dias_hoy": 0,
+            "desalojos": 0,
+            "invalidaciones": 0,
+            "invalidaciones_compartidas": 0,
+            "rangos_omitidos": 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.activo = app.config.get("REPORTES_CACHE", self.activo)
+        self.max_pares = app.config.get("REPORTES_CACHE_MAX_PARES", self.max_pares)
+        self.max_dias_rango = app.config.get("REPORTES_CACHE_MAX_DIAS", self.max_dias_rango)
+        self.margen = app.config.get("REPORTES_CACHE_MARGEN", self.margen)
+        self.limpiar()
+        app.extensions["cache_reportes"] = self
+
+    def obtener_pares(self, filtros):
+        """
+        Devuelve los pares del reporte para los filtros, ordenados por fecha
+        descendente, o None si el cache está desactivado, el rango no tiene
+        fecha de inicio o es demasiado largo para guardarlo (en esos casos se
+        consulta directamente).
+        """
+        if not self.activo:
+            return None
+
+        hoy = date.today()
+        fecha_inicio = filtros.fecha_inicio
+        fecha_fin = min(filtros.fecha_fin or hoy, hoy)
+        if fecha_inicio is None:
+            with self._lock:
+                self._metricas["rangos_omitidos"] += 1
+            return None
+        if fecha_inicio > fecha_fin:
+            return []
+        if (fecha_fin - fecha_inicio).days + 1 > self.max_dias_rango:
+            with self._lock:
+                self._metricas["rangos_omitidos"] += 1
+            return None
+
+        self._sincronizar_version()
+
+        busqueda = normalizar_texto(filtros.busqueda_nombre)
+        primer_reciente = (datetime.now() - timedelta(seconds=self.margen)).date()
+        ultimo_pasado = min(fecha_fin, primer_reciente - timedelta(days=1))
+        por_dia = self._dias_pasados(busqueda, fecha_inicio, ultimo_pasado)
+
+        desde = max(fecha_inicio, primer_reciente)
+        if desde <= fecha_fin:
+            for par in obtener_pares(FiltrosReporte(busqueda, desde, fecha_fin)):
+                por_dia.setdefault(par["fecha"], []).append(par)
+            with self._lock:
+                self._metricas["dias_hoy"] += 1
+
+        pares = []
+        for dia in sorted(por_dia, reverse=True):
+            pares.extend(por_dia[dia])
+        return pares
+
+    def invalidar_dias(self, fechas):
+        """
+        Elimina del cache los días indicados para todas las búsquedas. Si
+        alguno es anterior a hoy incrementa además la versión compartida en
+        la transacción actual, así que debe llamarse antes del commit de los
+        cambios para que los demás procesos los vean a la vez.
+        """
+        fechas = set(fechas)
+        with self._lock:
+            for clave in [clave for clave in self._dias if clave[1] in fechas]:
+                self._eliminar(clave)
+                self._metricas["invalidaciones"] += 1
+        if self.activo and any(fecha < date.today() for fecha in fechas):
+            VersionCache.incrementar(NOMBRE_VERSION)
+
+    def invalidar_todo(self):
+        """
+        Vacía el cache de todos los procesos (por ejemplo al editar el nombre
+        de una persona). Como invalidar_dias, se llama antes del commit.
+        """
+        self.limpiar()
+        if self.activo:
+            VersionCache.incrementar(NOMBRE_VERSION)
+
+    def limpiar(self):
+        with self._lock:
+            self._dias.clear()
+            self._total_pares = 0
+            self._version = None
+
+    def estadisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["dias"] = len(self._dias)
+            metricas["pares"] = self._total_pares
+            metricas["version"] = self._version
+            metricas["activo"] = self.activo
+        consultas = metricas["aciertos"] + metricas["fallos"]
+        metricas["tasa_aciertos"] = round(metricas["aciertos"] / consultas, 4) if consultas else 0.0
+        return metricas
+
+    def _sincronizar_version(self):
+        # Se lee antes de calcular: si otro proceso confirma cambios mientras
+        # tanto, la siguiente consulta verá la versión nueva y vaciará el cache
+        version = VersionCache.leer(NOMBRE_VERSION)
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._metricas["invalidaciones_compartidas"] += 1
+                self._dias.clear()
+                self._total_pares = 0
+                self._version = version
+
+    def _dias_pasados(self, busqueda, fecha_inicio, fecha_fin):
+        # Días en cache y cálculo de los faltantes agrupados en rangos contiguos
+        por_dia = {}
+        faltantes = []
+        with self._lock:
+            dia = fecha_inicio
+            while dia <= fecha_fin:
+                clave = (busqueda, dia)
+                if clave in self._dias:
+                    self._dias.move_to_end(clave)
+                    por_dia[dia] = self._dias[clave]
+                    self._metricas["aciertos"] += 1
+                else:
+                    faltantes.append(dia)
+                    self._metricas["fallos"] += 1
+                dia += timedelta(days=1)
+
+        for desde, hasta in _rangos_contiguos(faltantes):
+            calculados = {}
+            for par in obtener_pares(FiltrosReporte(busqueda, desde, hasta)):
+                calculados.setdefault(par["fecha"], []).append(par)
+
+            dia = desde
+            while dia <= hasta:
+                por_dia[dia] = calculados.get(dia, [])
+                self._guardar((busqueda, dia), por_dia[dia])
+                dia += timedelta(days=1)
+
+        return por_dia
+
+    def _guardar(self, clave, pares):
+        with self._lock:
+            self._eliminar(clave)
+            self._dias[clave] = pares
+            self._total_pares += len(pares)
+            while self._total_pares > self.max_pares and len(self._dias) > 1:
+                self._eliminar(next(iter(self._dias)))
+                self._metricas["desalojos"] += 1
+
+    def _eliminar(self, clave):
+        # Debe llamarse con el lock adquirido
+        pares = self._dias.pop(clave, None)
+        if pares is not None:
+            self._total_pares -= len(pares)
+
+
+def _rangos_contiguos(fechas):
+    rangos = []
+    for fecha in fechas:
+        if rangos and rangos[-1][1] + timedelta(days=1) == fecha:
+            rangos[-1][1] = fecha
+        else:
+            rangos.append([fecha, fecha])
+    return rangos
+
+
+cache_reportes = CacheReportes()
@@ -0,0 +1,406 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+
+# Segundos máximos de espera entre reintentos de un lote fallido
+ESPERA_REINTENTO_MAX = 30
+
+
+class ColaRegistros:
+    """
+    Cola en memoria para escritura diferida (write-behind) de registros.
+    Las marcaciones se confirman al usuario después de validarlas y un hilo
+    en segundo plano las guarda en lotes (group commit). Cada marcación se
+    escribe antes en un archivo de spool local para recuperarla si el proceso
+    termina de forma inesperada. Cada proceso escribe su propio archivo de
+    spool (con su PID en el nombre); al iniciar, un proceso adopta los
+    archivos de procesos que ya no existen y vuelve a encolar sus marcaciones.
+    Un lote que falla se reintenta con espera creciente; si sigue fallando
+    por algo distinto a la conexión se guarda marcación por marcación y las
+    que no se pueden guardar pasan a un archivo de descartados, igual que las
+    que otro proceso dejó inválidas (por ejemplo, el mismo ingreso aceptado
+    en dos workers). El spool solo se agrega al final: se vacía cuando no
+    quedan pendientes y se compacta cuando las líneas ya guardadas superan a
+    las pendientes.
+    """
+
+    def __init__(self, app=None):
+        self.activa = False
+        self.tam_lote = 100
+        self.espera_max = 0.2
+        self.fsync = True
+        self.max_reintentos = 5
+        self.espera_reintento = 1.0
+        self.ruta_base_spool = None
+        self.ruta_spool = None
+        self.ruta_descartados = None
+        self._app = None
+        self._pendientes = []
+        self._estados = {}
+        self._recuperadas = {}
+        self._conteo = {}
+        self._generacion = 0
+        self._condicion = threading.Condition()
+        self._detener = False
+        self._hilo = None
+        self._spool = None
+        # Líneas al inicio del spool que ya están en la base de datos
+        self._guardadas_spool = 0
+        self._metricas = {
+            "lotes_escritos": 0,
+            "registros_escritos": 0,
+            "errores": 0,
+            "descartados": 0,
+            "latencia_ultima_ms": 0.0,
+            "latencia_max_ms": 0.0,
+            "latencia_total_ms": 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.activa = app.config.get("REGISTRO_WRITE_BEHIND", False)
+        self.tam_lote = app.config.get("REGISTRO_COLA_LOTE", self.tam_lote)
+        self.espera_max = app.config.get("REGISTRO_COLA_ESPERA_MS", 200) / 1000
+        self.fsync = app.config.get("REGISTRO_COLA_FSYNC", self.fsync)
+        self.max_reintentos = app.config.get("REGISTRO_COLA_REINTENTOS", self.max_reintentos)
+        self.ruta_base_spool = app.config.get("REGISTRO_COLA_SPOOL") or os.path.join(
+            app.instance_path, "registro_spool.jsonl"
+        )
+        raiz, extension = os.path.splitext(self.ruta_base_spool)
+        self.ruta_spool = f"{raiz}.{os.getpid()}{extension}"
+        self.ruta_descartados = f"{raiz}_descartados{extension}"
+        app.extensions["cola_registros"] = self
+
+        if self.activa:
+            self._iniciar()
+
+    def estado_pendiente(self, id_persona):
+        """
+        Devuelve el estado simulado de la persona si tiene marcaciones sin
+        guardar (o None) y la generación actual para detectar escrituras
+        concurrentes entre la lectura y el encolado. Las marcaciones
+        recuperadas del spool se aplican sobre el estado guardado.
+        """
+        with self._condicion:
+            if id_persona in self._recuperadas:
+                self._estados[id_persona] = _simular_recuperadas(
+                    id_persona, self._recuperadas.pop(id_persona)
+                )
+            return self._estados.get(id_persona), self._generacion
+
+    def encolar(self, marcacion, estado, base, generacion):
+        """
+        Encola una marcación validada contra `base` (estado pendiente o None).
+        Devuelve False si otro encolado o una escritura cambió el estado de
+        la persona mientras se validaba; en ese caso hay que validar de nuevo.
+        """
+        id_persona = marcacion["id_persona"]
+        with self._condicion:
+            if self._estados.get(id_persona) is not base:
+                return False
+            if base is None and generacion != self._generacion:
+                return False
+
+            self._escribir_spool(marcacion)
+            self._pendientes.append(marcacion)
+            self._estados[id_persona] = estado
+            self._conteo[id_persona] = self._conteo.get(id_persona, 0) + 1
+            self._condicion.notify()
+        return True
+
+    def estadisticas(self):
+        with self._condicion:
+            metricas = dict(self._metricas)
+            metricas["activa"] = self.activa
+            metricas["profundidad"] = len(self._pendientes)
+        lotes = metricas["lotes_escritos"]
+        metricas["latencia_promedio_ms"] = (
+            metricas.pop("latencia_total_ms") / lotes if lotes else 0.0
+        )
+        return metricas
+
+    def detener(self):
+        """Escribe las marcaciones pendientes y detiene el hilo de escritura"""
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+            # Sin pendientes el spool del proceso ya no hace falta
+            if not self._pendientes:
+                _borrar(self.ruta_spool)
+
+    def _iniciar(self):
+        os.makedirs(os.path.dirname(self.ruta_spool), exist_ok=True)
+        self._spool = open(self.ruta_spool, "a", encoding="utf-8")
+
+        # Recuperar marcaciones que quedaron en el spool de procesos anteriores
+        for ruta in self._spools_huerfanos():
+            recuperadas = self._adoptar_spool(ruta)
+            if recuperadas:
+                self._app.logger.warning(
+                    f"Recuperando {len(recuperadas)} registros del spool {os.path.basename(ruta)}"
+                )
+            for marcacion in recuperadas:
+                id_persona = marcacion["id_persona"]
+                self._pendientes.append(marcacion)
+                self._conteo[id_persona] = self._conteo.get(id_persona, 0) + 1
+                # El estado simulado se arma en la primera consulta (requiere la base de datos)
+                self._recuperadas.setdefault(id_persona, []).append(marcacion)
+
+        self._hilo = threading.Thread(
+            target=self._procesar, name="cola-registros", daemon=True
+        )
+        self._hilo.start()
+        atexit.register(self.detener)
+
+    def _procesar(self):
+        fallos = 0
+        while True:
+            with self._condicion:
+                while not self._pendientes and not self._detener:
+                    self._condicion.wait()
+                if not self._pendientes:
+                    return
+
+                # Esperar a completar un lote o a que venza la espera máxima
+                limite = time.monotonic() + self.espera_max
+                while len(self._pendientes) < self.tam_lote and not self._detener:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicion.wait(restante)
+                lote = self._pendientes[: self.tam_lote]
+
+            inicio = time.perf_counter()
+            descartados = 0
+            try:
+                if fallos >= self.max_reintentos:
+                    # El lote falla siempre: aislar las marcaciones que no se pueden guardar
+                    descartados = self._guardar_una_por_una(lote)
+                else:
+                    for marcacion, mensaje in self._guardar(lote):
+                        self._descartar(marcacion, mensaje)
+                        descartados += 1
+            except Exception as e:
+                fallos += 1
+                self._app.logger.error(
+                    f"Error al guardar lote de registros (intento {fallos}): {str(e)}"
+                )
+                if _error_de_conexion(e):
+                    # Sin conexión no se descarta nada: se reintenta hasta que vuelva
+                    fallos = min(fallos, self.max_reintentos - 1)
+                with self._condicion:
+                    self._metricas["errores"] += 1
+                    if self._detener:
+                        # Las marcaciones quedan en el spool para el próximo inicio
+                        return
+                    self._condicion.wait(
+                        min(self.espera_reintento * 2 ** (fallos - 1), ESPERA_REINTENTO_MAX)
+                    )
+                continue
+            fallos = 0
+
+            latencia = (time.perf_counter() - inicio) * 1000
+            with self._condicion:
+                del self._pendientes[: len(lote)]
+                for marcacion in lote:
+                    id_persona = marcacion["id_persona"]
+                    self._conteo[id_persona] -= 1
+                    if not self._conteo[id_persona]:
+                        del self._conteo[id_persona]
+                        self._estados.pop(id_persona, None)
+                        self._recuperadas.pop(id_persona, None)
+                self._generacion += 1
+                self._guardadas_spool += len(lote)
+                self._compactar_spool()
+
+                self._metricas["lotes_escritos"] += 1
+                self._metricas["registros_escritos"] += len(lote) - descartados
+                self._metricas["descartados"] += descartados
+                self._metricas["latencia_ultima_ms"] = latencia
+                self._metricas["latencia_total_ms"] += latencia
+                self._metricas["latencia_max_ms"] = max(
+                    self._metricas["latencia_max_ms"], latencia
+                )
+
+    def _guardar(self, lote):
+        from app import db
+        from app.utils.asistencia import guardar_marcaciones
+
+        # Devuelve las marcaciones rechazadas al volver a validarlas
+        with self._app.app_context():
+            try:
+                return guardar_marcaciones(lote)[1]
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _spools_huerfanos(self):
+        """
+        Archivos de spool de procesos que ya no existen: los de otro PID sin
+        proceso vivo y el archivo sin PID de versiones anteriores
+        """
+        raiz, extension = os.path.splitext(self.ruta_base_spool)
+        huerfanos = []
+        if os.path.exists(self.ruta_base_spool):
+            huerfanos.append(self.ruta_base_spool)
+        for ruta in sorted(glob.glob(f"{glob.escape(raiz)}.*{extension}")):
+            # registro_spool.<pid>.jsonl o registro_spool.<pid>-<n>.jsonl (adoptado)
+            sufijo = ruta[len(raiz) + 1 : len(ruta) - len(extension)]
+            pid = sufijo.split("-", 1)[0]
+            if pid.isdigit() and not _proceso_activo(int(pid)):
+                huerfanos.append(ruta)
+        return huerfanos
+
+    def _adoptar_spool(self, ruta):
+        """
+        Toma un spool huérfano y pasa sus marcaciones al spool propio. El
+        archivo se renombra primero para que solo un proceso lo adopte si
+        varios inician a la vez, y se elimina después de copiarlo.
+        """
+        raiz, extension = os.path.splitext(self.ruta_base_spool)
+        adoptado = f"{raiz}.{os.getpid()}-{time.monotonic_ns()}{extension}"
+        try:
+            os.rename(ruta, adoptado)
+        except FileNotFoundError:
+            # Otro proceso lo adoptó primero
+            return []
+
+        with open(adoptado, encoding="utf-8") as archivo:
+            recuperadas = [_deserializar(linea) for linea in archivo if linea.strip()]
+        for marcacion in recuperadas:
+            self._spool.write(_serializar(marcacion))
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+        os.remove(adoptado)
+        return recuperadas
+
+    def _guardar_una_por_una(self, lote):
+        """
+        Guarda cada marcación en su propia transacción y aparta en el archivo
+        de descartados las que fallan. Los errores de conexión se propagan
+        para reintentar el lote completo (las ya guardadas se omiten al
+        reintentar). Devuelve la cantidad de marcaciones descartadas.
+        """
+        descartados = 0
+        for marcacion in lote:
+            try:
+                rechazadas = self._guardar([marcacion])
+            except Exception as e:
+                if _error_de_conexion(e):
+                    raise
+                rechazadas = [(marcacion, e)]
+            for rechazada, error in rechazadas:
+                self._descartar(rechazada, error)
+                descartados += 1
+        return descartados
+
+    def _descartar(self, marcacion, error):
+        self._app.logger.error(
+            f"Registro descartado de la cola (persona {marcacion['id_persona']}, "
+            f"{marcacion['fecha_hora'].isoformat()}): {str(error)}"
+        )
+        linea = json.loads(_serializar(marcacion))
+        linea["error"] = str(error)
+        with open(self.ruta_descartados, "a", encoding="utf-8") as archivo:
+            archivo.write(json.dumps(linea) + "\n")
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def _escribir_spool(self, marcacion):
+        # Debe llamarse con el lock adquirido
+        self._spool.write(_serializar(marcacion))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def _compactar_spool(self):
+        # Debe llamarse con el lock adquirido. Sin pendientes basta con
+        # truncar; si quedan, se reescribe solo cuando las líneas guardadas
+        # superan a las pendientes, así cada línea se copia en promedio una vez
+        if not self._pendientes:
+            self._spool.truncate(0)
+            self._guardadas_spool = 0
+        elif self._guardadas_spool > max(len(self._pendientes), self.tam_lote):
+            self._reescribir_spool()
+            self._guardadas_spool = 0
+
+    def _reescribir_spool(self):
+        # Debe llamarse con el lock adquirido; deja solo las marcaciones pendientes
+        self._spool.close()
+        temporal = f"{self.ruta_spool}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            for marcacion in self._pendientes:
+                archivo.write(_serializar(marcacion))
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self.ruta_spool)
+        self._spool = open(self.ruta_spool, "a", encoding="utf-8")
+
+
+def _proceso_activo(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill termina el proceso en Windows: se asume vivo
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _error_de_conexion(error):
+    return isinstance(error, (OperationalError, InterfaceError, DisconnectionError)) or getattr(
+        error, "connection_invalidated", False
+    )
+
+
+def _simular_recuperadas(id_persona, marcaciones):
+    """Estado guardado de la persona más sus marcaciones recuperadas del spool"""
+    from app import db
+    from app.models.estado_asistencia import EstadoAsistencia
+    from app.utils.asistencia import copiar_estado, derivar_estado, simular_registro
+
+    estado = db.session.get(EstadoAsistencia, id_persona)
+    simulado = copiar_estado(estado or derivar_estado(id_persona))
+    for marcacion in sorted(marcaciones, key=lambda m: m["fecha_hora"]):
+        simular_registro(simulado, marcacion["id_tipo_registro"], marcacion["fecha_hora"])
+    return simulado
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _serializar(marcacion):
+    datos = dict(marcacion, fecha_hora=marcacion["fecha_hora"].isoformat())
+    return json.dumps(datos) + "\n"
+
+
+def _deserializar(linea):
+    datos = json.loads(linea)
+    datos["fecha_hora"] = datetime.fromisoformat(datos["fecha_hora"])
+    return datos
+
+
+cola_registros = ColaRegistros()
@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models.empleado import Empleado
+from app.models.persona import Persona
+from app.models.registro import Registro
+
+TIPO_INGRESO = 1
+TIPO_SALIDA = 2
+
+
+class ContadoresPanel:
+    """
+    Cache en memoria de los contadores del encabezado de reportes
+    (total de empleados, entradas y salidas de hoy). Las marcaciones
+    incrementan los contadores del día; crear un empleado o el cambio de día
+    obligan a recalcular. El tiempo de vida limita la desactualización con
+    marcaciones registradas por otros procesos.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 60
+        self._valores = None
+        self._fecha = None
+        self._expira = 0.0
+        self._lock = threading.Lock()
+        self._metricas = {"aciertos": 0, "fallos": 0, "incrementos": 0, "invalidaciones": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("PANEL_CACHE_TTL", self.ttl)
+        self.invalidar()
+        app.extensions["contadores_panel"] = self
+
+    def obtener(self):
+        """
+        Devuelve un diccionario con total_empleados, entradas_hoy y
+        salidas_hoy. Solo consulta la base de datos si el cache venció.
+        """
+        hoy = date.today()
+        with self._lock:
+            if self._valores is not None and self._fecha == hoy and self._expira > time.monotonic():
+                self._metricas["aciertos"] += 1
+                return dict(self._valores)
+            self._metricas["fallos"] += 1
+
+        valores = self._calcular(hoy)
+        with self._lock:
+            self._valores = valores
+            self._fecha = hoy
+            self._expira = time.monotonic() + self.ttl
+        return dict(valores)
+
+    def registrar_marcaciones(self, marcaciones):
+        """Suma marcaciones (id_tipo_registro, fecha_hora) ya guardadas a los contadores de hoy"""
+        with self._lock:
+            if self._valores is None:
+                return
+            for tipo, fecha_hora in marcaciones:
+                if fecha_hora.date() != self._fecha:
+                    continue
+                campo = "entradas_hoy" if tipo == TIPO_INGRESO else "salidas_hoy"
+                self._valores[campo] += 1
+                self._metricas["incrementos"] += 1
+
+    def invalidar(self):
+        """Obliga a recalcular los contadores en la siguiente lectura"""
+        with self._lock:
+            self._valores = None
+            self._metricas["invalidaciones"] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["valores"] = dict(self._valores) if self._valores else None
+        return metricas
+
+    def _calcular(self, hoy):
+        inicio = datetime.combine(hoy, datetime.min.time())
+        fin = inicio + timedelta(days=1)
+
+        total_empleados = (
+            db.session.query(db.func.count(Empleado.empleado_id))
+            .join(Persona, Empleado.id_persona == Persona.id_persona)
+            .scalar()
+        )
+        entradas_hoy, salidas_hoy = db.session.query(
+            db.func.count(db.case((Registro.id_tipo_registro == TIPO_INGRESO, 1))),
+            db.func.count(db.case((Registro.id_tipo_registro == TIPO_SALIDA, 1))),
+        ).filter(Registro.fecha_hora >= inicio, Registro.fecha_hora < fin).one()
+
+        return {
+            "total_empleados": total_empleados,
+            "entradas_hoy": entradas_hoy,
+            "salidas_hoy": salidas_hoy,
+        }
+
+
+contadores_panel = ContadoresPanel()
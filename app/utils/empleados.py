@@ -0,0 +1,164 @@
+from app import db
+from app.models.cargo_empleado import CargoEmpleado
+from app.models.credencial import Credencial
+from app.models.empleado import Empleado
+from app.models.persona import Persona, escapar_like, normalizar_texto
+from app.models.tipo_credencial import TipoCredencial
+from app.utils.cache_credenciales import cache_credenciales
+
+# Columnas ordenables de la tabla de empleados, en el orden de DataTables
+COLUMNAS_ORDEN = {
+    0: Persona.nombre_busqueda,
+    1: Persona.documento,
+    2: CargoEmpleado.descripcion,
+    3: Empleado.fecha_contratacion,
+}
+
+
+def consulta_empleados():
+    """
+    Empleados con su persona, cargo y estado de la credencial PIN en una sola
+    consulta: el PIN se agrupa por persona y se une con un LEFT OUTER JOIN,
+    así cada empleado produce una sola fila.
+    """
+    credenciales_pin = (
+        db.session.query(
+            Credencial.id_persona,
+            db.func.max(db.case((Credencial.activo == True, 1), else_=0)).label("activa"),
+        )
+        .join(TipoCredencial, Credencial.id_tipo_credencial == TipoCredencial.id_tipo_credencial)
+        .filter(TipoCredencial.nombre == "PIN")
+        .group_by(Credencial.id_persona)
+        .subquery()
+    )
+
+    return (
+        db.session.query(
+            Empleado.empleado_id,
+            Empleado.id_persona,
+            Empleado.fecha_contratacion,
+            Persona.primer_nombre,
+            Persona.segundo_nombre,
+            Persona.primer_apellido,
+            Persona.segundo_apellido,
+            Persona.documento,
+            Persona.fecha_creacion,
+            CargoEmpleado.descripcion.label("cargo"),
+            credenciales_pin.c.id_persona.label("id_persona_pin"),
+            credenciales_pin.c.activa.label("credencial_activa"),
+        )
+        .join(Persona, Empleado.id_persona == Persona.id_persona)
+        .join(CargoEmpleado, Empleado.cargo_id == CargoEmpleado.id_cargo)
+        .outerjoin(credenciales_pin, credenciales_pin.c.id_persona == Empleado.id_persona)
+    )
+
+
+def filtrar_empleados(consulta, busqueda):
+    """
+    Cada término de la búsqueda debe aparecer en el nombre (sin tildes ni
+    mayúsculas), el documento o el cargo del empleado.
+    """
+    for termino in (busqueda or "").split():
+        patron = f"%{escapar_like(termino.lower())}%"
+        consulta = consulta.filter(
+            db.or_(
+                Persona.nombre_busqueda.like(
+                    f"%{escapar_like(normalizar_texto(termino))}%", escape="\\"
+                ),
+                db.func.lower(Persona.documento).like(patron, escape="\\"),
+                db.func.lower(CargoEmpleado.descripcion).like(patron, escape="\\"),
+            )
+        )
+    return consulta
+
+
+def pagina_empleados(inicio, longitud, busqueda="", columna=0, descendente=False):
+    """
+    Devuelve una página de empleados para DataTables y sus conteos:
+    (total, filtrados, filas). La búsqueda, el orden y la paginación se
+    resuelven en la base de datos.
+    """
+    total = db.session.query(db.func.count(Empleado.empleado_id)).join(
+        Persona, Empleado.id_persona == Persona.id_persona
+    ).scalar()
+
+    consulta = filtrar_empleados(consulta_empleados(), busqueda)
+    filtrados = consulta.order_by(None).count() if (busqueda or "").strip() else total
+
+    orden = COLUMNAS_ORDEN.get(columna, Persona.nombre_busqueda)
+    desempate = Empleado.empleado_id
+    if descendente:
+        orden, desempate = orden.desc(), desempate.desc()
+
+    filas = consulta.order_by(orden, desempate).offset(inicio).limit(longitud).all()
+    return total, filtrados, filas
+
+
+def fila_a_empleado(fila):
+    """Convierte una fila de consulta_empleados en el diccionario de la tabla"""
+    nombre = " ".join(
+        parte
+        for parte in (
+            fila.primer_nombre,
+            fila.segundo_nombre,
+            fila.primer_apellido,
+            fila.segundo_apellido,
+        )
+        if parte
+    )
+    fecha = fila.fecha_contratacion or fila.fecha_creacion
+    return {
+        "empleado_id": fila.empleado_id,
+        "nombre": nombre,
+        "documento": fila.documento,
+        "cargo": fila.cargo,
+        "fecha_contratacion": fecha.strftime("%Y-%m-%d") if fecha else "",
+        "tiene_credencial": fila.id_persona_pin is not None,
+        "credencial_activa": bool(fila.credencial_activa),
+    }
+
+
+def cambiar_estado_credenciales(
+    activo, empleado_ids=None, cargo_id=None, contratado_desde=None, contratado_hasta=None
+):
+    """
+    Activa o desactiva con un solo UPDATE las credenciales PIN de los
+    empleados que cumplen todos los filtros indicados (ids, cargo y rango de
+    fecha de contratación). Solo se modifican las credenciales que cambian
+    de estado y sus PIN se invalidan juntos en el cache. Devuelve la cantidad
+    de credenciales modificadas. Lanza ValueError si no hay ningún filtro.
+    """
+    condiciones = []
+    if empleado_ids is not None:
+        condiciones.append(Empleado.empleado_id.in_(set(empleado_ids)))
+    if cargo_id is not None:
+        condiciones.append(Empleado.cargo_id == cargo_id)
+    if contratado_desde is not None:
+        condiciones.append(Empleado.fecha_contratacion >= contratado_desde)
+    if contratado_hasta is not None:
+        condiciones.append(Empleado.fecha_contratacion <= contratado_hasta)
+    if not condiciones:
+        raise ValueError("Debe indicar los empleados o al menos un filtro")
+
+    personas = db.select(Empleado.id_persona).where(*condiciones)
+    tipo_pin = (
+        db.select(TipoCredencial.id_tipo_credencial)
+        .where(TipoCredencial.nombre == "PIN")
+        .scalar_subquery()
+    )
+    actualizacion = (
+        db.update(Credencial)
+        .where(
+            Credencial.id_tipo_credencial == tipo_pin,
+            Credencial.id_persona.in_(personas),
+            Credencial.activo.is_not(activo),
+        )
+        .values(activo=activo)
+        .returning(Credencial.valor)
+        .execution_options(synchronize_session=False)
+    )
+    pines = db.session.execute(actualizacion).scalars().all()
+    db.session.commit()
+
+    cache_credenciales.invalidar_pines(pines)
+    return len(pines)
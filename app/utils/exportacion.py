@@ -0,0 +1,179 @@
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+from app.utils.reportes import (
+    consulta_pares,
+    dividir_por_archivo,
+    fila_a_par,
+    iterar_pares_archivados,
+)
+
+# Filas leídas por viaje al cursor del servidor y acumuladas por bloque enviado
+FILAS_POR_BLOQUE = 1000
+
+COLUMNAS = ["Empleado", "Fecha", "Hora de Entrada", "Hora de Salida"]
+
+FORMATOS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def nombre_archivo(filtros, formato):
+    """Nombre del archivo exportado con el rango de fechas de los filtros"""
+    nombre = "reporte_asistencia"
+    if filtros.fecha_inicio:
+        nombre += f"_{filtros.fecha_inicio.isoformat()}"
+    if filtros.fecha_fin:
+        nombre += f"_{filtros.fecha_fin.isoformat()}"
+    return f"{nombre}.{formato}"
+
+
+def filas_reporte(filtros):
+    """
+    Recorre los pares del reporte con un cursor del lado del servidor
+    (yield_per) y devuelve cada uno como lista de valores de texto. Los días
+    archivados se leen de los archivos después de los de la tabla registro,
+    un mes a la vez.
+    """
+    calientes, archivados = dividir_por_archivo(filtros)
+    for par in _pares(calientes, archivados):
+        yield [
+            par["empleado"],
+            par["fecha"].strftime("%Y-%m-%d"),
+            par["hora_entrada"].strftime("%H:%M") if par["hora_entrada"] else "",
+            par["hora_salida"].strftime("%H:%M") if par["hora_salida"] else "",
+        ]
+
+
+def _pares(calientes, archivados):
+    if calientes:
+        for fila in consulta_pares(calientes).yield_per(FILAS_POR_BLOQUE):
+            yield fila_a_par(fila)
+    if archivados:
+        yield from iterar_pares_archivados(archivados)
+
+
+def exportar_csv(filtros):
+    """Genera el reporte en CSV por bloques (con BOM para que Excel lea UTF-8)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    buffer.write("\ufeff")
+    escritor.writerow(COLUMNAS)
+    # Enviar el encabezado de inmediato, antes de ejecutar la consulta
+    yield _vaciar(buffer).encode("utf-8")
+
+    for numero, fila in enumerate(filas_reporte(filtros), start=1):
+        escritor.writerow(fila)
+        if numero % FILAS_POR_BLOQUE == 0:
+            yield _vaciar(buffer).encode("utf-8")
+
+    resto = _vaciar(buffer)
+    if resto:
+        yield resto.encode("utf-8")
+
+
+def exportar_xlsx(filtros):
+    """
+    Genera el reporte como libro XLSX de una hoja escribiendo el ZIP en modo
+    streaming: la hoja usa cadenas en línea (sin sharedStrings) y los bytes
+    comprimidos se envían a medida que se producen.
+    """
+    salida = _SalidaStreaming()
+    libro = zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED)
+
+    for nombre, contenido in _PARTES_XLSX.items():
+        libro.writestr(nombre, contenido)
+    yield salida.vaciar()
+
+    with libro.open("xl/worksheets/sheet1.xml", "w") as hoja:
+        hoja.write(_INICIO_HOJA.encode("utf-8"))
+        hoja.write(_fila_xlsx(COLUMNAS).encode("utf-8"))
+        yield salida.vaciar()
+
+        for numero, fila in enumerate(filas_reporte(filtros), start=1):
+            hoja.write(_fila_xlsx(fila).encode("utf-8"))
+            if numero % FILAS_POR_BLOQUE == 0:
+                datos = salida.vaciar()
+                if datos:
+                    yield datos
+
+        hoja.write(_FIN_HOJA.encode("utf-8"))
+
+    libro.close()
+    yield salida.vaciar()
+
+
+def _vaciar(buffer):
+    contenido = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return contenido
+
+
+def _fila_xlsx(valores):
+    celdas = "".join(
+        f'<c t="inlineStr"><is><t>{escape(valor)}</t></is></c>' for valor in valores
+    )
+    return f"<row>{celdas}</row>"
+
+
+class _SalidaStreaming(io.RawIOBase):
+    """Destino no posicionable para zipfile que acumula bytes hasta vaciarlos"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._buffer.extend(datos)
+        return len(datos)
+
+    def vaciar(self):
+        datos = bytes(self._buffer)
+        self._buffer.clear()
+        return datos
+
+
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+_FIN_HOJA = "</sheetData></worksheet>"
+
+_PARTES_XLSX = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Reporte" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
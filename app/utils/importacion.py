@@ -0,0 +1,356 @@
+import csv
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.cargo_empleado import CargoEmpleado
+from app.models.credencial import Credencial
+from app.models.empleado import Empleado
+from app.models.persona import Persona, nombre_busqueda, normalizar_texto
+from app.models.usuarios import Usuario
+from app.utils.cache_credenciales import cache_credenciales
+from app.utils.contadores import contadores_panel
+from app.utils.pines import asignar_pines, id_tipo_pin, pines_usados, prefijo_pin
+
+COLUMNAS_OBLIGATORIAS = [
+    "primer_nombre",
+    "primer_apellido",
+    "documento",
+    "correo",
+    "cargo",
+    "fecha_contratacion",
+    "contrasena",
+]
+COLUMNAS_OPCIONALES = ["segundo_nombre", "segundo_apellido", "celular"]
+
+# Filas por transacción al insertar
+LOTE_IMPORTACION = 200
+
+# Reintentos de un lote si otra sesión tomó un PIN, documento o correo
+REINTENTOS_LOTE = 3
+
+PATRON_CORREO = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+# Longitud máxima de cada columna de Persona que llega en el archivo
+LONGITUDES_PERSONA = {
+    columna: Persona.__table__.c[columna].type.length
+    for columna in (
+        "primer_nombre",
+        "segundo_nombre",
+        "primer_apellido",
+        "segundo_apellido",
+        "documento",
+        "correo",
+        "celular",
+    )
+}
+
+
+def leer_csv(contenido):
+    """
+    Lee el CSV de empleados (texto o bytes en UTF-8, con o sin BOM,
+    separado por coma o punto y coma). Devuelve (columnas, filas) donde cada
+    fila es (número de línea, diccionario).
+    """
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode("utf-8-sig")
+    contenido = contenido.lstrip("\ufeff")
+
+    primera_linea = contenido.split("\n", 1)[0]
+    separador = ";" if primera_linea.count(";") > primera_linea.count(",") else ","
+    lector = csv.DictReader(io.StringIO(contenido, newline=""), delimiter=separador)
+    columnas = [(columna or "").strip().lower() for columna in lector.fieldnames or []]
+    lector.fieldnames = columnas
+
+    filas = []
+    for fila in lector:
+        valores = {
+            columna: (valor or "").strip()
+            for columna, valor in fila.items()
+            if columna in COLUMNAS_OBLIGATORIAS or columna in COLUMNAS_OPCIONALES
+        }
+        # Ignorar líneas vacías
+        if any(valores.values()):
+            filas.append((lector.line_num, valores))
+    return columnas, filas
+
+
+def validar_filas(filas):
+    """
+    Valida todas las filas antes de insertar: campos obligatorios, correo,
+    contraseña, fecha y cargo, duplicados dentro del archivo y duplicados en
+    la base de datos con una sola consulta de conjunto. Devuelve
+    (válidas, errores); cada válida es un diccionario listo para insertar.
+    """
+    cargos = _cargos_por_clave()
+    validas = []
+    errores = []
+    vistos_documento = {}
+    vistos_correo = {}
+
+    for linea, fila in filas:
+        mensaje = _validar_fila(fila, cargos)
+        if mensaje is None:
+            documento = fila["documento"]
+            correo = fila["correo"].lower()
+            if documento in vistos_documento:
+                mensaje = f"Documento repetido en la línea {vistos_documento[documento]}"
+            elif correo in vistos_correo:
+                mensaje = f"Correo repetido en la línea {vistos_correo[correo]}"
+            else:
+                vistos_documento[documento] = linea
+                vistos_correo[correo] = linea
+
+        if mensaje:
+            errores.append(_resultado(linea, fila, "error", mensaje))
+            continue
+
+        validas.append(
+            {
+                "linea": linea,
+                "primer_nombre": fila["primer_nombre"],
+                "segundo_nombre": fila.get("segundo_nombre") or None,
+                "primer_apellido": fila["primer_apellido"],
+                "segundo_apellido": fila.get("segundo_apellido") or None,
+                "documento": fila["documento"],
+                "correo": fila["correo"],
+                "celular": fila.get("celular") or None,
+                "cargo_id": cargos[_clave_cargo(fila["cargo"])],
+                "fecha_contratacion": datetime.strptime(
+                    fila["fecha_contratacion"], "%Y-%m-%d"
+                ).date(),
+                "contrasena": fila["contrasena"],
+            }
+        )
+
+    validas, duplicadas = _descartar_existentes(validas)
+    errores.extend(duplicadas)
+    return validas, errores
+
+
+def importar_empleados(contenido, solo_validar=False, lote=None, hilos=None):
+    """
+    Importa empleados desde un CSV. Valida todas las filas, asigna los PIN
+    en bloque, calcula los hash de contraseña en un pool de hilos e inserta
+    Persona, Empleado, Credencial y Usuario por lotes, una transacción por
+    lote. Devuelve un resumen con el resultado de cada fila.
+    """
+    lote = lote or current_app.config.get("IMPORTACION_LOTE", LOTE_IMPORTACION)
+    hilos = hilos or current_app.config.get("IMPORTACION_HILOS_HASH")
+
+    columnas, filas = leer_csv(contenido)
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in columnas]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+
+    validas, resultados = validar_filas(filas)
+
+    if validas and not solo_validar:
+        # Los hash de contraseña son la parte más costosa: se calculan en paralelo
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            hashes = ejecutor.map(
+                generate_password_hash, [fila["contrasena"] for fila in validas]
+            )
+            for fila, contrasena_hash in zip(validas, hashes):
+                fila["contrasena"] = contrasena_hash
+
+        id_tipo = id_tipo_pin()
+        db.session.commit()
+        usados = pines_usados(prefijo_pin(fila["primer_nombre"]) for fila in validas)
+        for inicio in range(0, len(validas), lote):
+            resultados.extend(_insertar_lote(validas[inicio : inicio + lote], id_tipo, usados))
+
+        contadores_panel.invalidar()
+    elif validas:
+        resultados.extend(_resultado(fila["linea"], fila, "valido") for fila in validas)
+
+    resultados.sort(key=lambda resultado: resultado["linea"])
+    creados = sum(1 for resultado in resultados if resultado["estado"] == "creado")
+    return {
+        "total": len(filas),
+        "creados": creados,
+        "validos": sum(1 for resultado in resultados if resultado["estado"] in ("creado", "valido")),
+        "errores": sum(1 for resultado in resultados if resultado["estado"] == "error"),
+        "filas": resultados,
+    }
+
+
+def _validar_fila(fila, cargos):
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if not fila.get(columna)]
+    if faltantes:
+        return f"Campos obligatorios vacíos: {', '.join(faltantes)}"
+    if not PATRON_CORREO.match(fila["correo"]):
+        return "El formato del correo electrónico no es válido"
+    if len(fila["contrasena"]) < 6:
+        return "La contraseña debe tener al menos 6 caracteres"
+    try:
+        datetime.strptime(fila["fecha_contratacion"], "%Y-%m-%d")
+    except ValueError:
+        return "La fecha de contratación debe tener el formato AAAA-MM-DD"
+    if _clave_cargo(fila["cargo"]) not in cargos:
+        return f"El cargo '{fila['cargo']}' no existe"
+    for columna, longitud in LONGITUDES_PERSONA.items():
+        if len(fila.get(columna) or "") > longitud:
+            return f"El campo {columna} no puede tener más de {longitud} caracteres"
+    return None
+
+
+def _cargos_por_clave():
+    # Un cargo se puede indicar por id o por descripción (sin tildes ni mayúsculas)
+    cargos = {}
+    for id_cargo, descripcion in db.session.query(CargoEmpleado.id_cargo, CargoEmpleado.descripcion):
+        cargos[str(id_cargo)] = id_cargo
+        cargos[normalizar_texto(descripcion)] = id_cargo
+    return cargos
+
+
+def _clave_cargo(valor):
+    return valor if valor.isdigit() else normalizar_texto(valor)
+
+
+def _descartar_existentes(filas):
+    # Documentos y correos ya registrados, en una sola consulta; los correos
+    # se comparan sin distinguir mayúsculas, igual que dentro del archivo
+    if not filas:
+        return filas, []
+    documentos = {fila["documento"] for fila in filas}
+    correos = {fila["correo"].lower() for fila in filas}
+    existentes = db.session.query(Persona.documento, Persona.correo).filter(
+        db.or_(Persona.documento.in_(documentos), db.func.lower(Persona.correo).in_(correos))
+    )
+    documentos_usados = set()
+    correos_usados = set()
+    for documento, correo in existentes:
+        documentos_usados.add(documento)
+        correos_usados.add(correo.lower())
+
+    validas = []
+    errores = []
+    for fila in filas:
+        if fila["documento"] in documentos_usados:
+            errores.append(_resultado(fila["linea"], fila, "error", "Ya existe una persona con ese documento"))
+        elif fila["correo"].lower() in correos_usados:
+            errores.append(_resultado(fila["linea"], fila, "error", "Ya existe una persona con ese correo"))
+        else:
+            validas.append(fila)
+    return validas, errores
+
+
+def _insertar_lote(filas, id_tipo_pin, usados):
+    """
+    Inserta un lote en una transacción. Si otra sesión tomó un PIN,
+    documento o correo del lote, se vuelve a verificar y asignar y se
+    reintenta; las filas que quedan en conflicto se reportan como error.
+    """
+    errores = []
+    for intento in range(REINTENTOS_LOTE):
+        if intento:
+            usados |= pines_usados(prefijo_pin(fila["primer_nombre"]) for fila in filas)
+            filas, duplicadas = _descartar_existentes(filas)
+            errores.extend(duplicadas)
+
+        pines = asignar_pines([fila["primer_nombre"] for fila in filas], usados)
+        saturadas = [fila for fila, pin in zip(filas, pines) if pin is None]
+        for fila in saturadas:
+            errores.append(
+                _resultado(
+                    fila["linea"],
+                    fila,
+                    "error",
+                    f"No hay PIN disponibles para el prefijo {prefijo_pin(fila['primer_nombre'])}",
+                )
+            )
+        asignadas = [(fila, pin) for fila, pin in zip(filas, pines) if pin is not None]
+        if not asignadas:
+            return errores
+
+        try:
+            _insertar(asignadas, id_tipo_pin)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            filas = [fila for fila, _ in asignadas]
+            continue
+
+        usados.update(pin for _, pin in asignadas)
+        cache_credenciales.invalidar_pines([pin for _, pin in asignadas])
+        return errores + [
+            _resultado(fila["linea"], fila, "creado", pin=pin) for fila, pin in asignadas
+        ]
+
+    return errores + [
+        _resultado(fila["linea"], fila, "error", "No se pudo guardar el lote por conflictos con otros registros")
+        for fila in filas
+    ]
+
+
+def _insertar(asignadas, id_tipo_pin):
+    # Inserciones en bloque con Core: los eventos del ORM no se ejecutan, por
+    # eso nombre_busqueda se calcula aquí
+    ahora = datetime.utcnow()
+    ids = db.session.execute(
+        db.insert(Persona).returning(Persona.id_persona, Persona.documento),
+        [
+            {
+                "primer_nombre": fila["primer_nombre"],
+                "segundo_nombre": fila["segundo_nombre"],
+                "primer_apellido": fila["primer_apellido"],
+                "segundo_apellido": fila["segundo_apellido"],
+                "documento": fila["documento"],
+                "correo": fila["correo"],
+                "celular": fila["celular"],
+                "fecha_creacion": ahora,
+                "nombre_busqueda": nombre_busqueda(
+                    fila["primer_nombre"],
+                    fila["segundo_nombre"],
+                    fila["primer_apellido"],
+                    fila["segundo_apellido"],
+                ),
+            }
+            for fila, _ in asignadas
+        ],
+    ).all()
+    id_por_documento = {documento: id_persona for id_persona, documento in ids}
+
+    empleados = []
+    credenciales = []
+    usuarios = []
+    for fila, pin in asignadas:
+        id_persona = id_por_documento[fila["documento"]]
+        empleados.append(
+            {
+                "id_persona": id_persona,
+                "cargo_id": fila["cargo_id"],
+                "fecha_contratacion": fila["fecha_contratacion"],
+            }
+        )
+        credenciales.append(
+            {
+                "id_persona": id_persona,
+                "id_tipo_credencial": id_tipo_pin,
+                "valor": pin,
+                "activo": True,
+            }
+        )
+        usuarios.append({"id_persona": id_persona, "id_rol": 2, "contrasena": fila["contrasena"]})
+
+    db.session.execute(db.insert(Empleado), empleados)
+    db.session.execute(db.insert(Credencial), credenciales)
+    db.session.execute(db.insert(Usuario), usuarios)
+
+
+def _resultado(linea, fila, estado, mensaje=None, pin=None):
+    return {
+        "linea": linea,
+        "documento": fila.get("documento", ""),
+        "correo": fila.get("correo", ""),
+        "estado": estado,
+        "mensaje": mensaje,
+        "pin": pin,
+    }
@@ -0,0 +1,242 @@
+from collections import deque
+from datetime import datetime, timedelta
+from app import db
+from app.models.registro import Registro
+from app.models.jornada import Jornada
+from app.utils.archivo import archivado_hasta
+from app.utils.particiones import inicio_particiones
+
+TIPO_INGRESO = 1
+TIPO_SALIDA = 2
+
+# Filas leídas por viaje al reconstruir y filas insertadas por lote
+LOTE_RECONSTRUCCION = 5000
+
+
+def obtener_jornada(id_persona, fecha):
+    """
+    Obtiene la jornada de una persona en una fecha por llave primaria.
+    Si no existe se crea vacía y se agrega a la sesión.
+    """
+    jornada = db.session.get(Jornada, (id_persona, fecha))
+    if jornada is None:
+        jornada = _nueva_jornada(id_persona, fecha)
+        db.session.add(jornada)
+    return jornada
+
+
+def cargar_jornadas(registros):
+    """
+    Obtiene en una consulta las jornadas afectadas por varios registros,
+    creando las que falten. Devuelve un diccionario (id_persona, fecha) -> Jornada.
+    """
+    claves = {(registro.id_persona, registro.fecha_hora.date()) for registro in registros}
+    if not claves:
+        return {}
+
+    ids_persona = {id_persona for id_persona, _ in claves}
+    fechas = [fecha for _, fecha in claves]
+    jornadas = {
+        (jornada.id_persona, jornada.fecha): jornada
+        for jornada in Jornada.query.filter(
+            Jornada.id_persona.in_(ids_persona),
+            Jornada.fecha >= min(fechas),
+            Jornada.fecha <= max(fechas),
+        )
+    }
+    for clave in claves:
+        if clave not in jornadas:
+            jornadas[clave] = _nueva_jornada(*clave)
+            db.session.add(jornadas[clave])
+    return jornadas
+
+
+def aplicar_jornada(jornada, id_tipo_registro, fecha_hora, pendientes=None, anterior=None):
+    """
+    Actualiza el resumen del día con un registro posterior a los ya aplicados,
+    con la misma regla que reportes.consulta_pares: cada salida cierra el
+    ingreso más antiguo del mismo día que sigue sin salida, sumando un par y
+    sus minutos. Una salida sin ingreso abierto en su día (turno que cruzó la
+    medianoche) no suma par y cierra los ingresos abiertos del día anterior.
+
+    `pendientes` es la cola en memoria de los ingresos abiertos del día (la
+    usa la reconstrucción); sin ella, el siguiente ingreso abierto se lee de
+    la tabla registro. `anterior` devuelve la jornada del día anterior o None;
+    por defecto se busca por llave primaria.
+    """
+    if id_tipo_registro == TIPO_INGRESO:
+        if jornada.fecha_hora_primer_ingreso is None:
+            jornada.fecha_hora_primer_ingreso = fecha_hora
+        if not jornada.ingresos_abiertos:
+            jornada.fecha_hora_ingreso_abierto = fecha_hora
+        jornada.ingresos_abiertos = (jornada.ingresos_abiertos or 0) + 1
+        if pendientes is not None:
+            pendientes.append(fecha_hora)
+        return
+
+    jornada.fecha_hora_ultima_salida = fecha_hora
+    ingreso = jornada.fecha_hora_ingreso_abierto
+    # A la misma hora la salida se ordena antes que el ingreso
+    if ingreso is not None and ingreso < fecha_hora:
+        jornada.pares += 1
+        jornada.minutos_trabajados += minutos_entre(ingreso, fecha_hora)
+        jornada.ingresos_abiertos -= 1
+        if pendientes is not None:
+            pendientes.popleft()
+            jornada.fecha_hora_ingreso_abierto = pendientes[0] if pendientes else None
+        elif jornada.ingresos_abiertos:
+            jornada.fecha_hora_ingreso_abierto = _ingreso_abierto(jornada)
+        else:
+            jornada.fecha_hora_ingreso_abierto = None
+        return
+
+    if ingreso is None:
+        previa = anterior() if anterior else db.session.get(
+            Jornada, (jornada.id_persona, jornada.fecha - timedelta(days=1))
+        )
+        if previa is not None and previa.ingresos_abiertos:
+            previa.fecha_hora_ingreso_abierto = None
+            previa.ingresos_abiertos = 0
+
+
+def minutos_entre(inicio, fin):
+    return int((fin - inicio).total_seconds() // 60)
+
+
+def primer_dia_reconstruible():
+    """
+    Primer día cuyos registros siguen en la tabla registro: los días
+    archivados o de particiones quitadas por la retención no se pueden
+    reconstruir. None si todo el historial está en la tabla.
+    """
+    candidatos = [dia for dia in (archivado_hasta(), inicio_particiones()) if dia is not None]
+    return max(candidatos, default=None)
+
+
+def reconstruir_jornadas(fecha_inicio=None, fecha_fin=None):
+    """
+    Reconstruye las jornadas desde la tabla registro, opcionalmente solo
+    para un rango de fechas. El rango empieza como mínimo en
+    primer_dia_reconstruible(): las jornadas de días archivados o quitados
+    por la retención se conservan. Los registros se recorren en orden con un
+    cursor del lado del servidor y se aplican con la misma lógica que el
+    registro en línea; el día siguiente a `fecha_fin` solo se lee para cerrar
+    los turnos que cruzan la medianoche. Devuelve la cantidad de jornadas
+    generadas.
+    """
+    primer_dia = primer_dia_reconstruible()
+    if primer_dia is not None and (fecha_inicio is None or fecha_inicio < primer_dia):
+        fecha_inicio = primer_dia
+    if fecha_inicio and fecha_fin and fecha_fin < fecha_inicio:
+        return 0
+
+    borrar = db.session.query(Jornada)
+    registros = db.session.query(
+        Registro.id_persona, Registro.id_tipo_registro, Registro.fecha_hora
+    )
+    if fecha_inicio:
+        borrar = borrar.filter(Jornada.fecha >= fecha_inicio)
+        registros = registros.filter(
+            Registro.fecha_hora >= datetime.combine(fecha_inicio, datetime.min.time())
+        )
+    if fecha_fin:
+        borrar = borrar.filter(Jornada.fecha <= fecha_fin)
+        limite = datetime.combine(fecha_fin + timedelta(days=2), datetime.min.time())
+        registros = registros.filter(Registro.fecha_hora < limite)
+    borrar.delete(synchronize_session=False)
+
+    # Mismo orden que consulta_pares: a la misma hora la salida va primero
+    registros = registros.order_by(
+        Registro.id_persona,
+        Registro.fecha_hora,
+        Registro.id_tipo_registro.desc(),
+        Registro.registro_id,
+    ).yield_per(LOTE_RECONSTRUCCION)
+
+    total = 0
+    filas = []
+    actual = None
+    previa = None
+    cola = deque()
+
+    def guardar(jornada):
+        nonlocal total, filas
+        if jornada is None or (fecha_fin and jornada.fecha > fecha_fin):
+            return
+        filas.append(_fila_jornada(jornada))
+        total += 1
+        if len(filas) >= LOTE_RECONSTRUCCION:
+            db.session.execute(Jornada.__table__.insert(), filas)
+            filas = []
+
+    def dia_anterior():
+        # Dentro del rango la jornada previa está en memoria; la del día
+        # anterior al rango sigue en la tabla
+        if previa is not None:
+            return previa
+        if fecha_inicio and actual.fecha == fecha_inicio:
+            return db.session.get(Jornada, (actual.id_persona, actual.fecha - timedelta(days=1)))
+        return None
+
+    for id_persona, tipo, fecha_hora in registros:
+        fecha = fecha_hora.date()
+        if actual is None or (actual.id_persona, actual.fecha) != (id_persona, fecha):
+            # La jornada anterior se guarda cuando ya no la puede cerrar una salida
+            guardar(previa)
+            if actual is not None and (actual.id_persona, actual.fecha) == (
+                id_persona,
+                fecha - timedelta(days=1),
+            ):
+                previa = actual
+            else:
+                guardar(actual)
+                previa = None
+            actual = _nueva_jornada(id_persona, fecha)
+            cola = deque()
+        aplicar_jornada(actual, tipo, fecha_hora, cola, dia_anterior)
+
+    guardar(previa)
+    guardar(actual)
+    if filas:
+        db.session.execute(Jornada.__table__.insert(), filas)
+
+    db.session.commit()
+    return total
+
+
+def _ingreso_abierto(jornada):
+    # Ingreso más antiguo del día sin salida: los primeros `pares` ingresos ya se cerraron
+    inicio = datetime.combine(jornada.fecha, datetime.min.time())
+    return (
+        db.session.query(Registro.fecha_hora)
+        .filter(
+            Registro.id_persona == jornada.id_persona,
+            Registro.id_tipo_registro == TIPO_INGRESO,
+            Registro.fecha_hora >= inicio,
+            Registro.fecha_hora < inicio + timedelta(days=1),
+        )
+        .order_by(Registro.fecha_hora, Registro.registro_id)
+        .offset(jornada.pares)
+        .limit(1)
+        .scalar()
+    )
+
+
+def _nueva_jornada(id_persona, fecha):
+    return Jornada(
+        id_persona=id_persona, fecha=fecha, pares=0, minutos_trabajados=0, ingresos_abiertos=0
+    )
+
+
+def _fila_jornada(jornada):
+    return {
+        "id_persona": jornada.id_persona,
+        "fecha": jornada.fecha,
+        "fecha_hora_primer_ingreso": jornada.fecha_hora_primer_ingreso,
+        "fecha_hora_ultima_salida": jornada.fecha_hora_ultima_salida,
+        "pares": jornada.pares,
+        "minutos_trabajados": jornada.minutos_trabajados,
+        "fecha_hora_ingreso_abierto": jornada.fecha_hora_ingreso_abierto,
+        "ingresos_abiertos": jornada.ingresos_abiertos,
+        "fecha_actualizacion": datetime.now(),
+    }
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class LimitadorIntentos:
+    """
+    Limitador de ventana deslizante de intentos fallidos de PIN por dirección
+    del cliente. Se consulta antes de cualquier acceso a la base de datos para
+    rechazar rápidamente los barridos de PIN sin afectar a los quioscos que
+    marcan con PIN válidos.
+    """
+
+    def __init__(self, app=None):
+        self.max_fallos = 20
+        self.ventana = 60
+        self.max_direcciones = 10000
+        self._fallos = OrderedDict()
+        self._lock = threading.Lock()
+        self._metricas = {"fallos_registrados": 0, "intentos_rechazados": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_fallos = app.config.get("PIN_LIMITE_FALLOS", self.max_fallos)
+        self.ventana = app.config.get("PIN_LIMITE_VENTANA", self.ventana)
+        self.max_direcciones = app.config.get(
+            "PIN_LIMITE_DIRECCIONES", self.max_direcciones
+        )
+        with self._lock:
+            self._fallos.clear()
+        app.extensions["limitador_intentos"] = self
+
+    def permitir(self, direccion):
+        """Indica si la dirección puede intentar otra marcación"""
+        ahora = time.monotonic()
+        with self._lock:
+            fallos = self._fallos.get(direccion)
+            if fallos is None:
+                return True
+            self._descartar_vencidos(fallos, ahora)
+            if len(fallos) < self.max_fallos:
+                return True
+            self._metricas["intentos_rechazados"] += 1
+            return False
+
+    def registrar_fallo(self, direccion):
+        """Registra un intento fallido de la dirección dentro de la ventana"""
+        ahora = time.monotonic()
+        with self._lock:
+            fallos = self._fallos.get(direccion)
+            if fallos is None:
+                fallos = self._fallos[direccion] = deque()
+            else:
+                self._fallos.move_to_end(direccion)
+            self._descartar_vencidos(fallos, ahora)
+            fallos.append(ahora)
+            self._metricas["fallos_registrados"] += 1
+
+            while len(self._fallos) > self.max_direcciones:
+                self._fallos.popitem(last=False)
+
+    def estadisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["direcciones"] = len(self._fallos)
+        return metricas
+
+    def _descartar_vencidos(self, fallos, ahora):
+        # Debe llamarse con el lock adquirido
+        while fallos and fallos[0] <= ahora - self.ventana:
+            fallos.popleft()
+
+
+limitador_intentos = LimitadorIntentos()
@@ -0,0 +1,328 @@
+from datetime import date
+from flask import current_app
+from sqlalchemy import text
+from app import db
+
+TABLA = "registro"
+PREFIJO = "registro_p"
+# Recibe los registros fuera de los meses creados (reloj de un quiosco, cron atrasado)
+DEFAULT = "registro_default"
+
+
+def es_postgresql():
+    return db.engine.dialect.name == "postgresql"
+
+
+def esta_particionada():
+    """Indica si la tabla registro ya es una tabla particionada de PostgreSQL"""
+    tipo = db.session.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:tabla)"),
+        {"tabla": TABLA},
+    ).scalar()
+    return tipo == "p"
+
+
+def convertir_a_particionada(meses_adelante=None, conservar_original=False, simular=False):
+    """
+    Convierte la tabla registro en una tabla particionada por mes sobre
+    fecha_hora, en una sola transacción: renombra la tabla actual, crea la
+    tabla particionada con las mismas columnas, llaves foráneas e índices,
+    crea las particiones desde el mes del registro más antiguo más la
+    partición DEFAULT y copia los datos, verificando que se copiaron todas
+    las filas. La llave primaria pasa a ser (registro_id, fecha_hora) porque
+    PostgreSQL exige incluir la columna de partición; ninguna tabla tiene
+    llaves foráneas hacia registro. Con `simular` se ejecuta todo y se
+    revierte al final (el DDL de PostgreSQL es transaccional). Devuelve la
+    cantidad de particiones mensuales creadas y de filas copiadas.
+    """
+    if esta_particionada():
+        return 0, 0
+
+    sentencias = [
+        "ALTER TABLE registro RENAME TO registro_original",
+        "ALTER TABLE registro_original RENAME CONSTRAINT registro_pkey TO registro_original_pkey",
+        "ALTER INDEX IF EXISTS ix_registro_persona_tipo_fecha RENAME TO ix_registro_original_persona_tipo_fecha",
+        "ALTER INDEX IF EXISTS ix_registro_persona_fecha RENAME TO ix_registro_original_persona_fecha",
+        "ALTER INDEX IF EXISTS ix_registro_fecha_hora RENAME TO ix_registro_original_fecha_hora",
+        """
+        CREATE TABLE registro (
+            LIKE registro_original INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            PRIMARY KEY (registro_id, fecha_hora),
+            FOREIGN KEY (id_persona) REFERENCES persona (id_persona) ON DELETE CASCADE,
+            FOREIGN KEY (id_credencial) REFERENCES credencial (id_credencial) ON DELETE SET NULL,
+            FOREIGN KEY (id_tipo_registro) REFERENCES tipo_registro (id_tipo_registro)
+        ) PARTITION BY RANGE (fecha_hora)
+        """,
+        """
+        CREATE INDEX ix_registro_persona_tipo_fecha
+            ON registro (id_persona, id_tipo_registro, fecha_hora) INCLUDE (registro_id)
+        """,
+        """
+        CREATE INDEX ix_registro_persona_fecha
+            ON registro (id_persona, fecha_hora, registro_id)
+        """,
+        """
+        CREATE INDEX ix_registro_fecha_hora
+            ON registro (fecha_hora) INCLUDE (id_persona, id_tipo_registro)
+        """,
+    ]
+    for sentencia in sentencias:
+        db.session.execute(text(sentencia))
+
+    # Particiones desde el mes del registro más antiguo hasta los meses futuros
+    minimo, maximo = db.session.execute(
+        text("SELECT min(fecha_hora), max(fecha_hora) FROM registro_original")
+    ).one()
+    creadas = crear_particiones(
+        meses_adelante,
+        desde=minimo.date() if minimo else None,
+        hasta=maximo.date() if maximo else None,
+        confirmar=False,
+    )
+
+    crear_particion_default()
+
+    originales = db.session.execute(text("SELECT count(*) FROM registro_original")).scalar()
+    copiadas = db.session.execute(
+        text("INSERT INTO registro SELECT * FROM registro_original")
+    ).rowcount
+    if copiadas != originales:
+        db.session.rollback()
+        raise RuntimeError(
+            f"Se copiaron {copiadas} de {originales} registros; conversión revertida"
+        )
+
+    # La secuencia de registro_id debe sobrevivir a la tabla original
+    secuencia = db.session.execute(
+        text("SELECT pg_get_serial_sequence('registro_original', 'registro_id')")
+    ).scalar()
+    if secuencia:
+        db.session.execute(text(f"ALTER SEQUENCE {secuencia} OWNED BY registro.registro_id"))
+
+    if not conservar_original:
+        db.session.execute(text("DROP TABLE registro_original"))
+
+    if simular:
+        db.session.rollback()
+        return creadas, copiadas
+
+    db.session.execute(text("ANALYZE registro"))
+    db.session.commit()
+    return creadas, copiadas
+
+
+def crear_particion_default():
+    """Crea la partición DEFAULT de registro si no existe"""
+    db.session.execute(
+        text(f"CREATE TABLE IF NOT EXISTS {DEFAULT} PARTITION OF {TABLA} DEFAULT")
+    )
+
+
+def crear_particiones(meses_adelante=None, desde=None, hasta=None, confirmar=True):
+    """
+    Crea las particiones mensuales que falten desde `desde` (por defecto el
+    mes actual) hasta `meses_adelante` meses después del mes actual, o hasta
+    el mes de `hasta` si es posterior. Los registros de esos meses que ya
+    estén en la partición DEFAULT se mueven a la nueva partición. Devuelve
+    la cantidad de particiones creadas.
+    """
+    if meses_adelante is None:
+        meses_adelante = current_app.config.get("REGISTRO_PARTICIONES_ADELANTE", 3)
+
+    actual = _inicio_mes(desde or date.today())
+    limite = _sumar_meses(_inicio_mes(date.today()), meses_adelante)
+    if hasta is not None:
+        limite = max(limite, _inicio_mes(hasta))
+    existentes = set(_particiones())
+
+    creadas = 0
+    while actual <= limite:
+        if _nombre_particion(actual) not in existentes:
+            _crear_particion(actual)
+            creadas += 1
+        actual = _sumar_meses(actual, 1)
+
+    if confirmar:
+        db.session.commit()
+    return creadas
+
+
+def registros_en_default():
+    """
+    Registros que cayeron en la partición DEFAULT agrupados por mes:
+    lista de (primer día del mes, filas). Vacía si todo está en particiones mensuales.
+    """
+    if not _existe_default():
+        return []
+    filas = db.session.execute(
+        text(
+            f"""
+            SELECT date_trunc('month', fecha_hora)::date AS mes, count(*)
+            FROM {DEFAULT}
+            GROUP BY 1
+            ORDER BY 1
+            """
+        )
+    ).all()
+    return [(mes, total) for mes, total in filas]
+
+
+def reubicar_default(meses=None):
+    """
+    Crea las particiones mensuales de los meses que tienen registros en la
+    partición DEFAULT y mueve allí esas filas. Devuelve las particiones creadas.
+    """
+    if meses is None:
+        meses = [mes for mes, _ in registros_en_default()]
+    existentes = set(_particiones())
+
+    creadas = 0
+    for mes in meses:
+        if _nombre_particion(mes) not in existentes:
+            _crear_particion(_inicio_mes(mes))
+            creadas += 1
+    db.session.commit()
+    return creadas
+
+
+def aplicar_retencion(meses=None, accion=None):
+    """
+    Quita de la tabla registro las particiones cuyos datos son anteriores a
+    los últimos `meses` meses. Con accion "desacoplar" la partición queda
+    como tabla independiente (para archivarla); con "eliminar" se borra.
+    Un valor de meses 0 desactiva la retención. Devuelve los nombres afectados.
+    """
+    if meses is None:
+        meses = current_app.config.get("REGISTRO_RETENCION_MESES", 0)
+    if accion is None:
+        accion = current_app.config.get("REGISTRO_RETENCION_ACCION", "desacoplar")
+    if accion not in ("desacoplar", "eliminar"):
+        raise ValueError(f"Acción de retención no válida: {accion}")
+    if not meses:
+        return []
+
+    corte = _sumar_meses(_inicio_mes(date.today()), -meses)
+    afectadas = []
+    for nombre, inicio in _particiones().items():
+        # Solo particiones cuyo rango termina antes del corte
+        if _sumar_meses(inicio, 1) > corte:
+            continue
+        db.session.execute(text(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}"))
+        if accion == "eliminar":
+            db.session.execute(text(f"DROP TABLE {nombre}"))
+        afectadas.append(nombre)
+
+    db.session.commit()
+    return afectadas
+
+
+def mantener_particiones():
+    """
+    Crea las particiones futuras, reubica los registros que cayeron en la
+    partición DEFAULT (con una advertencia en el log) y aplica la retención
+    configurada. Devuelve (particiones creadas, particiones afectadas por la
+    retención, registros encontrados en DEFAULT por mes).
+    """
+    crear_particion_default()
+    creadas = crear_particiones()
+
+    en_default = registros_en_default()
+    if en_default:
+        detalle = ", ".join(f"{mes.strftime('%Y-%m')}: {total}" for mes, total in en_default)
+        current_app.logger.warning(
+            f"{DEFAULT} tiene registros fuera de las particiones mensuales ({detalle}); "
+            "se crean sus particiones"
+        )
+        creadas += reubicar_default([mes for mes, _ in en_default])
+
+    afectadas = aplicar_retencion()
+    return creadas, afectadas, en_default
+
+
+def listar_particiones():
+    """Devuelve (nombre, inicio del mes, filas estimadas) de cada partición mensual"""
+    filas = db.session.execute(
+        text(
+            """
+            SELECT c.relname, c.reltuples::bigint
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:tabla)
+            """
+        ),
+        {"tabla": TABLA},
+    ).all()
+
+    particiones = []
+    for nombre, estimadas in filas:
+        if not nombre.startswith(PREFIJO):
+            continue
+        anio, mes = nombre[len(PREFIJO):].split("_")
+        particiones.append((nombre, date(int(anio), int(mes), 1), max(estimadas, 0)))
+    return sorted(particiones, key=lambda particion: particion[1])
+
+
+def inicio_particiones():
+    """Primer día de la partición mensual más antigua (None si registro no está particionada)"""
+    if not es_postgresql() or not esta_particionada():
+        return None
+    particiones = listar_particiones()
+    return particiones[0][1] if particiones else None
+
+
+def _particiones():
+    # Particiones mensuales adjuntas a registro: nombre -> primer día del mes
+    return {nombre: inicio for nombre, inicio, _ in listar_particiones()}
+
+
+def _crear_particion(inicio):
+    nombre = _nombre_particion(inicio)
+    desde = inicio.isoformat()
+    hasta = _sumar_meses(inicio, 1).isoformat()
+
+    if not _existe_default() or not db.session.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT} "
+            "WHERE fecha_hora >= :desde AND fecha_hora < :hasta)"
+        ),
+        {"desde": desde, "hasta": hasta},
+    ).scalar():
+        db.session.execute(
+            text(
+                f"CREATE TABLE {nombre} PARTITION OF {TABLA} "
+                f"FOR VALUES FROM ('{desde}') TO ('{hasta}')"
+            )
+        )
+        return
+
+    # PostgreSQL no permite crear la partición si DEFAULT tiene filas de su
+    # rango: se crea aparte, se mueven las filas y luego se adjunta
+    sentencias = [
+        f"CREATE TABLE {nombre} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"INSERT INTO {nombre} SELECT * FROM {DEFAULT} "
+        "WHERE fecha_hora >= :desde AND fecha_hora < :hasta",
+        f"DELETE FROM {DEFAULT} WHERE fecha_hora >= :desde AND fecha_hora < :hasta",
+        f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} "
+        f"FOR VALUES FROM ('{desde}') TO ('{hasta}')",
+    ]
+    for sentencia in sentencias:
+        db.session.execute(text(sentencia), {"desde": desde, "hasta": hasta})
+
+
+def _existe_default():
+    return db.session.execute(
+        text("SELECT to_regclass(:tabla) IS NOT NULL"), {"tabla": DEFAULT}
+    ).scalar()
+
+
+def _nombre_particion(inicio):
+    return f"{PREFIJO}{inicio.year:04d}_{inicio.month:02d}"
+
+
+def _inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def _sumar_meses(fecha, meses):
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
@@ -0,0 +1,169 @@
+import random
+from collections import defaultdict
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.credencial import Credencial
+from app.models.tipo_credencial import TipoCredencial
+
+# Un PIN son las 3 primeras letras del nombre y 4 dígitos
+DIGITOS_PIN = 4
+SUFIJOS_POR_PREFIJO = 10**DIGITOS_PIN
+
+# Sufijos al azar que se verifican juntos antes de leer el prefijo completo
+CANDIDATOS_PIN = 64
+
+# Intentos si otra sesión guarda el mismo PIN antes que esta
+REINTENTOS_PIN = 5
+
+
+class PinesAgotados(ValueError):
+    """No quedan sufijos libres para el prefijo del nombre"""
+
+
+def prefijo_pin(primer_nombre):
+    """Tres primeras letras del nombre en mayúsculas, completadas con X"""
+    prefijo = (primer_nombre or "").strip().upper()[:3]
+    return prefijo.ljust(3, "X")
+
+
+def pines_usados(prefijos):
+    """
+    Valores de PIN existentes con alguno de los prefijos, en una sola
+    consulta. Cada prefijo se busca como rango sobre el índice único
+    (id_tipo_credencial, valor).
+    """
+    prefijos = set(prefijos)
+    if not prefijos:
+        return set()
+    ultimo = "9" * DIGITOS_PIN
+    consulta = (
+        db.select(Credencial.valor)
+        .join(TipoCredencial, Credencial.id_tipo_credencial == TipoCredencial.id_tipo_credencial)
+        .where(
+            TipoCredencial.nombre == "PIN",
+            db.or_(
+                *[
+                    Credencial.valor.between(f"{prefijo}{'0' * DIGITOS_PIN}", f"{prefijo}{ultimo}")
+                    for prefijo in prefijos
+                ]
+            ),
+        )
+    )
+    return set(db.session.execute(consulta).scalars())
+
+
+def asignar_pines(nombres, usados=None):
+    """
+    Asigna un PIN distinto a cada nombre sin consultar la base de datos por
+    PIN: se leen de una vez los valores usados de cada prefijo y se eligen
+    sufijos libres al azar. Devuelve una lista paralela a `nombres` con el
+    PIN o None si el prefijo ya no tiene sufijos libres.
+    """
+    prefijos = [prefijo_pin(nombre) for nombre in nombres]
+    if usados is None:
+        usados = pines_usados(prefijos)
+
+    posiciones = defaultdict(list)
+    for indice, prefijo in enumerate(prefijos):
+        posiciones[prefijo].append(indice)
+
+    pines = [None] * len(nombres)
+    for prefijo, indices in posiciones.items():
+        for indice, pin in zip(indices, _sufijos_libres(prefijo, len(indices), usados)):
+            pines[indice] = pin
+    return pines
+
+
+def _sufijos_libres(prefijo, cantidad, usados):
+    # Con el prefijo poco ocupado basta sortear unos pocos sufijos; si se
+    # acumulan rechazos se recorre el rango completo y se elige entre los libres
+    elegidos = set()
+    for _ in range(cantidad * 4):
+        pin = f"{prefijo}{random.randrange(SUFIJOS_POR_PREFIJO):0{DIGITOS_PIN}d}"
+        if pin not in usados:
+            elegidos.add(pin)
+            if len(elegidos) == cantidad:
+                return list(elegidos)
+
+    libres = [
+        pin
+        for pin in (f"{prefijo}{numero:0{DIGITOS_PIN}d}" for numero in range(SUFIJOS_POR_PREFIJO))
+        if pin not in usados and pin not in elegidos
+    ]
+    return list(elegidos) + random.sample(libres, min(cantidad - len(elegidos), len(libres)))
+
+
+def generar_pin(primer_nombre, descartados=()):
+    """
+    Devuelve un PIN libre para el nombre. Se verifica un lote de sufijos al
+    azar en una sola consulta; solo si todos están usados (prefijo casi
+    lleno) se leen los valores del prefijo y se elige entre los libres.
+    Lanza PinesAgotados si el prefijo ya usa los 10.000 sufijos.
+    """
+    prefijo = prefijo_pin(primer_nombre)
+    candidatos = {
+        f"{prefijo}{numero:0{DIGITOS_PIN}d}"
+        for numero in random.sample(range(SUFIJOS_POR_PREFIJO), CANDIDATOS_PIN)
+    } - set(descartados)
+    libres = candidatos - _valores_existentes(candidatos)
+    if libres:
+        return random.choice(sorted(libres))
+
+    pin = asignar_pines([primer_nombre], pines_usados([prefijo]) | set(descartados))[0]
+    if pin is None:
+        raise PinesAgotados(f"No hay PIN disponibles para el prefijo {prefijo}")
+    return pin
+
+
+def _valores_existentes(valores):
+    if not valores:
+        return set()
+    consulta = (
+        db.select(Credencial.valor)
+        .join(TipoCredencial, Credencial.id_tipo_credencial == TipoCredencial.id_tipo_credencial)
+        .where(TipoCredencial.nombre == "PIN", Credencial.valor.in_(valores))
+    )
+    return set(db.session.execute(consulta).scalars())
+
+
+def id_tipo_pin():
+    """Id del tipo de credencial PIN (se crea si no existe)"""
+    tipo_pin = TipoCredencial.query.filter_by(nombre="PIN").first()
+    if not tipo_pin:
+        tipo_pin = TipoCredencial(nombre="PIN")
+        db.session.add(tipo_pin)
+        db.session.flush()
+    return tipo_pin.id_tipo_credencial
+
+
+def crear_credencial_pin(id_persona, primer_nombre):
+    """
+    Crea la credencial PIN de la persona en la transacción actual. Si otra
+    sesión guarda el mismo PIN primero, la restricción uk_credencial_tipo_valor
+    lo rechaza dentro de un savepoint y se elige otro sin perder el resto de
+    la transacción. Devuelve la credencial.
+    """
+    id_tipo = id_tipo_pin()
+    # Los cambios pendientes se guardan antes para que sus errores no se confundan con el PIN
+    db.session.flush()
+    descartados = set()
+    for _ in range(REINTENTOS_PIN):
+        credencial = Credencial(
+            id_persona=id_persona,
+            id_tipo_credencial=id_tipo,
+            valor=generar_pin(primer_nombre, descartados),
+            activo=True,
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(credencial)
+        except IntegrityError:
+            descartados.add(credencial.valor)
+            continue
+        return credencial
+
+    raise PinesAgotados(
+        f"No se pudo asignar un PIN para el prefijo {prefijo_pin(primer_nombre)}; intente de nuevo"
+    )
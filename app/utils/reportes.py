@@ -0,0 +1,518 @@
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from itertools import groupby
+from types import SimpleNamespace
+
+from app import db
+from app.models.persona import Persona, escapar_like, normalizar_texto
+from app.models.registro import Registro
+from app.models.jornada import Jornada
+from app.utils.archivo import archivado_hasta, leer_archivados, leer_manifiesto
+
+TIPO_INGRESO = 1
+TIPO_SALIDA = 2
+
+# Filtros del reporte de asistencia (fechas como objetos date o None)
+FiltrosReporte = namedtuple(
+    "FiltrosReporte", ["busqueda_nombre", "fecha_inicio", "fecha_fin"]
+)
+
+
+def parsear_filtros(args):
+    """
+    Obtiene los filtros del reporte desde los parámetros de la petición.
+    Las fechas inválidas se ignoran y un rango invertido se intercambia.
+    """
+    busqueda_nombre = (args.get("busqueda_nombre") or "").strip()
+    fecha_inicio = _parsear_fecha(args.get("fecha_inicio"))
+    fecha_fin = _parsear_fecha(args.get("fecha_fin"))
+
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        # Si la fecha de inicio es mayor que la fecha de fin, intercambiar las fechas
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+
+    return FiltrosReporte(busqueda_nombre, fecha_inicio, fecha_fin)
+
+
+def filtrar_registros(query, filtros):
+    """Aplica los filtros de nombre y rango de fechas a una consulta sobre Registro"""
+    if filtros.busqueda_nombre:
+        query = query.filter(
+            Registro.id_persona.in_(personas_por_nombre(filtros.busqueda_nombre))
+        )
+
+    if filtros.fecha_inicio:
+        query = query.filter(
+            Registro.fecha_hora >= datetime.combine(filtros.fecha_inicio, datetime.min.time())
+        )
+
+    if filtros.fecha_fin:
+        # Para la fecha fin, incluir todo el día (hasta las 23:59:59)
+        query = query.filter(
+            Registro.fecha_hora <= datetime.combine(filtros.fecha_fin, datetime.max.time())
+        )
+
+    return query
+
+
+def personas_por_nombre(busqueda_nombre):
+    """
+    Subconsulta de id_persona cuyo nombre completo contiene todos los términos.
+    Compara contra Persona.nombre_busqueda (sin tildes ni mayúsculas), que en
+    PostgreSQL usa el índice de trigramas.
+    """
+    condiciones = [
+        Persona.nombre_busqueda.like(f"%{escapar_like(term)}%", escape="\\")
+        for term in normalizar_texto(busqueda_nombre).split()
+    ]
+    return db.session.query(Persona.id_persona).filter(db.and_(*condiciones))
+
+
+def consulta_pares(filtros, columna="fecha", descendente=True):
+    """
+    Construye la consulta que empareja ingresos y salidas en la base de datos
+    con la regla de la vista original: por persona y día, cada salida (en
+    orden) toma el primer ingreso anterior que aún no tiene salida; los
+    ingresos y salidas que quedan sin pareja se devuelven solos. Con un saldo
+    acumulado de +1 por ingreso y -1 por salida, una salida no tiene ingreso
+    cuando el saldo baja de cero y de su mínimo anterior, y la n-ésima salida
+    emparejada corresponde al n-ésimo ingreso. Devuelve filas con
+    registro_id, id_persona, nombres, fecha, fecha_hora_entrada y
+    fecha_hora_salida ordenadas por `columna` ("fecha" o "empleado");
+    ordenar_pares reproduce el mismo orden en memoria.
+    """
+    fecha = db.func.date(Registro.fecha_hora, type_=db.Date)
+    es_ingreso = Registro.id_tipo_registro == TIPO_INGRESO
+    ventana = {
+        "partition_by": (Registro.id_persona, fecha),
+        # A la misma hora la salida va primero: solo toma ingresos anteriores
+        "order_by": (Registro.fecha_hora, Registro.id_tipo_registro.desc(), Registro.registro_id),
+        "rows": (None, 0),
+    }
+
+    acumulados = filtrar_registros(
+        db.session.query(
+            Registro.registro_id.label("registro_id"),
+            Registro.id_persona.label("id_persona"),
+            Registro.id_tipo_registro.label("tipo"),
+            Registro.fecha_hora.label("fecha_hora"),
+            fecha.label("fecha"),
+            db.func.sum(db.case((es_ingreso, 1), else_=-1)).over(**ventana).label("saldo"),
+            db.func.sum(db.case((es_ingreso, 1), else_=0)).over(**ventana).label("ingresos"),
+            db.func.sum(db.case((es_ingreso, 0), else_=1)).over(**ventana).label("salidas"),
+        ),
+        filtros,
+    ).subquery()
+
+    con_minimo = db.session.query(
+        acumulados,
+        db.func.min(acumulados.c.saldo)
+        .over(
+            partition_by=(acumulados.c.id_persona, acumulados.c.fecha),
+            order_by=(
+                acumulados.c.fecha_hora,
+                acumulados.c.tipo.desc(),
+                acumulados.c.registro_id,
+            ),
+            rows=(None, -1),
+        )
+        .label("minimo_anterior"),
+    ).subquery()
+
+    sin_ingreso = db.and_(
+        con_minimo.c.tipo == TIPO_SALIDA,
+        con_minimo.c.saldo < 0,
+        db.or_(
+            con_minimo.c.minimo_anterior.is_(None),
+            con_minimo.c.saldo < con_minimo.c.minimo_anterior,
+        ),
+    )
+    # Posición del ingreso en el día o del ingreso que toma la salida (None si no toma ninguno)
+    numero = db.case(
+        (con_minimo.c.tipo == TIPO_INGRESO, con_minimo.c.ingresos),
+        (sin_ingreso, None),
+        else_=con_minimo.c.salidas
+        + db.case((con_minimo.c.minimo_anterior < 0, con_minimo.c.minimo_anterior), else_=0),
+    )
+    eventos = db.session.query(
+        con_minimo.c.registro_id,
+        con_minimo.c.id_persona,
+        con_minimo.c.tipo,
+        con_minimo.c.fecha_hora,
+        con_minimo.c.fecha,
+        numero.label("numero"),
+    ).cte("eventos")
+    salidas = eventos.alias("salidas")
+
+    fecha_hora_entrada = db.case(
+        (eventos.c.tipo == TIPO_INGRESO, eventos.c.fecha_hora)
+    ).label("fecha_hora_entrada")
+    fecha_hora_salida = db.case(
+        (eventos.c.tipo == TIPO_SALIDA, eventos.c.fecha_hora),
+        else_=salidas.c.fecha_hora,
+    ).label("fecha_hora_salida")
+
+    direccion = db.desc if descendente else db.asc
+    hora = db.func.coalesce(fecha_hora_entrada, fecha_hora_salida)
+    if columna == "empleado":
+        # Los nombres vacíos ordenan como "" en cualquier motor (NULL cambia de lugar)
+        orden = [
+            direccion(Persona.primer_nombre),
+            direccion(db.func.coalesce(Persona.segundo_nombre, "")),
+            direccion(Persona.primer_apellido),
+            direccion(db.func.coalesce(Persona.segundo_apellido, "")),
+            eventos.c.fecha.desc(),
+            hora.desc(),
+        ]
+    else:
+        orden = [direccion(eventos.c.fecha), direccion(hora)]
+    # registro_id desempata filas iguales para que la paginación sea estable
+    orden.append(direccion(eventos.c.registro_id))
+
+    return (
+        db.session.query(
+            eventos.c.registro_id,
+            eventos.c.id_persona,
+            Persona.primer_nombre,
+            Persona.segundo_nombre,
+            Persona.primer_apellido,
+            Persona.segundo_apellido,
+            eventos.c.fecha,
+            fecha_hora_entrada,
+            fecha_hora_salida,
+        )
+        .select_from(eventos)
+        .join(Persona, Persona.id_persona == eventos.c.id_persona)
+        .outerjoin(
+            salidas,
+            db.and_(
+                eventos.c.tipo == TIPO_INGRESO,
+                salidas.c.tipo == TIPO_SALIDA,
+                salidas.c.id_persona == eventos.c.id_persona,
+                salidas.c.fecha == eventos.c.fecha,
+                salidas.c.numero == eventos.c.numero,
+            ),
+        )
+        .filter(db.or_(eventos.c.tipo == TIPO_INGRESO, eventos.c.numero.is_(None)))
+        .order_by(*orden)
+    )
+
+
+def obtener_pares(filtros):
+    """
+    Devuelve los pares ingreso/salida del reporte listos para la plantilla,
+    incluidos los días que ya se movieron al archivo
+    """
+    calientes, archivados = dividir_por_archivo(filtros)
+    pares = [fila_a_par(fila) for fila in consulta_pares(calientes)] if calientes else []
+    if archivados:
+        pares.extend(pares_archivados(archivados))
+    return pares
+
+
+def pagina_pares(filtros, inicio, longitud, busqueda="", columna="fecha", descendente=True):
+    """
+    Devuelve una página de pares para la tabla del reporte y los conteos que
+    necesita DataTables: (total, filtrados, pares). `total` respeta los
+    filtros del formulario y `filtrados` además la búsqueda de la tabla, que
+    se aplica como términos adicionales sobre el nombre del empleado.
+    """
+    busqueda = (busqueda or "").strip()
+    filtros_busqueda = filtros
+    if busqueda:
+        filtros_busqueda = filtros._replace(
+            busqueda_nombre=f"{filtros.busqueda_nombre} {busqueda}".strip()
+        )
+
+    calientes, archivados = dividir_por_archivo(filtros_busqueda)
+    if archivados is None:
+        total = consulta_pares(filtros).order_by(None).count()
+        filtrados = consulta_pares(filtros_busqueda).order_by(None).count() if busqueda else total
+        filas = (
+            consulta_pares(filtros_busqueda, columna, descendente)
+            .offset(inicio)
+            .limit(longitud)
+        )
+        return total, filtrados, [fila_a_par(fila) for fila in filas]
+
+    # El rango incluye días archivados: se leen una sola vez con los filtros
+    # del formulario y la búsqueda de la tabla se aplica en memoria
+    archivo_total = pares_archivados(archivados._replace(busqueda_nombre=filtros.busqueda_nombre))
+    pares_archivo = _filtrar_por_nombre(archivo_total, busqueda)
+
+    total, filtrados = len(archivo_total), len(pares_archivo)
+    pares_calientes = []
+    if calientes:
+        total_calientes = (
+            consulta_pares(calientes._replace(busqueda_nombre=filtros.busqueda_nombre))
+            .order_by(None)
+            .count()
+        )
+        total += total_calientes
+        filtrados += (
+            consulta_pares(calientes).order_by(None).count() if busqueda else total_calientes
+        )
+        filas = consulta_pares(calientes, columna, descendente).limit(inicio + longitud)
+        pares_calientes = [fila_a_par(fila) for fila in filas]
+
+    if columna == "empleado":
+        combinados = ordenar_pares(pares_calientes + pares_archivo, columna, descendente)
+    elif not descendente:
+        combinados = pares_archivo[::-1] + pares_calientes
+    else:
+        # Los días archivados son siempre anteriores a los de la tabla registro
+        combinados = pares_calientes + pares_archivo
+
+    return total, filtrados, combinados[inicio : inicio + longitud]
+
+
+def paginar_pares(pares, inicio, longitud, busqueda="", columna="fecha", descendente=True):
+    """
+    Versión en memoria de pagina_pares para pares ya calculados (ordenados
+    por fecha descendente), por ejemplo desde el cache de reportes.
+    """
+    total = len(pares)
+    pares = _filtrar_por_nombre(pares, busqueda)
+    filtrados = len(pares)
+
+    return total, filtrados, ordenar_pares(pares, columna, descendente)[inicio : inicio + longitud]
+
+
+def ordenar_pares(pares, columna="fecha", descendente=True):
+    """
+    Ordena en memoria pares en orden de fecha descendente con las mismas
+    claves que consulta_pares: por fecha y hora o, para "empleado", por cada
+    parte del nombre (vacías como "") y luego fecha y hora descendentes,
+    siempre con registro_id como desempate.
+    """
+    if columna != "empleado":
+        return pares if descendente else pares[::-1]
+
+    # Ordenamientos estables de la clave menos a la más significativa
+    pares = sorted(pares, key=lambda par: par["registro_id"], reverse=descendente)
+    pares.sort(
+        key=lambda par: (par["fecha"], par["hora_entrada"] or par["hora_salida"]),
+        reverse=True,
+    )
+    pares.sort(key=lambda par: par["nombres"], reverse=descendente)
+    return pares
+
+
+def dividir_por_archivo(filtros):
+    """
+    Separa los filtros en la parte que se lee de la tabla registro y la que
+    corresponde a días archivados. Devuelve (filtros_registro, filtros_archivo);
+    cualquiera de los dos es None si el rango no la incluye.
+    """
+    limite = archivado_hasta()
+    if limite is None or (filtros.fecha_inicio and filtros.fecha_inicio >= limite):
+        return filtros, None
+
+    ultimo_archivado = limite - timedelta(days=1)
+    archivados = filtros._replace(
+        fecha_fin=min(filtros.fecha_fin, ultimo_archivado) if filtros.fecha_fin else ultimo_archivado
+    )
+    if filtros.fecha_fin and filtros.fecha_fin < limite:
+        return None, archivados
+    return filtros._replace(fecha_inicio=limite), archivados
+
+
+def pares_archivados(filtros):
+    """
+    Empareja en Python los registros de días archivados (archivos más los
+    registros que aún queden en la tabla para esas fechas) con la misma regla
+    que consulta_pares. Devuelve los pares ordenados por fecha descendente.
+    """
+    return list(iterar_pares_archivados(filtros))
+
+
+def iterar_pares_archivados(filtros):
+    """
+    Versión por mes de pares_archivados para la exportación: recorre los
+    meses del más reciente al más antiguo y lee cada archivo una sola vez,
+    así que la memoria depende de los registros de un mes y no del rango.
+    """
+    fecha_fin = filtros.fecha_fin
+    if fecha_fin is None:
+        limite = archivado_hasta()
+        if limite is None:
+            return
+        fecha_fin = limite - timedelta(days=1)
+    fecha_inicio = filtros.fecha_inicio or _primer_dia_archivado(fecha_fin)
+    if fecha_inicio is None:
+        return
+
+    while fecha_fin >= fecha_inicio:
+        inicio_mes = max(fecha_fin.replace(day=1), fecha_inicio)
+        yield from _pares_archivados_rango(
+            filtros._replace(fecha_inicio=inicio_mes, fecha_fin=fecha_fin)
+        )
+        fecha_fin = fecha_fin.replace(day=1) - timedelta(days=1)
+
+
+def _primer_dia_archivado(fecha_fin):
+    # Primer día con registros archivados o aún en la tabla hasta fecha_fin
+    candidatos = [entrada["desde"] for entrada in leer_manifiesto()["archivos"]]
+    minimo = (
+        db.session.query(db.func.min(Registro.fecha_hora))
+        .filter(Registro.fecha_hora <= datetime.combine(fecha_fin, datetime.max.time()))
+        .scalar()
+    )
+    if minimo is not None:
+        candidatos.append(minimo.date())
+    return min(candidatos, default=None)
+
+
+def _pares_archivados_rango(filtros):
+    registros = {}
+    for fila in leer_archivados(filtros.fecha_inicio, filtros.fecha_fin):
+        registros[fila["registro_id"]] = fila
+
+    restantes = filtrar_registros(
+        db.session.query(
+            Registro.registro_id,
+            Registro.id_persona,
+            Registro.id_tipo_registro,
+            Registro.fecha_hora,
+            Persona.primer_nombre,
+            Persona.segundo_nombre,
+            Persona.primer_apellido,
+            Persona.segundo_apellido,
+        ).join(Persona, Persona.id_persona == Registro.id_persona),
+        filtros._replace(busqueda_nombre=""),
+    )
+    for fila in restantes:
+        registros[fila.registro_id] = fila._asdict()
+
+    terminos = normalizar_texto(filtros.busqueda_nombre).split()
+    eventos = [
+        SimpleNamespace(**fila)
+        for fila in registros.values()
+        if all(
+            termino in normalizar_texto(nombre_completo(SimpleNamespace(**fila)))
+            for termino in terminos
+        )
+    ]
+    # A la misma hora la salida va primero, como en consulta_pares
+    eventos.sort(key=lambda e: (e.id_persona, e.fecha_hora, -e.id_tipo_registro, e.registro_id))
+
+    pares = []
+    for _, grupo in groupby(eventos, key=lambda e: (e.id_persona, e.fecha_hora.date())):
+        # Cada salida toma el primer ingreso anterior que sigue sin salida
+        pendientes = deque()
+        ingresos = []
+        salida_de = {}
+        for evento in grupo:
+            if evento.id_tipo_registro == TIPO_INGRESO:
+                pendientes.append(evento)
+                ingresos.append(evento)
+            elif pendientes:
+                salida_de[pendientes.popleft().registro_id] = evento.fecha_hora
+            else:
+                pares.append(_par_archivado(evento, None, evento.fecha_hora))
+        for evento in ingresos:
+            pares.append(
+                _par_archivado(evento, evento.fecha_hora, salida_de.get(evento.registro_id))
+            )
+
+    pares.sort(key=lambda par: par[0], reverse=True)
+    return [par for _, par in pares]
+
+
+def _par_archivado(evento, entrada, salida):
+    # (clave de orden, par) con el mismo orden que consulta_pares por fecha
+    par = fila_a_par(
+        SimpleNamespace(
+            registro_id=evento.registro_id,
+            id_persona=evento.id_persona,
+            primer_nombre=evento.primer_nombre,
+            segundo_nombre=evento.segundo_nombre,
+            primer_apellido=evento.primer_apellido,
+            segundo_apellido=evento.segundo_apellido,
+            fecha=evento.fecha_hora.date(),
+            fecha_hora_entrada=entrada,
+            fecha_hora_salida=salida,
+        )
+    )
+    return (evento.fecha_hora.date(), entrada or salida, evento.registro_id), par
+
+
+def _filtrar_por_nombre(pares, busqueda):
+    # Misma comparación que personas_por_nombre, sobre pares ya calculados
+    terminos = normalizar_texto(busqueda).split()
+    if not terminos:
+        return pares
+    return [
+        par
+        for par in pares
+        if all(termino in normalizar_texto(par["empleado"]) for termino in terminos)
+    ]
+
+
+def consulta_resumen(filtros):
+    """
+    Totales por persona en el rango a partir de la tabla jornada (una fila
+    por persona y día) en lugar de recorrer los registros.
+    """
+    query = db.session.query(
+        Jornada.id_persona,
+        Persona.primer_nombre,
+        Persona.segundo_nombre,
+        Persona.primer_apellido,
+        Persona.segundo_apellido,
+        db.func.count().label("dias"),
+        db.func.sum(Jornada.pares).label("pares"),
+        db.func.sum(Jornada.minutos_trabajados).label("minutos_trabajados"),
+        db.func.count(Jornada.fecha_hora_ingreso_abierto).label("jornadas_abiertas"),
+        db.func.min(Jornada.fecha_hora_primer_ingreso).label("primer_ingreso"),
+        db.func.max(Jornada.fecha_hora_ultima_salida).label("ultima_salida"),
+    ).join(Persona, Persona.id_persona == Jornada.id_persona)
+
+    if filtros.busqueda_nombre:
+        query = query.filter(
+            Jornada.id_persona.in_(personas_por_nombre(filtros.busqueda_nombre))
+        )
+    if filtros.fecha_inicio:
+        query = query.filter(Jornada.fecha >= filtros.fecha_inicio)
+    if filtros.fecha_fin:
+        query = query.filter(Jornada.fecha <= filtros.fecha_fin)
+
+    return query.group_by(
+        Jornada.id_persona,
+        Persona.primer_nombre,
+        Persona.segundo_nombre,
+        Persona.primer_apellido,
+        Persona.segundo_apellido,
+    ).order_by(Persona.primer_nombre, Persona.primer_apellido, Jornada.id_persona)
+
+
+def fila_a_par(fila):
+    """Convierte una fila de consulta_pares al formato usado por las vistas"""
+    return {
+        "registro_id": fila.registro_id,
+        "id_persona": fila.id_persona,
+        "empleado": nombre_completo(fila),
+        # Partes del nombre para ordenar igual que la consulta
+        "nombres": (
+            fila.primer_nombre,
+            fila.segundo_nombre or "",
+            fila.primer_apellido,
+            fila.segundo_apellido or "",
+        ),
+        "fecha": fila.fecha,
+        "hora_entrada": fila.fecha_hora_entrada.time() if fila.fecha_hora_entrada else None,
+        "hora_salida": fila.fecha_hora_salida.time() if fila.fecha_hora_salida else None,
+    }
+
+
+def nombre_completo(fila):
+    return f"{fila.primer_nombre} {fila.segundo_nombre if fila.segundo_nombre else ''} {fila.primer_apellido} {fila.segundo_apellido if fila.segundo_apellido else ''}".strip()
+
+
+def _parsear_fecha(valor):
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except ValueError:
+        return None
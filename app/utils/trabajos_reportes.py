@@ -0,0 +1,354 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.utils.exportacion import exportar_csv, exportar_xlsx, nombre_archivo
+
+PENDIENTE = "pendiente"
+EJECUTANDO = "ejecutando"
+TERMINADO = "terminado"
+ERROR = "error"
+CANCELADO = "cancelado"
+
+FINALIZADOS = (TERMINADO, ERROR, CANCELADO)
+
+# Segundos entre limpiezas de trabajos vencidos y entre publicaciones del avance
+INTERVALO_PURGA = 60
+INTERVALO_AVANCE = 2
+
+
+class TrabajoCancelado(Exception):
+    pass
+
+
+class TrabajosReportes:
+    """
+    Generación de reportes grandes en segundo plano con un pool de hilos
+    local, sin broker externo: se envía el pedido, se consulta su estado y
+    se descarga el archivo cuando termina. El estado de cada trabajo se
+    guarda como JSON junto al archivo generado, de modo que cualquier proceso
+    puede consultarlo; los trabajos finalizados vencen después de
+    REPORTES_TRABAJOS_VENCIMIENTO segundos y se eliminan con su archivo.
+    La cancelación desde otro proceso deja además un archivo marcador que
+    el proceso que ejecuta el trabajo no sobrescribe al publicar el avance.
+    """
+
+    def __init__(self, app=None):
+        self.max_concurrentes = 2
+        self.max_pendientes = 10
+        self.vencimiento = 3600
+        self.tiempo_max = 1800
+        self.directorio = None
+        self._app = None
+        self._ejecutor = None
+        self._futuros = {}
+        self._cancelaciones = {}
+        self._ultima_purga = 0.0
+        self._lock = threading.Lock()
+        self._metricas = {
+            "enviados": 0,
+            "terminados": 0,
+            "errores": 0,
+            "cancelados": 0,
+            "rechazados": 0,
+            "vencidos": 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.max_concurrentes = app.config.get("REPORTES_TRABAJOS_MAX", self.max_concurrentes)
+        self.max_pendientes = app.config.get(
+            "REPORTES_TRABAJOS_PENDIENTES_MAX", self.max_pendientes
+        )
+        self.vencimiento = app.config.get("REPORTES_TRABAJOS_VENCIMIENTO", self.vencimiento)
+        self.tiempo_max = app.config.get("REPORTES_TRABAJOS_TIEMPO_MAX", self.tiempo_max)
+        self.directorio = app.config.get("REPORTES_TRABAJOS_DIR") or os.path.join(
+            app.instance_path, "reportes_trabajos"
+        )
+        app.extensions["trabajos_reportes"] = self
+
+    def enviar(self, filtros, formato, id_usuario):
+        """
+        Encola la generación del reporte y devuelve el estado inicial del
+        trabajo. Lanza ValueError si ya hay demasiados trabajos en curso.
+        """
+        self.purgar_vencidos()
+        with self._lock:
+            if len(self._futuros) >= self.max_pendientes:
+                self._metricas["rechazados"] += 1
+                raise ValueError(
+                    "Hay demasiados reportes en proceso. Intente de nuevo más tarde."
+                )
+            if self._ejecutor is None:
+                self._iniciar()
+
+        trabajo = {
+            "id": uuid.uuid4().hex,
+            "estado": PENDIENTE,
+            "formato": formato,
+            "archivo": nombre_archivo(filtros, formato),
+            "filtros": {
+                "busqueda_nombre": filtros.busqueda_nombre,
+                "fecha_inicio": filtros.fecha_inicio.isoformat() if filtros.fecha_inicio else None,
+                "fecha_fin": filtros.fecha_fin.isoformat() if filtros.fecha_fin else None,
+            },
+            "id_usuario": id_usuario,
+            "creado": _ahora(),
+            "iniciado": None,
+            "terminado": None,
+            "expira": None,
+            "bytes": 0,
+            "mensaje": None,
+        }
+        self._guardar(trabajo)
+
+        evento = threading.Event()
+        with self._lock:
+            self._cancelaciones[trabajo["id"]] = evento
+            self._futuros[trabajo["id"]] = self._ejecutor.submit(
+                self._ejecutar, trabajo["id"], filtros, formato, evento
+            )
+            self._metricas["enviados"] += 1
+        return trabajo
+
+    def obtener(self, id_trabajo):
+        """Devuelve el estado del trabajo o None si no existe o ya venció"""
+        self.purgar_vencidos()
+        return self._leer(id_trabajo)
+
+    def listar(self, id_usuario):
+        """Trabajos no vencidos del usuario, del más reciente al más antiguo"""
+        self.purgar_vencidos()
+        trabajos = [
+            trabajo
+            for trabajo in self._todos()
+            if trabajo["id_usuario"] == id_usuario
+        ]
+        return sorted(trabajos, key=lambda trabajo: trabajo["creado"], reverse=True)
+
+    def cancelar(self, id_trabajo):
+        """
+        Cancela un trabajo pendiente o en ejecución. El hilo que lo ejecuta
+        revisa la cancelación entre bloques y descarta el archivo parcial.
+        Devuelve el estado actualizado o None si el trabajo no existe.
+        """
+        trabajo = self._leer(id_trabajo)
+        if trabajo is None or trabajo["estado"] in FINALIZADOS:
+            return trabajo
+
+        with self._lock:
+            evento = self._cancelaciones.get(id_trabajo)
+            futuro = self._futuros.get(id_trabajo)
+        if futuro is not None and futuro.done():
+            # El hilo ya lo finalizó (o está por quitarlo): devolver su estado final
+            return self._leer(id_trabajo)
+        if futuro is not None and not futuro.cancel():
+            # En ejecución en este proceso: el hilo marca el trabajo al detenerse
+            evento.set()
+            trabajo["mensaje"] = "Cancelando reporte"
+            return trabajo
+
+        if futuro is None:
+            # Lo ejecuta (o lo tiene en cola) otro proceso: lo detiene el marcador
+            _tocar(self._ruta(id_trabajo, "cancelado"))
+        self._quitar(id_trabajo)
+        self._finalizar(trabajo, CANCELADO, "Reporte cancelado")
+        return trabajo
+
+    def ruta_resultado(self, trabajo):
+        """Ruta del archivo generado si el trabajo terminó correctamente"""
+        if trabajo["estado"] != TERMINADO:
+            return None
+        ruta = self._ruta(trabajo["id"], trabajo["formato"])
+        return ruta if os.path.exists(ruta) else None
+
+    def purgar_vencidos(self, forzar=False):
+        """Elimina el estado y los archivos de los trabajos vencidos"""
+        with self._lock:
+            if not forzar and time.monotonic() - self._ultima_purga < INTERVALO_PURGA:
+                return 0
+            self._ultima_purga = time.monotonic()
+
+        ahora = _ahora()
+        # Trabajos sin terminar de un proceso que ya no existe
+        abandonados = (
+            datetime.now() - timedelta(seconds=self.tiempo_max + self.vencimiento)
+        ).isoformat(timespec="seconds")
+
+        eliminados = 0
+        for trabajo in self._todos():
+            if trabajo["expira"]:
+                vencido = trabajo["expira"] < ahora
+            else:
+                vencido = trabajo["creado"] < abandonados
+            if vencido:
+                self._eliminar(trabajo)
+                eliminados += 1
+
+        with self._lock:
+            self._metricas["vencidos"] += eliminados
+        return eliminados
+
+    def estadisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["en_curso"] = len(self._futuros)
+            metricas["max_concurrentes"] = self.max_concurrentes
+        return metricas
+
+    def detener(self):
+        """Cancela los trabajos en curso y espera a que terminen los hilos"""
+        with self._lock:
+            eventos = list(self._cancelaciones.values())
+            ejecutor, self._ejecutor = self._ejecutor, None
+        for evento in eventos:
+            evento.set()
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=True, cancel_futures=True)
+
+    def _iniciar(self):
+        # Debe llamarse con el lock adquirido
+        os.makedirs(self.directorio, exist_ok=True)
+        self._ejecutor = ThreadPoolExecutor(
+            max_workers=self.max_concurrentes, thread_name_prefix="trabajos-reportes"
+        )
+        atexit.register(self.detener)
+
+    def _ejecutar(self, id_trabajo, filtros, formato, evento):
+        trabajo = self._leer(id_trabajo)
+        if trabajo is None or trabajo["estado"] != PENDIENTE:
+            self._quitar(id_trabajo)
+            return
+
+        trabajo["estado"] = EJECUTANDO
+        trabajo["iniciado"] = _ahora()
+        self._guardar(trabajo)
+
+        ruta = self._ruta(id_trabajo, formato)
+        limite = time.monotonic() + self.tiempo_max
+        try:
+            with self._app.app_context():
+                generador = exportar_csv(filtros) if formato == "csv" else exportar_xlsx(filtros)
+                guardado = time.monotonic()
+                with open(f"{ruta}.tmp", "wb") as archivo:
+                    for bloque in generador:
+                        self._verificar(id_trabajo, evento, limite)
+                        archivo.write(bloque)
+                        trabajo["bytes"] += len(bloque)
+                        # Publicar el avance cada pocos segundos para la consulta de estado
+                        if time.monotonic() - guardado > INTERVALO_AVANCE:
+                            self._verificar(id_trabajo, evento, limite)
+                            self._guardar(trabajo)
+                            guardado = time.monotonic()
+                self._verificar(id_trabajo, evento, limite)
+            os.replace(f"{ruta}.tmp", ruta)
+            self._finalizar(trabajo, TERMINADO)
+        except TrabajoCancelado as e:
+            _borrar(f"{ruta}.tmp")
+            self._finalizar(trabajo, CANCELADO, str(e))
+        except Exception as e:
+            _borrar(f"{ruta}.tmp")
+            self._app.logger.error(f"Error al generar el reporte {id_trabajo}: {str(e)}")
+            self._finalizar(trabajo, ERROR, "Error al generar el reporte")
+        finally:
+            self._quitar(id_trabajo)
+
+    def _verificar(self, id_trabajo, evento, limite):
+        # Cancelación local, desde otro proceso (marcador en disco) o por tiempo máximo
+        if evento.is_set():
+            raise TrabajoCancelado("Reporte cancelado")
+        if time.monotonic() > limite:
+            raise TrabajoCancelado("El reporte superó el tiempo máximo de generación")
+        if os.path.exists(self._ruta(id_trabajo, "cancelado")):
+            raise TrabajoCancelado("Reporte cancelado")
+        if not os.path.exists(self._ruta(id_trabajo, "json")):
+            raise TrabajoCancelado("Reporte cancelado")
+
+    def _finalizar(self, trabajo, estado, mensaje=None):
+        trabajo["estado"] = estado
+        trabajo["mensaje"] = mensaje
+        trabajo["terminado"] = _ahora()
+        trabajo["expira"] = (datetime.now() + timedelta(seconds=self.vencimiento)).isoformat(
+            timespec="seconds"
+        )
+        self._guardar(trabajo)
+
+        campo = {TERMINADO: "terminados", ERROR: "errores", CANCELADO: "cancelados"}[estado]
+        with self._lock:
+            self._metricas[campo] += 1
+
+    def _quitar(self, id_trabajo):
+        with self._lock:
+            self._futuros.pop(id_trabajo, None)
+            self._cancelaciones.pop(id_trabajo, None)
+
+    def _ruta(self, id_trabajo, extension):
+        return os.path.join(self.directorio, f"{id_trabajo}.{extension}")
+
+    def _leer(self, id_trabajo):
+        # Los identificadores son hexadecimales; cualquier otro valor no existe
+        if not id_trabajo or not all(c in "0123456789abcdef" for c in id_trabajo):
+            return None
+        try:
+            with open(self._ruta(id_trabajo, "json"), encoding="utf-8") as archivo:
+                trabajo = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+        # Un avance publicado justo después de la cancelación no la deshace
+        if trabajo["estado"] not in FINALIZADOS and os.path.exists(
+            self._ruta(id_trabajo, "cancelado")
+        ):
+            trabajo["estado"] = CANCELADO
+            trabajo["mensaje"] = "Reporte cancelado"
+        return trabajo
+
+    def _todos(self):
+        if not self.directorio or not os.path.isdir(self.directorio):
+            return []
+        trabajos = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".json"):
+                trabajo = self._leer(nombre[: -len(".json")])
+                if trabajo is not None:
+                    trabajos.append(trabajo)
+        return trabajos
+
+    def _guardar(self, trabajo):
+        # Escritura atómica: archivo temporal y reemplazo
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(trabajo["id"], "json")
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(trabajo, archivo)
+        os.replace(temporal, ruta)
+
+    def _eliminar(self, trabajo):
+        _borrar(self._ruta(trabajo["id"], trabajo["formato"]))
+        _borrar(self._ruta(trabajo["id"], "json"))
+        _borrar(self._ruta(trabajo["id"], "cancelado"))
+
+
+def _ahora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _tocar(ruta):
+    with open(ruta, "a", encoding="utf-8"):
+        pass
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+trabajos_reportes = TrabajosReportes()
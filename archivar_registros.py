@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Script para archivar registros antiguos en archivos CSV comprimidos por mes
+
+Uso:
+    python archivar_registros.py --meses 6              # conserva los últimos 6 meses
+    python archivar_registros.py --antes-de 2024-01-01
+
+Los registros anteriores a la fecha de corte se escriben en
+ARCHIVO_REGISTROS_DIR (por defecto instance/archivo_registros) y se borran de
+la tabla registro por lotes. Los reportes y la exportación leen el archivo
+cuando el rango pedido lo incluye.
+"""
+
+import sys
+import os
+import argparse
+from datetime import date, datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.utils.archivo import archivar_registros, LOTE_ARCHIVO
+from app.utils.cache_reportes import cache_reportes
+
+
+def fecha(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+def main():
+    """Archiva los registros anteriores a la fecha de corte"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--antes-de", type=fecha, help="Fecha de corte (AAAA-MM-DD)")
+    grupo.add_argument("--meses", type=int, help="Meses completos a conservar en la tabla")
+    parser.add_argument("--lote", type=int, default=LOTE_ARCHIVO, help="Filas borradas por transacción")
+    args = parser.parse_args()
+
+    if args.meses is not None:
+        hoy = date.today()
+        indice = hoy.year * 12 + hoy.month - 1 - args.meses
+        corte = date(indice // 12, indice % 12 + 1, 1)
+    else:
+        corte = args.antes_de
+
+    if corte >= date.today():
+        print("❌ La fecha de corte debe ser anterior a hoy")
+        sys.exit(1)
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print(f"Archivando registros anteriores al {corte.isoformat()}...")
+            archivos, filas = archivar_registros(corte, lote=args.lote)
+            # Los procesos de la aplicación descartan los reportes en cache
+            cache_reportes.invalidar_todo()
+            db.session.commit()
+            print(f"✅ Registros archivados: {filas} en {archivos} archivos")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error al archivar los registros: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir y verificar el estado de asistencia (turno abierto) de cada persona
+"""
+
+import sys
+import os
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.utils.asistencia import reconstruir_estados, verificar_estados
+
+
+def main():
+    """Reconstruye los estados o, con --verificar, solo los compara con la tabla registro"""
+    app = create_app()
+    solo_verificar = "--verificar" in sys.argv[1:]
+
+    with app.app_context():
+        try:
+            if not solo_verificar:
+                print("Reconstruyendo estado de asistencia desde la tabla registro...")
+                total = reconstruir_estados()
+                print(f"✅ Estados reconstruidos: {total}")
+
+            print("Verificando consistencia con la tabla registro...")
+            diferencias = verificar_estados()
+            if not diferencias:
+                print("✅ El estado de asistencia es consistente")
+                return
+
+            print(f"❌ Se encontraron {len(diferencias)} diferencias:")
+            for id_persona, campo, esperado, actual in diferencias:
+                print(f"   - Persona {id_persona}: {campo} esperado={esperado} actual={actual}")
+            sys.exit(1)
+
+        except Exception as e:
+            print(f"❌ Error al procesar el estado de asistencia: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
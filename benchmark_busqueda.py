@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la búsqueda de empleados por nombre.
+
+Compara el filtro anterior (ilike sobre las cuatro columnas de nombre por
+cada término) con la búsqueda sobre persona.nombre_busqueda, que en
+PostgreSQL usa el índice de trigramas. Reporta la mediana y el p95 por
+consulta, la aceleración y las coincidencias de cada versión (la nueva
+también encuentra nombres con tildes). El resultado se guarda en JSON.
+
+Uso:
+    python benchmark_busqueda.py --personas 100000
+    python benchmark_busqueda.py --db postgresql://localhost/jsv_bench --salida busqueda.json
+
+La base de datos indicada recibe las personas de prueba; no usar la base de
+datos de producción.
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+import argparse
+from datetime import datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+NOMBRES = [
+    "José", "María", "Andrés", "Sofía", "Martín", "Lucía", "Sebastián", "Valentina",
+    "Nicolás", "Camila", "Julián", "Mariana", "Tomás", "Daniela", "Simón", "Ángela",
+    "Iván", "Inés", "Raúl", "Mónica", "Jesús", "Verónica", "Óscar", "Natalia",
+]
+APELLIDOS = [
+    "García", "Rodríguez", "Martínez", "Hernández", "López", "González", "Pérez",
+    "Sánchez", "Ramírez", "Torres", "Gómez", "Díaz", "Vásquez", "Jiménez", "Muñoz",
+    "Rojas", "Álvarez", "Castaño", "Peña", "Ortiz", "Gutiérrez", "Marín", "Suárez",
+]
+BUSQUEDAS = ["garcia", "José Pérez", "muñoz", "ang", "maria lopez", "ez", "zzz"]
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--personas", type=int, default=100000, help="Personas a sembrar")
+    parser.add_argument("--repeticiones", type=int, default=10, help="Ejecuciones por búsqueda")
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="URL de la base de datos (por defecto SQLite temporal)",
+    )
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args()
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def sembrar_personas(db, cantidad, aleatorio):
+    """Inserta personas de prueba en bloque hasta llegar a `cantidad`"""
+    from app.models.persona import Persona, nombre_busqueda
+
+    db.create_all()
+    existentes = Persona.query.filter(Persona.documento.like("BUS%")).count()
+
+    filas = []
+    for i in range(existentes, cantidad):
+        partes = (
+            aleatorio.choice(NOMBRES),
+            aleatorio.choice(NOMBRES) if aleatorio.random() < 0.6 else None,
+            aleatorio.choice(APELLIDOS),
+            aleatorio.choice(APELLIDOS) if aleatorio.random() < 0.8 else None,
+        )
+        filas.append(
+            {
+                "primer_nombre": partes[0],
+                "segundo_nombre": partes[1],
+                "primer_apellido": partes[2],
+                "segundo_apellido": partes[3],
+                "documento": f"BUS{i:09d}",
+                "correo": f"busqueda{i}@empresa.com",
+                "fecha_creacion": datetime.utcnow(),
+                "nombre_busqueda": nombre_busqueda(*partes),
+            }
+        )
+        if len(filas) >= 5000:
+            db.session.execute(Persona.__table__.insert(), filas)
+            filas = []
+    if filas:
+        db.session.execute(Persona.__table__.insert(), filas)
+    db.session.commit()
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(db.text("ANALYZE persona"))
+        db.session.commit()
+
+
+def busqueda_anterior(db, busqueda):
+    """Filtro original de admin.reportes: ilike en las cuatro columnas por término"""
+    from app.models.persona import Persona
+
+    condiciones = []
+    for term in busqueda.split():
+        term_like = f"%{term}%"
+        condiciones.append(
+            db.or_(
+                Persona.primer_nombre.ilike(term_like),
+                Persona.segundo_nombre.ilike(term_like),
+                Persona.primer_apellido.ilike(term_like),
+                Persona.segundo_apellido.ilike(term_like),
+            )
+        )
+    return db.session.query(Persona.id_persona).filter(db.and_(*condiciones))
+
+
+def medir(consulta, repeticiones):
+    tiempos = []
+    total = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        total = consulta.count()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos, total
+
+
+def plan(db, consulta):
+    """Primera línea del plan de ejecución de la consulta (solo PostgreSQL)"""
+    if db.engine.dialect.name != "postgresql":
+        return None
+    sql = consulta.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    filas = db.session.execute(db.text(f"EXPLAIN {sql}")).all()
+    return " | ".join(fila[0].strip() for fila in filas[:3])
+
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+    if args.db is None:
+        args.db = "sqlite:///" + os.path.join(tempfile.gettempdir(), "benchmark_busqueda.db")
+    os.environ["DATABASE_URL"] = args.db
+
+    from app import create_app, db
+    from app.utils.reportes import personas_por_nombre
+
+    app = create_app()
+
+    with app.app_context():
+        sembrar_personas(db, args.personas, random.Random(args.semilla))
+
+        resultados = []
+        for busqueda in BUSQUEDAS:
+            anterior = busqueda_anterior(db, busqueda)
+            nueva = personas_por_nombre(busqueda)
+            tiempos_anterior, total_anterior = medir(anterior, args.repeticiones)
+            tiempos_nueva, total_nueva = medir(nueva, args.repeticiones)
+
+            mediana_anterior = percentil(tiempos_anterior, 50)
+            mediana_nueva = percentil(tiempos_nueva, 50)
+            resultados.append(
+                {
+                    "busqueda": busqueda,
+                    "anterior": {
+                        "p50_ms": round(mediana_anterior, 2),
+                        "p95_ms": round(percentil(tiempos_anterior, 95), 2),
+                        "coincidencias": total_anterior,
+                    },
+                    "nueva": {
+                        "p50_ms": round(mediana_nueva, 2),
+                        "p95_ms": round(percentil(tiempos_nueva, 95), 2),
+                        "coincidencias": total_nueva,
+                        "plan": plan(db, nueva),
+                    },
+                    "aceleracion": (
+                        round(mediana_anterior / mediana_nueva, 2) if mediana_nueva else None
+                    ),
+                }
+            )
+
+        reporte = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "configuracion": {
+                "personas": args.personas,
+                "repeticiones": args.repeticiones,
+                "motor": args.db.split(":", 1)[0],
+            },
+            "busquedas": resultados,
+        }
+
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    print(salida)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(salida + "\n")
+
+
+if __name__ == "__main__":
+    main()
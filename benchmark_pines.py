@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la asignación de PIN con prefijos casi llenos.
+
+Compara el ciclo anterior de generate_pin (un sufijo al azar y una consulta
+por intento hasta encontrar uno libre) con pines.generar_pin, que lee de una
+vez los valores usados del prefijo y elige entre los libres. Para cada
+porcentaje de ocupación del prefijo reporta la mediana y el p95 por PIN, las
+consultas por PIN y los fallos (el ciclo anterior se corta en --max-intentos;
+el asignador nuevo solo falla si el prefijo está lleno). El resultado se
+guarda en JSON.
+
+Uso:
+    python benchmark_pines.py
+    python benchmark_pines.py --ocupacion 50 90 99 99.9 --pines 200 --salida pines.json
+
+La base de datos indicada recibe credenciales de prueba; no usar la base de
+datos de producción.
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+import argparse
+from datetime import datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PREFIJO = "MAR"
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--ocupacion",
+        type=float,
+        nargs="+",
+        default=[50, 90, 99, 99.9],
+        help="Porcentajes de ocupación del prefijo a medir",
+    )
+    parser.add_argument("--pines", type=int, default=100, help="PIN a generar por ocupación")
+    parser.add_argument(
+        "--max-intentos",
+        type=int,
+        default=1000,
+        help="Intentos del ciclo anterior antes de contarlo como fallo",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="URL de la base de datos (por defecto SQLite temporal)",
+    )
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def llenar_prefijo(db, ocupacion, aleatorio):
+    """Deja el prefijo con el porcentaje de sufijos indicado ya usados"""
+    from app.models.credencial import Credencial
+    from app.models.persona import Persona
+    from app.utils.pines import DIGITOS_PIN, SUFIJOS_POR_PREFIJO, id_tipo_pin
+
+    db.create_all()
+    persona = Persona.query.filter_by(documento="BENCHPIN").first()
+    if persona is None:
+        persona = Persona(
+            primer_nombre="Mario",
+            primer_apellido="Benchmark",
+            documento="BENCHPIN",
+            correo="benchmark.pines@empresa.com",
+        )
+        db.session.add(persona)
+        db.session.flush()
+    id_tipo = id_tipo_pin()
+
+    Credencial.query.filter(Credencial.valor.like(f"{PREFIJO}%")).delete(
+        synchronize_session=False
+    )
+    cantidad = int(SUFIJOS_POR_PREFIJO * ocupacion / 100)
+    sufijos = aleatorio.sample(range(SUFIJOS_POR_PREFIJO), cantidad)
+    filas = [
+        {
+            "id_persona": persona.id_persona,
+            "id_tipo_credencial": id_tipo,
+            "valor": f"{PREFIJO}{sufijo:0{DIGITOS_PIN}d}",
+            "activo": True,
+        }
+        for sufijo in sufijos
+    ]
+    for inicio in range(0, len(filas), 5000):
+        db.session.execute(Credencial.__table__.insert(), filas[inicio : inicio + 5000])
+    db.session.commit()
+    return cantidad
+
+
+def pin_anterior(primer_nombre, max_intentos, aleatorio):
+    """Ciclo original de generate_pin: una consulta por cada sufijo probado"""
+    from app.models.credencial import Credencial
+    from app.models.tipo_credencial import TipoCredencial
+
+    letras = primer_nombre[:3].upper()
+    for _ in range(max_intentos):
+        pin = letras + "".join(aleatorio.choices("0123456789", k=4))
+        existente = (
+            Credencial.query.join(TipoCredencial)
+            .filter(TipoCredencial.nombre == "PIN", Credencial.valor == pin)
+            .first()
+        )
+        if not existente:
+            return pin
+    return None
+
+
+def pin_nuevo(primer_nombre):
+    from app.utils.pines import PinesAgotados, generar_pin
+
+    try:
+        return generar_pin(primer_nombre)
+    except PinesAgotados:
+        return None
+
+
+def medir(db, generar, cantidad):
+    """Tiempo y consultas por PIN generado; los PIN no se guardan"""
+    consultas = [0]
+
+    def contar(*_):
+        consultas[0] += 1
+
+    db.event.listen(db.engine, "before_cursor_execute", contar)
+    tiempos = []
+    por_pin = []
+    fallos = 0
+    try:
+        for _ in range(cantidad):
+            antes = consultas[0]
+            inicio = time.perf_counter()
+            if generar() is None:
+                fallos += 1
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            por_pin.append(consultas[0] - antes)
+    finally:
+        db.event.remove(db.engine, "before_cursor_execute", contar)
+
+    return {
+        "p50_ms": round(percentil(tiempos, 50), 3),
+        "p95_ms": round(percentil(tiempos, 95), 3),
+        "consultas_promedio": round(sum(por_pin) / len(por_pin), 2) if por_pin else 0,
+        "consultas_max": max(por_pin, default=0),
+        "fallos": fallos,
+    }
+
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+    if args.db is None:
+        args.db = "sqlite:///" + os.path.join(tempfile.gettempdir(), "benchmark_pines.db")
+    os.environ["DATABASE_URL"] = args.db
+
+    from app import create_app, db
+
+    app = create_app()
+    aleatorio = random.Random(args.semilla)
+    nombre = PREFIJO.capitalize() + "ía"
+
+    with app.app_context():
+        resultados = []
+        for ocupacion in args.ocupacion:
+            usados = llenar_prefijo(db, ocupacion, aleatorio)
+            anterior = medir(
+                db, lambda: pin_anterior(nombre, args.max_intentos, aleatorio), args.pines
+            )
+            nuevo = medir(db, lambda: pin_nuevo(nombre), args.pines)
+            resultados.append(
+                {
+                    "ocupacion": ocupacion,
+                    "pines_usados": usados,
+                    "anterior": anterior,
+                    "nuevo": nuevo,
+                    "aceleracion": (
+                        round(anterior["p50_ms"] / nuevo["p50_ms"], 2)
+                        if nuevo["p50_ms"]
+                        else None
+                    ),
+                }
+            )
+
+        reporte = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "configuracion": {
+                "prefijo": PREFIJO,
+                "pines": args.pines,
+                "max_intentos": args.max_intentos,
+                "motor": args.db.split(":", 1)[0],
+            },
+            "ocupaciones": resultados,
+        }
+
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    print(salida)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(salida + "\n")
+
+
+if __name__ == "__main__":
+    main()
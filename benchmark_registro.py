@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga del registro de asistencia en cambio de turno.
+
+Simula N quioscos que marcan a M empleados en ráfaga contra registro.index
+(formulario) o registro.marcar (JSON) usando el cliente de pruebas de Flask.
+Reporta rendimiento, latencias p50/p95/p99, consultas SQL por marcación y
+marcaciones rechazadas o duplicadas. El resultado se guarda en JSON para
+comparar ejecuciones.
+
+Uso:
+    python benchmark_registro.py --kioscos 8 --empleados 500 --salida base.json
+    python benchmark_registro.py --db postgresql://localhost/jsv_bench --modo json
+
+La base de datos indicada se limpia y se llena con datos de prueba; no usar
+la base de datos de producción.
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+import threading
+import time
+import argparse
+from datetime import datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--kioscos", type=int, default=4, help="Quioscos concurrentes")
+    parser.add_argument("--empleados", type=int, default=200, help="Empleados que marcan")
+    parser.add_argument(
+        "--marcaciones",
+        type=int,
+        default=2,
+        help="Marcaciones por empleado (ingreso/salida alternados)",
+    )
+    parser.add_argument(
+        "--doble-toque",
+        type=float,
+        default=0.05,
+        help="Fracción de marcaciones repetidas por doble toque",
+    )
+    parser.add_argument(
+        "--modo",
+        choices=("form", "json"),
+        default="form",
+        help="form: POST a registro.index, json: POST a registro.marcar",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="URL de la base de datos (por defecto SQLite temporal)",
+    )
+    parser.add_argument(
+        "--estres",
+        type=int,
+        default=0,
+        help="Quioscos que marcan el mismo ingreso a la vez por empleado (0 = no ejecutar)",
+    )
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def preparar_datos(db, empleados):
+    """Crea las tablas, los empleados con PIN y limpia los registros anteriores"""
+    from app.models import Persona, Credencial, TipoCredencial, Registro, EstadoAsistencia
+    from app.utils.init_db import inicializar_datos_referencia
+
+    db.create_all()
+    inicializar_datos_referencia()
+
+    db.session.query(EstadoAsistencia).delete()
+    db.session.query(Registro).delete()
+    db.session.commit()
+
+    tipo_pin = TipoCredencial.query.filter_by(nombre="PIN").first()
+    existentes = {
+        valor
+        for (valor,) in db.session.query(Credencial.valor).filter(
+            Credencial.valor.like("BEN%")
+        )
+    }
+
+    pines = []
+    for i in range(empleados):
+        pin = f"BEN{i:04d}"
+        pines.append(pin)
+        if pin in existentes:
+            continue
+        persona = Persona(
+            primer_nombre="Benchmark",
+            primer_apellido=f"Empleado{i}",
+            documento=f"BEN{i:08d}",
+            correo=f"benchmark{i}@empresa.com",
+        )
+        db.session.add(persona)
+        db.session.flush()
+        db.session.add(
+            Credencial(
+                id_persona=persona.id_persona,
+                id_tipo_credencial=tipo_pin.id_tipo_credencial,
+                valor=pin,
+                activo=True,
+            )
+        )
+    db.session.commit()
+    return pines
+
+
+def planificar(pines, marcaciones, doble_toque, aleatorio):
+    """
+    Genera la lista de marcaciones por rondas: en cada ronda todos los
+    empleados marcan en orden aleatorio, alternando ingreso y salida
+    """
+    plan = []
+    for n in range(marcaciones):
+        accion = "ingreso" if n % 2 == 0 else "salida"
+        ronda = list(pines)
+        aleatorio.shuffle(ronda)
+        for pin in ronda:
+            plan.append((pin, accion))
+            if aleatorio.random() < doble_toque:
+                plan.append((pin, accion))
+    return plan
+
+
+def ejecutar(app, plan, kioscos, modo):
+    """Reparte las marcaciones entre los quioscos y mide cada petición"""
+    pendientes = list(plan)
+    lock = threading.Lock()
+    latencias = []
+    resultados = {}
+    url = "/registro/" if modo == "form" else "/registro/marcar"
+
+    def quiosco(numero):
+        cliente = app.test_client()
+        direccion = {"REMOTE_ADDR": f"10.0.0.{numero + 1}"}
+        while True:
+            with lock:
+                if not pendientes:
+                    return
+                pin, accion = pendientes.pop(0)
+
+            inicio = time.perf_counter()
+            if modo == "form":
+                respuesta = cliente.post(
+                    url, data={"pin": pin, "accion": accion}, environ_base=direccion
+                )
+            else:
+                respuesta = cliente.post(
+                    url, json={"pin": pin, "accion": accion}, environ_base=direccion
+                )
+            latencia = (time.perf_counter() - inicio) * 1000
+
+            if modo == "form":
+                with cliente.session_transaction() as sesion:
+                    mensajes = sesion.pop("_flashes", [])
+                categoria = mensajes[-1][0] if mensajes else "sin_mensaje"
+            else:
+                categoria = respuesta.get_json().get("categoria", "sin_mensaje")
+
+            with lock:
+                latencias.append(latencia)
+                resultados[categoria] = resultados.get(categoria, 0) + 1
+
+    hilos = [threading.Thread(target=quiosco, args=(i,)) for i in range(kioscos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    return latencias, resultados, duracion
+
+
+def estresar_concurrencia(app, pines, simultaneos, modo):
+    """
+    Prueba de concurrencia: para cada empleado, `simultaneos` quioscos envían
+    el mismo ingreso al mismo tiempo. Solo uno debe registrarse.
+    """
+    url = "/registro/" if modo == "form" else "/registro/marcar"
+    barrera = threading.Barrier(simultaneos)
+    lock = threading.Lock()
+    exitos = {}
+
+    def quiosco(numero):
+        cliente = app.test_client()
+        direccion = {"REMOTE_ADDR": f"10.1.0.{numero + 1}"}
+        for pin in pines:
+            barrera.wait()
+            if modo == "form":
+                cliente.post(url, data={"pin": pin, "accion": "ingreso"}, environ_base=direccion)
+                with cliente.session_transaction() as sesion:
+                    mensajes = sesion.pop("_flashes", [])
+                exito = bool(mensajes) and mensajes[-1][0] == "success"
+            else:
+                respuesta = cliente.post(
+                    url, json={"pin": pin, "accion": "ingreso"}, environ_base=direccion
+                )
+                exito = respuesta.get_json().get("success", False)
+            if exito:
+                with lock:
+                    exitos[pin] = exitos.get(pin, 0) + 1
+
+    hilos = [threading.Thread(target=quiosco, args=(i,)) for i in range(simultaneos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    intentos = len(pines) * simultaneos
+    return {
+        "quioscos_simultaneos": simultaneos,
+        "empleados": len(pines),
+        "intentos": intentos,
+        "duracion_s": round(duracion, 3),
+        "intentos_por_segundo": round(intentos / duracion, 1) if duracion else 0.0,
+        "ingresos_registrados": sum(exitos.values()),
+        "ingresos_duplicados": sum(n - 1 for n in exitos.values() if n > 1),
+    }
+
+
+def contar_duplicados(db):
+    """Cuenta registros consecutivos del mismo tipo por persona (alternancia rota)"""
+    from app.models import Registro
+
+    duplicados = 0
+    anterior = {}
+    filas = db.session.query(
+        Registro.id_persona, Registro.id_tipo_registro
+    ).order_by(Registro.id_persona, Registro.fecha_hora, Registro.registro_id)
+    for id_persona, tipo in filas:
+        if anterior.get(id_persona) == tipo:
+            duplicados += 1
+        anterior[id_persona] = tipo
+    return duplicados
+
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+    if args.db is None:
+        args.db = "sqlite:///" + os.path.join(
+            tempfile.gettempdir(), "benchmark_registro.db"
+        )
+    os.environ["DATABASE_URL"] = args.db
+
+    from sqlalchemy import event
+    from app import create_app, db
+
+    app = create_app()
+
+    with app.app_context():
+        pines = preparar_datos(db, args.empleados)
+        plan = planificar(
+            pines, args.marcaciones, args.doble_toque, random.Random(args.semilla)
+        )
+
+        consultas = {"total": 0}
+        lock_consultas = threading.Lock()
+
+        def contar_consulta(*_):
+            with lock_consultas:
+                consultas["total"] += 1
+
+        event.listen(db.engine, "before_cursor_execute", contar_consulta)
+
+    latencias, resultados, duracion = ejecutar(app, plan, args.kioscos, args.modo)
+
+    with app.app_context():
+        event.remove(db.engine, "before_cursor_execute", contar_consulta)
+        duplicados = contar_duplicados(db)
+
+    estres = None
+    if args.estres > 1:
+        with app.app_context():
+            preparar_datos(db, args.empleados)
+        estres = estresar_concurrencia(app, pines, args.estres, args.modo)
+        with app.app_context():
+            estres["duplicados_en_base"] = contar_duplicados(db)
+
+    from app.utils.cola_registros import cola_registros
+
+    cola_registros.detener()
+
+    total = len(latencias)
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "configuracion": {
+            "kioscos": args.kioscos,
+            "empleados": args.empleados,
+            "marcaciones_por_empleado": args.marcaciones,
+            "doble_toque": args.doble_toque,
+            "modo": args.modo,
+            "motor": args.db.split(":", 1)[0],
+            "write_behind": app.config.get("REGISTRO_WRITE_BEHIND", False),
+        },
+        "marcaciones": total,
+        "duracion_s": round(duracion, 3),
+        "marcaciones_por_segundo": round(total / duracion, 1) if duracion else 0.0,
+        "latencia_ms": {
+            "p50": round(percentil(latencias, 50), 2),
+            "p95": round(percentil(latencias, 95), 2),
+            "p99": round(percentil(latencias, 99), 2),
+            "max": round(max(latencias, default=0.0), 2),
+            "promedio": round(sum(latencias) / total, 2) if total else 0.0,
+        },
+        "consultas_por_marcacion": round(consultas["total"] / total, 2) if total else 0.0,
+        "resultados": {
+            "registradas": resultados.get("success", 0),
+            "rechazadas": total - resultados.get("success", 0),
+            "por_categoria": resultados,
+        },
+        "duplicados_en_base": duplicados,
+    }
+    if estres is not None:
+        reporte["estres_concurrencia"] = estres
+
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    print(salida)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(salida + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,77 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = True
+
+    # Cache de credenciales PIN para el registro de asistencia
+    PIN_CACHE_MAX = int(os.environ.get("PIN_CACHE_MAX", 2048))
+    PIN_CACHE_TTL = int(os.environ.get("PIN_CACHE_TTL", 300))
+    PIN_CACHE_NEGATIVO_MAX = int(os.environ.get("PIN_CACHE_NEGATIVO_MAX", 4096))
+    PIN_CACHE_NEGATIVO_TTL = int(os.environ.get("PIN_CACHE_NEGATIVO_TTL", 60))
+    # Segundos entre lecturas de la versión compartida del cache de PIN: es la
+    # demora máxima para que otro proceso vea un PIN desactivado (0 = en cada
+    # marcación, -1 = sin sincronizar, solo PIN_CACHE_TTL)
+    PIN_CACHE_SINCRONIZACION = int(os.environ.get("PIN_CACHE_SINCRONIZACION", 5))
+
+    # Límite de intentos fallidos de PIN por dirección (ventana en segundos)
+    PIN_LIMITE_FALLOS = int(os.environ.get("PIN_LIMITE_FALLOS", 20))
+    PIN_LIMITE_VENTANA = int(os.environ.get("PIN_LIMITE_VENTANA", 60))
+    PIN_LIMITE_DIRECCIONES = int(os.environ.get("PIN_LIMITE_DIRECCIONES", 10000))
+
+    # Máximo de marcaciones por lote sincronizado desde quioscos
+    REGISTRO_LOTE_MAX = int(os.environ.get("REGISTRO_LOTE_MAX", 1000))
+    # Fechas aceptadas en los lotes: desfase máximo hacia el futuro (segundos)
+    # respecto a la hora del servidor y antigüedad máxima (días)
+    REGISTRO_LOTE_DESFASE_MAX = int(os.environ.get("REGISTRO_LOTE_DESFASE_MAX", 300))
+    REGISTRO_LOTE_ANTIGUEDAD_DIAS = int(os.environ.get("REGISTRO_LOTE_ANTIGUEDAD_DIAS", 7))
+
+    # Particiones mensuales de registro en PostgreSQL: meses futuros a crear y
+    # retención (meses a conservar, 0 = sin retención; "desacoplar" o "eliminar")
+    REGISTRO_PARTICIONES_ADELANTE = int(os.environ.get("REGISTRO_PARTICIONES_ADELANTE", 3))
+    REGISTRO_RETENCION_MESES = int(os.environ.get("REGISTRO_RETENCION_MESES", 0))
+    REGISTRO_RETENCION_ACCION = os.environ.get("REGISTRO_RETENCION_ACCION", "desacoplar")
+
+    # Directorio de los registros archivados (por defecto instance/archivo_registros)
+    ARCHIVO_REGISTROS_DIR = os.environ.get("ARCHIVO_REGISTROS_DIR")
+
+    # Tiempo de vida (segundos) de los contadores del encabezado de reportes
+    PANEL_CACHE_TTL = int(os.environ.get("PANEL_CACHE_TTL", 60))
+
+    # Cache de resultados de reportes por día (los días pasados no vencen; se
+    # invalidan en todos los procesos con el contador de la tabla version_cache)
+    REPORTES_CACHE = os.environ.get("REPORTES_CACHE", "1") == "1"
+    REPORTES_CACHE_MAX_PARES = int(os.environ.get("REPORTES_CACHE_MAX_PARES", 200000))
+    REPORTES_CACHE_MAX_DIAS = int(os.environ.get("REPORTES_CACHE_MAX_DIAS", 93))
+    # Segundos después de medianoche en que el día anterior aún no se guarda
+    REPORTES_CACHE_MARGEN = int(os.environ.get("REPORTES_CACHE_MARGEN", 300))
+
+    # Reportes en segundo plano: hilos simultáneos, trabajos en cola por proceso,
+    # segundos que se conserva el resultado y tiempo máximo de generación
+    REPORTES_TRABAJOS_MAX = int(os.environ.get("REPORTES_TRABAJOS_MAX", 2))
+    REPORTES_TRABAJOS_PENDIENTES_MAX = int(os.environ.get("REPORTES_TRABAJOS_PENDIENTES_MAX", 10))
+    REPORTES_TRABAJOS_VENCIMIENTO = int(os.environ.get("REPORTES_TRABAJOS_VENCIMIENTO", 3600))
+    REPORTES_TRABAJOS_TIEMPO_MAX = int(os.environ.get("REPORTES_TRABAJOS_TIEMPO_MAX", 1800))
+    # Directorio de los archivos generados (por defecto instance/reportes_trabajos)
+    REPORTES_TRABAJOS_DIR = os.environ.get("REPORTES_TRABAJOS_DIR")
+
+    # Importación de empleados: filas por transacción e hilos para los hash de contraseña
+    IMPORTACION_LOTE = int(os.environ.get("IMPORTACION_LOTE", 200))
+    IMPORTACION_HILOS_HASH = int(os.environ.get("IMPORTACION_HILOS_HASH", os.cpu_count() or 4))
+
+    # Máximo de filas por página en la tabla de empleados
+    EMPLEADOS_PAGINA_MAX = int(os.environ.get("EMPLEADOS_PAGINA_MAX", 500))
+
+    # Máximo de registros por página en el historial del perfil
+    HISTORIAL_PAGINA_MAX = int(os.environ.get("HISTORIAL_PAGINA_MAX", 200))
+
+    # Máximo de filas por página en la tabla de reportes
+    REPORTES_PAGINA_MAX = int(os.environ.get("REPORTES_PAGINA_MAX", 500))
+
+    # Escritura diferida de registros con commit agrupado (desactivada por defecto)
+    REGISTRO_WRITE_BEHIND = os.environ.get("REGISTRO_WRITE_BEHIND", "0") == "1"
+    REGISTRO_COLA_LOTE = int(os.environ.get("REGISTRO_COLA_LOTE", 100))
+    REGISTRO_COLA_ESPERA_MS = int(os.environ.get("REGISTRO_COLA_ESPERA_MS", 200))
+    REGISTRO_COLA_FSYNC = os.environ.get("REGISTRO_COLA_FSYNC", "1") == "1"
+    # Reintentos de un lote fallido antes de guardar una por una y descartar las que fallan
+    REGISTRO_COLA_REINTENTOS = int(os.environ.get("REGISTRO_COLA_REINTENTOS", 5))
+    # Ruta base del spool; cada proceso usa <ruta>.<pid>.jsonl (por defecto instance/registro_spool.jsonl)
+    REGISTRO_COLA_SPOOL = os.environ.get("REGISTRO_COLA_SPOOL")
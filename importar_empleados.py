@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Script para importar empleados en bloque desde un archivo CSV
+
+Uso:
+    python importar_empleados.py empleados.csv
+    python importar_empleados.py empleados.csv --solo-validar
+    python importar_empleados.py empleados.csv --reporte resultado.csv
+
+Columnas obligatorias: primer_nombre, primer_apellido, documento, correo,
+cargo (id o descripción), fecha_contratacion (AAAA-MM-DD) y contrasena.
+Opcionales: segundo_nombre, segundo_apellido y celular. Se acepta coma o
+punto y coma como separador.
+"""
+
+import sys
+import os
+import csv
+import argparse
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.utils.importacion import importar_empleados
+
+
+def main():
+    """Importa el archivo indicado y muestra el resultado por fila"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("archivo", help="Archivo CSV con los empleados")
+    parser.add_argument(
+        "--solo-validar", action="store_true", help="Validar sin crear empleados"
+    )
+    parser.add_argument("--lote", type=int, default=None, help="Filas por transacción")
+    parser.add_argument(
+        "--reporte", default=None, help="Guardar el resultado de cada fila en un CSV"
+    )
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            with open(args.archivo, "rb") as archivo:
+                contenido = archivo.read()
+
+            print(f"Importando empleados desde {args.archivo}...")
+            resumen = importar_empleados(
+                contenido, solo_validar=args.solo_validar, lote=args.lote
+            )
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error al importar los empleados: {str(e)}")
+            sys.exit(1)
+
+    for fila in resumen["filas"]:
+        if fila["estado"] == "error":
+            print(f"   Línea {fila['linea']} ({fila['documento']}): {fila['mensaje']}")
+
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8", newline="") as archivo:
+            escritor = csv.DictWriter(
+                archivo, fieldnames=["linea", "documento", "correo", "estado", "mensaje", "pin"]
+            )
+            escritor.writeheader()
+            escritor.writerows(resumen["filas"])
+        print(f"Reporte guardado en {args.reporte}")
+
+    if args.solo_validar:
+        print(f"✅ Filas válidas: {resumen['validos']} de {resumen['total']}")
+    else:
+        print(f"✅ Empleados creados: {resumen['creados']} de {resumen['total']}")
+    if resumen["errores"]:
+        print(f"❌ Filas con errores: {resumen['errores']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Script para administrar las particiones mensuales de la tabla registro (solo PostgreSQL)
+
+Uso:
+    python particionar_registro.py convertir --simular   # ensayo completo, se revierte
+    python particionar_registro.py convertir [--conservar-original]
+    python particionar_registro.py mantener     # programar a diario (cron)
+    python particionar_registro.py listar
+
+"convertir" transforma la tabla registro existente en una tabla particionada
+por mes sobre fecha_hora, con una partición DEFAULT para las fechas fuera de
+los meses creados, y copia los datos. "mantener" crea las particiones de los
+próximos REGISTRO_PARTICIONES_ADELANTE meses, mueve a su partición mensual
+los registros que cayeron en DEFAULT (avisando) y aplica la retención
+REGISTRO_RETENCION_MESES / REGISTRO_RETENCION_ACCION. "mantener" y "listar"
+terminan con código 2 si encuentran registros en DEFAULT, para alertar desde cron.
+
+Procedimiento completo: docs/particionamiento_registro.md
+"""
+
+import sys
+import os
+import argparse
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.utils.particiones import (
+    DEFAULT,
+    es_postgresql,
+    esta_particionada,
+    convertir_a_particionada,
+    mantener_particiones,
+    listar_particiones,
+    registros_en_default,
+)
+
+
+def main():
+    """Ejecuta la acción indicada sobre las particiones de registro"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("accion", choices=("convertir", "mantener", "listar"))
+    parser.add_argument(
+        "--conservar-original",
+        action="store_true",
+        help="No eliminar la tabla original (queda como registro_original)",
+    )
+    parser.add_argument(
+        "--simular",
+        "--dry-run",
+        dest="simular",
+        action="store_true",
+        help="Ejecutar la conversión completa dentro de una transacción y revertirla",
+    )
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        if not es_postgresql():
+            print("❌ El particionamiento de registro solo está disponible en PostgreSQL")
+            sys.exit(1)
+
+        try:
+            if args.accion == "convertir":
+                if esta_particionada():
+                    print("La tabla registro ya está particionada.")
+                    return
+                if args.simular:
+                    print("Simulando la conversión (los cambios se revierten al final)...")
+                else:
+                    print("Convirtiendo la tabla registro a particiones mensuales...")
+                creadas, copiadas = convertir_a_particionada(
+                    conservar_original=args.conservar_original, simular=args.simular
+                )
+                if args.simular:
+                    print(
+                        f"✅ Simulación correcta: {creadas} particiones mensuales y "
+                        f"{copiadas} registros copiados; no se guardó ningún cambio"
+                    )
+                else:
+                    print(f"✅ Tabla convertida con {creadas} particiones y {copiadas} registros")
+
+            elif args.accion == "mantener":
+                if not esta_particionada():
+                    print("❌ La tabla registro no está particionada; ejecute 'convertir' primero")
+                    sys.exit(1)
+                creadas, afectadas, en_default = mantener_particiones()
+                print(f"✅ Particiones creadas: {creadas}")
+                accion = app.config.get("REGISTRO_RETENCION_ACCION", "desacoplar")
+                for nombre in afectadas:
+                    print(f"   - {nombre}: {accion}")
+                if en_default:
+                    _avisar_default(en_default, "reubicados")
+                    sys.exit(2)
+
+            else:
+                for nombre, inicio, filas in listar_particiones():
+                    print(f"{nombre}  {inicio.strftime('%Y-%m')}  ~{filas} registros")
+                en_default = registros_en_default()
+                if en_default:
+                    _avisar_default(en_default, "pendientes de reubicar con 'mantener'")
+                    sys.exit(2)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error al administrar las particiones: {str(e)}")
+            sys.exit(1)
+
+
+def _avisar_default(en_default, estado):
+    total = sum(filas for _, filas in en_default)
+    print(f"⚠️  {total} registros estaban en {DEFAULT} ({estado}):")
+    for mes, filas in en_default:
+        print(f"   - {mes.strftime('%Y-%m')}: {filas}")
+
+
+if __name__ == "__main__":
+    main()
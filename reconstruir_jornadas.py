@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir la tabla jornada (resumen diario de asistencia) desde la tabla registro
+
+Agrega la columna jornada.ingresos_abiertos si la base de datos es anterior a
+ella. Los días archivados o quitados por la retención de particiones no se
+reconstruyen: sus jornadas se conservan.
+
+Uso:
+    python reconstruir_jornadas.py
+    python reconstruir_jornadas.py --desde 2025-01-01 --hasta 2025-03-31
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+from app.utils.jornadas import primer_dia_reconstruible, reconstruir_jornadas
+
+
+def fecha(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+def preparar_esquema():
+    """Agrega la columna ingresos_abiertos si falta"""
+    columnas = {columna["name"] for columna in inspect(db.engine).get_columns("jornada")}
+    if "ingresos_abiertos" not in columnas:
+        print("Agregando columna jornada.ingresos_abiertos...")
+        db.session.execute(
+            text("ALTER TABLE jornada ADD COLUMN ingresos_abiertos INTEGER NOT NULL DEFAULT 0")
+        )
+        # Antes solo se guardaba un ingreso abierto por día
+        db.session.execute(
+            text("UPDATE jornada SET ingresos_abiertos = 1 WHERE fecha_hora_ingreso_abierto IS NOT NULL")
+        )
+    db.session.commit()
+
+
+def main():
+    """Reconstruye las jornadas de todo el historial o de un rango de fechas"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--desde", type=fecha, default=None, help="Fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=fecha, default=None, help="Fecha final (AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            db.create_all()
+            preparar_esquema()
+            primer_dia = primer_dia_reconstruible()
+            if primer_dia is not None:
+                print(f"Los días anteriores a {primer_dia} ya no están en la tabla registro; se conservan")
+            print("Reconstruyendo jornadas desde la tabla registro...")
+            total = reconstruir_jornadas(args.desde, args.hasta)
+            print(f"✅ Jornadas reconstruidas: {total}")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error al reconstruir las jornadas: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
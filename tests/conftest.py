@@ -0,0 +1,130 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+# La configuración se lee al importar la aplicación: base de datos en memoria
+# y directorios temporales para no tocar instance/
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["REGISTRO_WRITE_BEHIND"] = "0"
+os.environ.setdefault("REPORTES_TRABAJOS_DIR", tempfile.mkdtemp(prefix="jsv_trabajos_"))
+os.environ.setdefault("ARCHIVO_REGISTROS_DIR", tempfile.mkdtemp(prefix="jsv_archivo_"))
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from config import Config
+from app.models import CargoEmpleado, Empleado, Persona, Usuario
+from app.utils.init_db import inicializar_datos_referencia
+from app.utils.pines import crear_credencial_pin
+
+
+@pytest.fixture
+def base_datos():
+    """URL de la base de datos de la prueba; un módulo la redefine para usar otra"""
+    return "sqlite://"
+
+
+@pytest.fixture
+def app(base_datos, monkeypatch, tmp_path):
+    """Aplicación con el esquema creado y un directorio de archivo propio por prueba"""
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", base_datos)
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        ARCHIVO_REGISTROS_DIR=str(tmp_path / "archivo"),
+    )
+    with app.app_context():
+        # Las bases en archivo o servidor pueden traer tablas de una ejecución anterior
+        db.drop_all()
+        db.create_all()
+        inicializar_datos_referencia()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def crear_servicio(app):
+    """
+    Crea instancias propias de un servicio con init_app (cola, trabajos),
+    como si fueran otro proceso, con valores de configuración adicionales.
+    Las detiene al terminar la prueba.
+    """
+    creados = []
+
+    def crear(clase, **config):
+        app.config.update(config)
+        servicio = clase(app)
+        creados.append(servicio)
+        return servicio
+
+    yield crear
+    for servicio in creados:
+        servicio.detener()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    """Cliente con la sesión iniciada como el administrador por defecto"""
+    admin = Usuario.query.filter_by(id_rol=1).first()
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(admin.id_usuario)
+        sesion["_fresh"] = True
+    return cliente
+
+
+@pytest.fixture
+def crear_empleado(app):
+    """Crea un empleado con credencial PIN y devuelve (empleado, pin)"""
+    contador = iter(range(1, 100000))
+
+    def crear(primer_nombre="Ana", primer_apellido="Pérez", fecha_contratacion=None, cargo_id=None):
+        numero = next(contador)
+        persona = Persona(
+            primer_nombre=primer_nombre,
+            primer_apellido=primer_apellido,
+            documento=f"T{numero:08d}",
+            correo=f"prueba{numero}@empresa.com",
+        )
+        db.session.add(persona)
+        db.session.flush()
+        empleado = Empleado(
+            id_persona=persona.id_persona,
+            cargo_id=cargo_id or CargoEmpleado.query.first().id_cargo,
+            fecha_contratacion=fecha_contratacion or date(2024, 1, 1),
+        )
+        db.session.add(empleado)
+        credencial = crear_credencial_pin(persona.id_persona, primer_nombre)
+        db.session.commit()
+        return empleado, credencial.valor
+
+    return crear
+
+
+@pytest.fixture
+def contar_consultas(app):
+    """Context manager que cuenta las sentencias SQL ejecutadas"""
+
+    @contextmanager
+    def contar():
+        sentencias = []
+
+        def registrar(conexion, cursor, sentencia, *args):
+            sentencias.append(sentencia)
+
+        event.listen(db.engine, "before_cursor_execute", registrar)
+        try:
+            yield sentencias
+        finally:
+            event.remove(db.engine, "before_cursor_execute", registrar)
+
+    return contar
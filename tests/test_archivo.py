@@ -0,0 +1,119 @@
+from datetime import date, datetime, time
+
+from app import db
+from app.models import Credencial, Registro
+from app.utils import archivo, reportes
+from app.utils.archivo import archivar_registros
+from app.utils.asistencia import guardar_marcaciones
+from app.utils.exportacion import filas_reporte
+from app.utils.reportes import FiltrosReporte, obtener_pares, pagina_pares
+
+
+def _jornadas(empleado, pin, dias):
+    credencial = Credencial.query.filter_by(valor=pin).one()
+    marcaciones = []
+    for dia in dias:
+        for tipo, hora in ((1, time(8)), (2, time(17))):
+            marcaciones.append(
+                {
+                    "id_persona": empleado.id_persona,
+                    "id_credencial": credencial.id_credencial,
+                    "id_tipo_registro": tipo,
+                    "fecha_hora": datetime.combine(dia, hora),
+                    "observacion": "Prueba",
+                }
+            )
+    guardar_marcaciones(marcaciones)
+
+
+def test_archivar_no_borra_filas_confirmadas_durante_la_escritura(
+    app, crear_empleado, monkeypatch
+):
+    empleado, pin = crear_empleado()
+    _jornadas(empleado, pin, [date(2024, 1, 10), date(2024, 1, 11)])
+    tardia = Registro.query.order_by(Registro.registro_id).first()
+    columnas = {c.name: getattr(tardia, c.name) for c in Registro.__table__.columns}
+    db.session.delete(tardia)
+    db.session.commit()
+
+    escribir = archivo._escribir_mes
+
+    def escribir_y_confirmar_tarde(*args):
+        resultado = escribir(*args)
+        # Una transacción con un id anterior a id_maximo confirma después de leer el mes
+        db.session.add(Registro(**columnas))
+        db.session.commit()
+        return resultado
+
+    monkeypatch.setattr(archivo, "_escribir_mes", escribir_y_confirmar_tarde)
+    archivos, filas = archivar_registros(date(2024, 2, 1))
+
+    assert (archivos, filas) == (1, 3)
+    assert [r.registro_id for r in Registro.query] == [columnas["registro_id"]]
+    pares = obtener_pares(FiltrosReporte("", date(2024, 1, 1), date(2024, 1, 31)))
+    assert len(pares) == 2
+
+
+def test_pagina_archivada_lee_el_archivo_una_vez(app, crear_empleado, monkeypatch):
+    ana, pin_ana = crear_empleado("Ana", "Pérez")
+    luis, pin_luis = crear_empleado("Luis", "Gómez")
+    _jornadas(ana, pin_ana, [date(2024, 1, 10), date(2024, 1, 11)])
+    _jornadas(luis, pin_luis, [date(2024, 1, 10)])
+    archivar_registros(date(2024, 2, 1))
+
+    lecturas = []
+    leer = reportes.leer_archivados
+
+    def contar(*args):
+        lecturas.append(args)
+        return leer(*args)
+
+    monkeypatch.setattr(reportes, "leer_archivados", contar)
+    filtros = FiltrosReporte("", date(2024, 1, 1), date(2024, 1, 31))
+    total, filtrados, pares = pagina_pares(filtros, 0, 10, busqueda="luis")
+
+    assert (total, filtrados) == (3, 1)
+    assert [par["empleado"] for par in pares] == ["Luis  Gómez"]
+    assert len(lecturas) == 1
+
+
+def test_exportacion_archivada_por_mes(app, crear_empleado, monkeypatch):
+    empleado, pin = crear_empleado()
+    dias = [date(2024, 1, 30), date(2024, 2, 2), date(2024, 3, 5)]
+    _jornadas(empleado, pin, dias)
+    archivar_registros(date(2024, 4, 1))
+
+    lecturas = []
+    leer = reportes.leer_archivados
+
+    def contar(*args):
+        lecturas.append(args)
+        return leer(*args)
+
+    monkeypatch.setattr(reportes, "leer_archivados", contar)
+    filas = list(filas_reporte(FiltrosReporte("", date(2024, 1, 15), date(2024, 3, 31))))
+
+    assert [fila[1] for fila in filas] == ["2024-03-05", "2024-02-02", "2024-01-30"]
+    # Un mes por lectura, del más reciente al más antiguo
+    assert lecturas == [
+        (date(2024, 3, 1), date(2024, 3, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 1, 15), date(2024, 1, 31)),
+    ]
+
+
+def test_reportes_ven_los_meses_ya_borrados_durante_el_archivo(app, crear_empleado, monkeypatch):
+    empleado, pin = crear_empleado()
+    _jornadas(empleado, pin, [date(2024, 1, 10), date(2024, 2, 12), date(2024, 3, 5)])
+    filtros = FiltrosReporte("", date(2024, 1, 1), date(2024, 3, 31))
+    borrar = archivo._borrar_archivados
+    vistos = []
+
+    def borrar_y_consultar(*args):
+        borrar(*args)
+        vistos.append(len(obtener_pares(filtros)))
+
+    monkeypatch.setattr(archivo, "_borrar_archivados", borrar_y_consultar)
+    archivar_registros(date(2024, 4, 1))
+
+    assert vistos == [3, 3, 3]
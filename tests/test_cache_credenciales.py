@@ -0,0 +1,54 @@
+from app import db
+from app.models import Credencial
+from app.utils.cache_credenciales import CacheCredenciales, cache_credenciales
+
+
+def _desactivar(pin):
+    credencial = Credencial.query.filter_by(valor=pin).one()
+    credencial.activo = False
+    db.session.commit()
+
+
+def test_invalidacion_durante_la_consulta_no_guarda_el_dato_viejo(app, crear_empleado, monkeypatch):
+    _, pin = crear_empleado()
+    consultar = cache_credenciales._consultar
+
+    def consultar_y_desactivar(valor):
+        credencial = consultar(valor)
+        # El administrador desactiva el PIN entre la consulta y el guardado
+        _desactivar(valor)
+        cache_credenciales.invalidar_pin(valor)
+        return credencial
+
+    monkeypatch.setattr(cache_credenciales, "_consultar", consultar_y_desactivar)
+    assert cache_credenciales.obtener(pin).activo
+    monkeypatch.setattr(cache_credenciales, "_consultar", consultar)
+
+    assert not cache_credenciales.obtener(pin).activo
+
+
+def test_pin_desactivado_se_ve_en_otro_proceso(app, crear_empleado):
+    _, pin = crear_empleado()
+    otro_proceso = CacheCredenciales()
+    otro_proceso.sincronizacion = 0
+    assert otro_proceso.obtener(pin).activo
+
+    _desactivar(pin)
+    cache_credenciales.invalidar_pin(pin)
+
+    assert not otro_proceso.obtener(pin).activo
+    assert otro_proceso.estadisticas()["invalidaciones_compartidas"] == 1
+
+
+def test_sin_sincronizacion_solo_vence_por_tiempo(app, crear_empleado, contar_consultas):
+    _, pin = crear_empleado()
+    otro_proceso = CacheCredenciales()
+    otro_proceso.sincronizacion = -1
+    otro_proceso.obtener(pin)
+
+    _desactivar(pin)
+    cache_credenciales.invalidar_pin(pin)
+
+    with contar_consultas() as sentencias:
+        assert otro_proceso.obtener(pin).activo
+    assert sentencias == []
@@ -0,0 +1,79 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app import db
+from app.models import Credencial, Registro
+from app.utils.asistencia import guardar_marcaciones
+from app.utils.cache_reportes import CacheReportes, cache_reportes
+from app.utils.reportes import FiltrosReporte, pagina_pares, paginar_pares
+
+AYER = date.today() - timedelta(days=1)
+
+
+def _registro(empleado, pin, tipo, fecha_hora):
+    credencial = Credencial.query.filter_by(valor=pin).one()
+    return {
+        "id_persona": empleado.id_persona,
+        "id_credencial": credencial.id_credencial,
+        "id_tipo_registro": tipo,
+        "fecha_hora": fecha_hora,
+        "observacion": "Prueba",
+    }
+
+
+def test_otro_proceso_ve_dias_pasados_sincronizados(app, crear_empleado):
+    empleado, pin = crear_empleado()
+    filtros = FiltrosReporte("", AYER, AYER)
+    # Otro proceso: su propio cache, sin relación con el que invalida asistencia
+    otro_proceso = CacheReportes()
+
+    assert otro_proceso.obtener_pares(filtros) == []
+
+    guardar_marcaciones([_registro(empleado, pin, 1, datetime.combine(AYER, time(8)))])
+
+    pares = otro_proceso.obtener_pares(filtros)
+    assert [par["hora_entrada"] for par in pares] == [time(8)]
+    assert otro_proceso.estadisticas()["invalidaciones_compartidas"] == 1
+
+
+def test_cambio_revertido_no_invalida(app, crear_empleado):
+    crear_empleado()
+    filtros = FiltrosReporte("", AYER, AYER)
+    otro_proceso = CacheReportes()
+    otro_proceso.obtener_pares(filtros)
+
+    cache_reportes.invalidar_todo()
+    db.session.rollback()
+
+    otro_proceso.obtener_pares(filtros)
+    assert otro_proceso.estadisticas()["invalidaciones_compartidas"] == 0
+
+
+@pytest.mark.parametrize("columna", ["fecha", "empleado"])
+@pytest.mark.parametrize("descendente", [True, False])
+def test_orden_en_memoria_igual_al_de_la_consulta(app, crear_empleado, columna, descendente):
+    sin_segundo, pin_sin = crear_empleado("Ana", "Luz")
+    con_segundo, pin_con = crear_empleado("Ana", "Luz")
+    con_segundo.persona.segundo_nombre = "María"
+    homonimo, pin_homonimo = crear_empleado("Ana", "Luz")
+    db.session.commit()
+
+    marcaciones = []
+    for dias in (1, 2):
+        dia = date.today() - timedelta(days=dias)
+        for empleado, pin in ((sin_segundo, pin_sin), (con_segundo, pin_con), (homonimo, pin_homonimo)):
+            # Misma hora para todos: solo registro_id desempata
+            marcaciones.append(_registro(empleado, pin, 1, datetime.combine(dia, time(8))))
+            marcaciones.append(_registro(empleado, pin, 2, datetime.combine(dia, time(17))))
+    guardar_marcaciones(marcaciones)
+
+    filtros = FiltrosReporte("", date.today() - timedelta(days=2), AYER)
+    _, _, en_memoria = paginar_pares(
+        cache_reportes.obtener_pares(filtros), 0, 100, columna=columna, descendente=descendente
+    )
+    _, _, en_base = pagina_pares(filtros, 0, 100, columna=columna, descendente=descendente)
+
+    assert len(en_base) == 6
+    assert [par["registro_id"] for par in en_memoria] == [par["registro_id"] for par in en_base]
+    assert Registro.query.count() == 12
@@ -0,0 +1,206 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Registro
+from app.utils import asistencia
+from app.utils.cola_registros import ColaRegistros
+
+
+def _pid_terminado():
+    proceso = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    return int(proceso.stdout)
+
+
+def _escribir_spool(ruta, marcaciones):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        for marcacion in marcaciones:
+            archivo.write(json.dumps(dict(marcacion, fecha_hora=marcacion["fecha_hora"].isoformat())) + "\n")
+
+
+def _marcacion(empleado, pin, tipo, fecha_hora):
+    from app.utils.cache_credenciales import cache_credenciales
+
+    credencial = cache_credenciales.obtener(pin)
+    return {
+        "id_persona": empleado.id_persona,
+        "id_credencial": credencial.id_credencial,
+        "id_tipo_registro": tipo,
+        "fecha_hora": fecha_hora,
+        "observacion": "Registro de prueba",
+    }
+
+
+@pytest.fixture
+def nueva_cola(crear_servicio, tmp_path, monkeypatch):
+    """Crea una cola de escritura diferida con el spool en un directorio temporal"""
+
+    def crear(**config):
+        valores = {
+            "REGISTRO_WRITE_BEHIND": True,
+            "REGISTRO_COLA_SPOOL": str(tmp_path / "registro_spool.jsonl"),
+            "REGISTRO_COLA_ESPERA_MS": 10,
+        }
+        cola = crear_servicio(ColaRegistros, **dict(valores, **config))
+        # La cola nueva atiende las marcaciones de la prueba
+        monkeypatch.setattr(asistencia, "cola_registros", cola)
+        return cola
+
+    return crear
+
+
+def test_spool_por_proceso(nueva_cola, tmp_path):
+    cola = nueva_cola()
+    assert os.path.basename(cola.ruta_spool) == f"registro_spool.{os.getpid()}.jsonl"
+    cola.detener()
+    # Sin pendientes el archivo del proceso se elimina al detener
+    assert not os.path.exists(cola.ruta_spool)
+
+
+def test_adopta_solo_spools_de_procesos_terminados(app, nueva_cola, crear_empleado, tmp_path):
+    empleado, pin = crear_empleado()
+    otro, pin_otro = crear_empleado(primer_nombre="Luis")
+    hace_una_hora = datetime.now() - timedelta(hours=1)
+
+    huerfano = tmp_path / f"registro_spool.{_pid_terminado()}.jsonl"
+    _escribir_spool(huerfano, [_marcacion(empleado, pin, 1, hace_una_hora)])
+    # Spool de un proceso vivo (por ejemplo, otro worker): no se toca
+    vivo = tmp_path / f"registro_spool.{os.getppid()}.jsonl"
+    _escribir_spool(vivo, [_marcacion(otro, pin_otro, 1, hace_una_hora)])
+
+    cola = nueva_cola()
+    cola.detener()
+
+    assert not huerfano.exists()
+    assert vivo.exists()
+    registros = Registro.query.all()
+    assert [(r.id_persona, r.fecha_hora) for r in registros] == [(empleado.id_persona, hace_una_hora)]
+
+
+def test_spool_sin_pid_de_versiones_anteriores(app, nueva_cola, crear_empleado, tmp_path):
+    empleado, pin = crear_empleado()
+    hace_una_hora = datetime.now() - timedelta(hours=1)
+    _escribir_spool(tmp_path / "registro_spool.jsonl", [_marcacion(empleado, pin, 1, hace_una_hora)])
+
+    cola = nueva_cola()
+    cola.detener()
+
+    assert not (tmp_path / "registro_spool.jsonl").exists()
+    assert Registro.query.count() == 1
+
+
+def test_estado_incluye_marcaciones_recuperadas(app, nueva_cola, crear_empleado, tmp_path):
+    empleado, pin = crear_empleado()
+    hace_una_hora = datetime.now() - timedelta(hours=1)
+    _escribir_spool(
+        tmp_path / f"registro_spool.{_pid_terminado()}.jsonl",
+        [_marcacion(empleado, pin, 1, hace_una_hora)],
+    )
+
+    # Espera larga: el ingreso recuperado sigue pendiente al validar
+    cola = nueva_cola(REGISTRO_COLA_ESPERA_MS=5000)
+    assert asistencia.registrar_marcacion(pin, "ingreso")["estado"] == "rechazado"
+    assert asistencia.registrar_marcacion(pin, "salida")["estado"] == "registrado"
+    cola.detener()
+
+    tipos = [r.id_tipo_registro for r in Registro.query.order_by(Registro.fecha_hora)]
+    assert tipos == [1, 2]
+
+
+def test_marcacion_que_siempre_falla_pasa_a_descartados(app, nueva_cola, crear_empleado, tmp_path):
+    empleado, pin = crear_empleado()
+    otro, pin_otro = crear_empleado(primer_nombre="Luis")
+    hace_una_hora = datetime.now() - timedelta(hours=1)
+    invalida = dict(_marcacion(otro, pin_otro, 1, hace_una_hora), id_credencial=None)
+    _escribir_spool(
+        tmp_path / f"registro_spool.{_pid_terminado()}.jsonl",
+        [_marcacion(empleado, pin, 1, hace_una_hora), invalida],
+    )
+
+    cola = nueva_cola(REGISTRO_COLA_REINTENTOS=2)
+    cola.espera_reintento = 0.01
+    for _ in range(500):
+        if cola.estadisticas()["descartados"]:
+            break
+        time.sleep(0.01)
+    cola.detener()
+
+    assert cola.estadisticas()["descartados"] == 1
+    assert cola.estadisticas()["profundidad"] == 0
+    with open(cola.ruta_descartados, encoding="utf-8") as archivo:
+        descartadas = [json.loads(linea) for linea in archivo]
+    assert [d["id_persona"] for d in descartadas] == [otro.id_persona]
+    assert descartadas[0]["error"]
+    assert [r.id_persona for r in Registro.query.all()] == [empleado.id_persona]
+
+
+def _esperar_vacia(cola):
+    for _ in range(500):
+        if not cola.estadisticas()["profundidad"]:
+            return
+        time.sleep(0.01)
+    raise AssertionError("La cola no se vació")
+
+
+def test_ingreso_aceptado_en_dos_procesos_se_guarda_una_vez(app, nueva_cola, crear_empleado, tmp_path):
+    empleado, pin = crear_empleado()
+    # Cada worker valida contra la base de datos y su propia cola
+    primero = nueva_cola(REGISTRO_COLA_ESPERA_MS=5000)
+    assert asistencia.registrar_marcacion(pin, "ingreso")["estado"] == "registrado"
+    segundo = nueva_cola(
+        REGISTRO_COLA_ESPERA_MS=5000, REGISTRO_COLA_SPOOL=str(tmp_path / "otro_worker.jsonl")
+    )
+    assert asistencia.registrar_marcacion(pin, "ingreso")["estado"] == "registrado"
+
+    primero.detener()
+    segundo.detener()
+
+    assert Registro.query.filter_by(id_persona=empleado.id_persona).count() == 1
+    assert segundo.estadisticas()["descartados"] == 1
+    with open(segundo.ruta_descartados, encoding="utf-8") as archivo:
+        descartada = json.loads(archivo.readline())
+    assert descartada["error"].startswith("Ya tiene un registro de ingreso activo")
+
+
+def test_spool_se_trunca_sin_reescribirse(app, nueva_cola, crear_empleado):
+    _, pin = crear_empleado()
+    cola = nueva_cola()
+    inodo = os.stat(cola.ruta_spool).st_ino
+
+    assert asistencia.registrar_marcacion(pin, "ingreso")["estado"] == "registrado"
+    _esperar_vacia(cola)
+
+    assert os.stat(cola.ruta_spool).st_size == 0
+    assert os.stat(cola.ruta_spool).st_ino == inodo
+
+
+def test_spool_se_compacta_cuando_lo_guardado_supera_a_lo_pendiente(app, nueva_cola, tmp_path):
+    cola = nueva_cola(REGISTRO_COLA_LOTE=2)
+    cola.detener()
+    cola._spool = open(cola.ruta_spool, "a", encoding="utf-8")
+    marcaciones = [
+        {"id_persona": numero, "fecha_hora": datetime(2024, 3, 4, 8, numero)} for numero in range(6)
+    ]
+    for marcacion in marcaciones:
+        cola._escribir_spool(marcacion)
+
+    # Dos guardadas y cuatro pendientes: el spool sigue igual
+    cola._pendientes = marcaciones[2:]
+    cola._guardadas_spool = 2
+    cola._compactar_spool()
+    with open(cola.ruta_spool, encoding="utf-8") as archivo:
+        assert len(archivo.readlines()) == 6
+
+    # Cinco guardadas y una pendiente: solo queda la pendiente
+    cola._pendientes = marcaciones[5:]
+    cola._guardadas_spool = 5
+    cola._compactar_spool()
+    cola._spool.close()
+    with open(cola.ruta_spool, encoding="utf-8") as archivo:
+        assert [json.loads(linea)["id_persona"] for linea in archivo] == [5]
@@ -0,0 +1,45 @@
+from datetime import date
+
+URL = "/admin/empleados/credenciales/estado"
+
+
+def _marcar(client, pin, accion="ingreso"):
+    return client.post("/registro/marcar", json={"pin": pin, "accion": accion})
+
+
+def test_desactivar_en_bloque_rechaza_los_pin_de_inmediato(admin_client, client, crear_empleado):
+    empleados = [crear_empleado(f"Emp{numero}", "Prueba") for numero in range(3)]
+    # Los PIN quedan en el cache antes del cambio
+    for _, pin in empleados:
+        assert _marcar(client, pin).status_code == 200
+    desactivados = [empleado.empleado_id for empleado, _ in empleados[:2]]
+
+    respuesta = admin_client.post(URL, json={"activo": False, "empleado_ids": desactivados})
+
+    assert respuesta.get_json()["afectadas"] == 2
+    for _, pin in empleados[:2]:
+        marcacion = _marcar(client, pin, "salida")
+        assert marcacion.status_code == 409
+        assert marcacion.get_json()["message"] == "Credencial no reconocida o inactiva"
+    assert _marcar(client, empleados[2][1], "salida").status_code == 200
+
+
+def test_reactivar_por_fecha_de_contratacion(admin_client, client, crear_empleado):
+    antiguo, pin_antiguo = crear_empleado("Ana", fecha_contratacion=date(2020, 5, 1))
+    nuevo, pin_nuevo = crear_empleado("Luis", fecha_contratacion=date(2024, 5, 1))
+    filtro = {"contratado_hasta": "2021-12-31"}
+
+    assert admin_client.post(URL, json={"activo": False, **filtro}).get_json()["afectadas"] == 1
+    assert _marcar(client, pin_antiguo).status_code == 409
+    assert _marcar(client, pin_nuevo).status_code == 200
+
+    # Solo cambian las credenciales que no tienen ya el estado pedido
+    assert admin_client.post(URL, json={"activo": False, **filtro}).get_json()["afectadas"] == 0
+    assert admin_client.post(URL, json={"activo": True, **filtro}).get_json()["afectadas"] == 1
+    assert _marcar(client, pin_antiguo).status_code == 200
+
+
+def test_sin_filtros_se_rechaza(admin_client):
+    respuesta = admin_client.post(URL, json={"activo": False})
+
+    assert respuesta.status_code == 400
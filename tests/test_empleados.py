@@ -0,0 +1,41 @@
+import pytest
+
+from app import db
+
+
+def _contar_sentencias_lista(admin_client, contar_consultas):
+    with contar_consultas() as sentencias:
+        respuesta = admin_client.get("/admin/empleados/datos?draw=1&start=0&length=500")
+    assert respuesta.status_code == 200
+    return len(respuesta.get_json()["data"]), len(sentencias)
+
+
+def test_lista_de_empleados_no_crece_con_las_filas(admin_client, contar_consultas, crear_empleado):
+    for numero in range(10):
+        crear_empleado(f"Emp{numero:03d}", "Prueba")
+    filas_10, sentencias_10 = _contar_sentencias_lista(admin_client, contar_consultas)
+
+    for numero in range(10, 100):
+        crear_empleado(f"Emp{numero:03d}", "Prueba")
+    filas_100, sentencias_100 = _contar_sentencias_lista(admin_client, contar_consultas)
+
+    # El administrador por defecto también aparece en la lista
+    assert (filas_10, filas_100) == (11, 101)
+    # Sin N+1: la misma cantidad de sentencias para 10 y para 100 empleados
+    assert sentencias_100 == sentencias_10
+    assert sentencias_10 <= 5
+
+
+@pytest.mark.parametrize("busqueda", ["T00000001", "t00000001", "0001"])
+def test_busqueda_por_documento_alfanumerico(admin_client, crear_empleado, busqueda):
+    # LIKE distingue mayúsculas, como en PostgreSQL
+    db.session.execute(db.text("PRAGMA case_sensitive_like = ON"))
+    empleado, _ = crear_empleado("Lucía", "Rojas")
+    crear_empleado("Mario", "Soto")
+    assert empleado.persona.documento == "T00000001"
+
+    respuesta = admin_client.get(f"/admin/empleados/datos?draw=1&start=0&length=10&search[value]={busqueda}")
+
+    datos = respuesta.get_json()
+    assert datos["recordsFiltered"] == 1
+    assert "T00000001" in str(datos["data"][0])
@@ -0,0 +1,86 @@
+import csv
+import io
+import zipfile
+from datetime import date, datetime, time
+from xml.etree import ElementTree
+
+import pytest
+
+from app import db
+from app.models import Credencial, Registro
+from app.utils.exportacion import COLUMNAS
+
+DIA = date(2024, 3, 4)
+# Comas, comillas y caracteres especiales de XML en el nombre
+APELLIDO = 'O"Neil, Pérez & <Hijos>'
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+@pytest.fixture
+def con_marcaciones(app, crear_empleado):
+    empleado, pin = crear_empleado("Ana", APELLIDO)
+    credencial = Credencial.query.filter_by(valor=pin).one()
+    for tipo, hora in ((1, time(8)), (2, time(17, 30))):
+        db.session.add(
+            Registro(
+                id_persona=empleado.id_persona,
+                id_credencial=credencial.id_credencial,
+                id_tipo_registro=tipo,
+                fecha_hora=datetime.combine(DIA, hora),
+            )
+        )
+    db.session.commit()
+
+
+def _exportar(admin_client, formato):
+    return admin_client.get(
+        "/admin/reportes/exportar",
+        query_string={
+            "formato": formato,
+            "fecha_inicio": DIA.isoformat(),
+            "fecha_fin": DIA.isoformat(),
+        },
+    )
+
+
+def test_exportar_csv(admin_client, con_marcaciones):
+    respuesta = _exportar(admin_client, "csv")
+
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == "text/csv"
+    assert respuesta.headers["Content-Disposition"] == (
+        "attachment; filename=reporte_asistencia_2024-03-04_2024-03-04.csv"
+    )
+    contenido = respuesta.get_data()
+    assert contenido.startswith(b"\xef\xbb\xbf")
+    filas = list(csv.reader(io.StringIO(contenido.decode("utf-8-sig"), newline="")))
+    assert filas[0] == COLUMNAS
+    assert len(filas) == 2
+    assert APELLIDO in filas[1][0]
+    assert filas[1][1:] == ["2024-03-04", "08:00", "17:30"]
+
+
+def test_exportar_xlsx(admin_client, con_marcaciones):
+    respuesta = _exportar(admin_client, "xlsx")
+
+    assert respuesta.status_code == 200
+    libro = zipfile.ZipFile(io.BytesIO(respuesta.get_data()))
+    assert libro.testzip() is None
+    partes = {"[Content_Types].xml", "xl/workbook.xml", "xl/worksheets/sheet1.xml"}
+    assert partes <= set(libro.namelist())
+    hoja = ElementTree.fromstring(libro.read("xl/worksheets/sheet1.xml"))
+    filas = [
+        [celda.findtext("x:is/x:t", namespaces=NS) for celda in fila.findall("x:c", NS)]
+        for fila in hoja.findall("x:sheetData/x:row", NS)
+    ]
+    assert filas[0] == COLUMNAS
+    assert len(filas) == 2
+    assert APELLIDO in filas[1][0]
+    assert filas[1][1:] == ["2024-03-04", "08:00", "17:30"]
+
+
+def test_formato_no_valido_vuelve_a_reportes(admin_client):
+    respuesta = _exportar(admin_client, "pdf")
+
+    assert respuesta.status_code == 302
+    assert respuesta.headers["Location"].endswith("/admin/reportes")
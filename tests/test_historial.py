@@ -0,0 +1,120 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import Credencial, Registro, Usuario
+
+URL = "/profile/history/registros"
+
+
+@pytest.fixture
+def empleado_client(app, crear_empleado):
+    """Cliente con la sesión iniciada como un empleado con PIN; devuelve (cliente, empleado)"""
+    empleado, _ = crear_empleado()
+    usuario = Usuario(id_persona=empleado.id_persona, id_rol=2, contrasena="x")
+    db.session.add(usuario)
+    db.session.commit()
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario.id_usuario)
+        sesion["_fresh"] = True
+    return cliente, empleado
+
+
+def _registrar(empleado, horas):
+    credencial = Credencial.query.filter_by(id_persona=empleado.id_persona).one()
+    registros = [
+        Registro(
+            id_persona=empleado.id_persona,
+            id_credencial=credencial.id_credencial,
+            id_tipo_registro=1 if numero % 2 == 0 else 2,
+            fecha_hora=hora,
+        )
+        for numero, hora in enumerate(horas)
+    ]
+    db.session.add_all(registros)
+    db.session.commit()
+    return [(registro.fecha_hora, registro.registro_id) for registro in registros]
+
+
+def _recorrer(cliente, limite, **parametros):
+    # Sigue el cursor hasta la última página; devuelve las claves y los tamaños de página
+    claves = []
+    paginas = []
+    while True:
+        respuesta = cliente.get(URL, query_string=dict(parametros, limite=limite))
+        assert respuesta.status_code == 200
+        datos = respuesta.get_json()
+        paginas.append(len(datos["registros"]))
+        claves.extend(
+            (datetime.fromisoformat(r["fecha_hora"]), r["registro_id"]) for r in datos["registros"]
+        )
+        cursor = datos["siguiente_cursor"]
+        if cursor is None:
+            return claves, paginas
+        parametros.update(cursor_fecha_hora=cursor["fecha_hora"], cursor_id=cursor["registro_id"])
+
+
+@pytest.mark.parametrize("orden", ["desc", "asc"])
+def test_cursor_no_pierde_ni_repite_registros_con_la_misma_hora(empleado_client, orden):
+    cliente, empleado = empleado_client
+    # Tres registros a la misma hora cruzan el límite entre páginas
+    misma_hora = datetime(2024, 3, 4, 12, 0)
+    claves = _registrar(
+        empleado,
+        [datetime(2024, 3, 4, 8, 0), misma_hora, misma_hora, misma_hora, datetime(2024, 3, 4, 17, 0)],
+    )
+
+    obtenidas, paginas = _recorrer(cliente, 2, orden=orden)
+
+    assert obtenidas == sorted(claves, reverse=orden == "desc")
+    assert paginas == [2, 2, 1]
+
+
+def test_ultima_pagina_completa_no_tiene_cursor(empleado_client):
+    cliente, empleado = empleado_client
+    claves = _registrar(empleado, [datetime(2024, 3, dia, 8, 0) for dia in range(1, 5)])
+
+    obtenidas, paginas = _recorrer(cliente, 2)
+
+    assert obtenidas == sorted(claves, reverse=True)
+    assert paginas == [2, 2]
+
+
+def test_rango_de_fechas_inclusivo(empleado_client):
+    cliente, empleado = empleado_client
+    claves = _registrar(
+        empleado,
+        [
+            datetime(2024, 3, 3, 23, 59),
+            datetime(2024, 3, 4, 0, 0),
+            datetime(2024, 3, 5, 23, 59),
+            datetime(2024, 3, 6, 0, 0),
+        ],
+    )
+
+    obtenidas, _ = _recorrer(cliente, 10, desde="2024-03-04", hasta="2024-03-05", orden="asc")
+
+    assert obtenidas == claves[1:3]
+
+
+def test_cursor_incompleto_se_rechaza(empleado_client):
+    cliente, _ = empleado_client
+
+    respuesta = cliente.get(URL, query_string={"cursor_fecha_hora": "2024-03-04T08:00:00"})
+
+    assert respuesta.status_code == 400
+
+
+def test_historial_semanal_sin_pin_activo(empleado_client):
+    cliente, empleado = empleado_client
+    _registrar(empleado, [datetime(2024, 3, 4, 8, 0)])
+    assert len(cliente.get("/profile/history?week=2024-W10").get_json()["registros"]) == 1
+
+    Credencial.query.filter_by(id_persona=empleado.id_persona).update({"activo": False})
+    db.session.commit()
+
+    respuesta = cliente.get("/profile/history?week=2024-W10")
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["message"] == "No se encontró PIN para este usuario"
@@ -0,0 +1,51 @@
+from app.models import CargoEmpleado, Persona
+from app.utils.importacion import importar_empleados
+
+ENCABEZADO = "primer_nombre,primer_apellido,documento,correo,cargo,fecha_contratacion,contrasena\n"
+
+
+def _fila(documento, correo):
+    cargo = CargoEmpleado.query.first().id_cargo
+    return f"Luis,Gómez,{documento},{correo},{cargo},2024-01-01,secreto123\n"
+
+
+def test_correo_existente_con_otras_mayusculas_se_rechaza(app, crear_empleado):
+    empleado, _ = crear_empleado()
+    correo = empleado.persona.correo
+
+    resumen = importar_empleados(ENCABEZADO + _fila("D0000001", correo.upper()))
+
+    assert resumen["creados"] == 0
+    assert resumen["filas"][0]["mensaje"] == "Ya existe una persona con ese correo"
+    assert Persona.query.filter(Persona.documento == "D0000001").count() == 0
+
+
+def test_correo_repetido_en_el_archivo_con_otras_mayusculas(app):
+    contenido = (
+        ENCABEZADO
+        + _fila("D0000001", "luis.gomez@empresa.com")
+        + _fila("D0000002", "Luis.Gomez@Empresa.com")
+    )
+
+    resumen = importar_empleados(contenido, solo_validar=True)
+
+    assert [fila["estado"] for fila in resumen["filas"]] == ["valido", "error"]
+    assert resumen["filas"][1]["mensaje"] == "Correo repetido en la línea 2"
+
+
+def test_fila_con_campo_demasiado_largo_se_rechaza_y_las_demas_se_guardan(app):
+    encabezado = ENCABEZADO.rstrip("\n") + ",segundo_nombre\n"
+    contenido = (
+        encabezado
+        + _fila("D0000001", "luis.gomez@empresa.com").rstrip("\n") + ",Andrés\n"
+        + _fila("D0000002", "luis.perez@empresa.com").rstrip("\n") + "," + "x" * 51 + "\n"
+        + _fila("D0000003", "luis.diaz@empresa.com").rstrip("\n") + ",\n"
+    )
+
+    resumen = importar_empleados(contenido, lote=1)
+
+    assert [fila["estado"] for fila in resumen["filas"]] == ["creado", "error", "creado"]
+    assert resumen["filas"][1]["mensaje"] == "El campo segundo_nombre no puede tener más de 50 caracteres"
+    documentos = {documento for (documento,) in Persona.query.with_entities(Persona.documento)}
+    assert {"D0000001", "D0000003"} <= documentos
+    assert "D0000002" not in documentos
@@ -0,0 +1,46 @@
+import pytest
+
+import verificar_indices
+from app import db
+
+
+@pytest.fixture
+def datos_indices(app, monkeypatch):
+    monkeypatch.setattr(verificar_indices, "PERSONAS", 80)
+    monkeypatch.setattr(verificar_indices, "DIAS", 30)
+    verificar_indices.sembrar_datos()
+    with db.engine.begin() as conexion:
+        conexion.exec_driver_sql("ANALYZE")
+
+
+def test_modelos_declaran_indices_criticos(app):
+    indices = {
+        indice.name
+        for tabla in db.metadata.sorted_tables
+        for indice in tabla.indexes
+    }
+    assert {
+        "ix_registro_persona_tipo_fecha",
+        "ix_registro_fecha_hora",
+        "ix_registro_persona_fecha",
+        "ix_credencial_persona",
+        "ix_usuarios_persona",
+    } <= indices
+
+
+@pytest.mark.parametrize(
+    "nombre",
+    [
+        "registro: último ingreso por persona",
+        "registro: estado de asistencia",
+        "reportes: rango de fechas",
+        "reportes: entradas de hoy",
+        "perfil: historial paginado por cursor",
+        "perfil: PIN de la persona",
+        "sesión: usuario por persona",
+    ],
+)
+def test_consultas_criticas_usan_indices(datos_indices, nombre):
+    consulta = verificar_indices.consultas_criticas()[nombre]
+    recorridos, plan = verificar_indices.explicar(consulta)
+    assert recorridos == [], plan
@@ -0,0 +1,108 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app import db
+from app.models import Credencial, Jornada, Registro
+from app.utils.archivo import archivar_registros
+from app.utils.asistencia import aplicar_registro, obtener_estado
+from app.utils.jornadas import reconstruir_jornadas
+from app.utils.reportes import FiltrosReporte, obtener_pares
+
+DIA = date(2024, 3, 4)
+SIGUIENTE = DIA + timedelta(days=1)
+I, S = 1, 2
+
+# Marcaciones (tipo, día, hora) y jornada esperada por día:
+# (pares, minutos trabajados, ingresos abiertos, primer ingreso abierto)
+CASOS = {
+    "alternados": (
+        [(I, DIA, 8), (S, DIA, 12), (I, DIA, 13), (S, DIA, 17)],
+        {DIA: (2, 480, 0, None)},
+    ),
+    "dos_ingresos": (
+        [(I, DIA, 8), (I, DIA, 9), (S, DIA, 17)],
+        {DIA: (1, 540, 1, time(9))},
+    ),
+    "mezclados": (
+        [(S, DIA, 6), (I, DIA, 8), (I, DIA, 9), (S, DIA, 10), (S, DIA, 11), (S, DIA, 12), (I, DIA, 13)],
+        {DIA: (2, 240, 1, time(13))},
+    ),
+    "cruza_medianoche": (
+        [(I, DIA, 22), (S, SIGUIENTE, 6), (I, SIGUIENTE, 8), (S, SIGUIENTE, 12)],
+        {DIA: (0, 0, 0, None), SIGUIENTE: (1, 240, 0, None)},
+    ),
+}
+
+
+def _marcar_en_linea(empleado, pin, marcaciones):
+    # Una transacción por marcación, como el registro en línea
+    credencial = Credencial.query.filter_by(valor=pin).one()
+    for tipo, dia, hora in marcaciones:
+        registro = Registro(
+            id_persona=empleado.id_persona,
+            id_credencial=credencial.id_credencial,
+            id_tipo_registro=tipo,
+            fecha_hora=datetime.combine(dia, time(hora)),
+        )
+        db.session.add(registro)
+        aplicar_registro(obtener_estado(empleado.id_persona), registro)
+        db.session.commit()
+
+
+def _resumen():
+    db.session.expire_all()
+    return {
+        jornada.fecha: (
+            jornada.pares,
+            jornada.minutos_trabajados,
+            jornada.ingresos_abiertos,
+            jornada.fecha_hora_ingreso_abierto.time() if jornada.fecha_hora_ingreso_abierto else None,
+        )
+        for jornada in Jornada.query
+    }
+
+
+@pytest.mark.parametrize("caso", sorted(CASOS))
+def test_jornada_en_linea_igual_a_reconstruida(app, crear_empleado, caso):
+    marcaciones, esperadas = CASOS[caso]
+    empleado, pin = crear_empleado()
+
+    _marcar_en_linea(empleado, pin, marcaciones)
+    en_linea = _resumen()
+    reconstruir_jornadas()
+
+    assert en_linea == esperadas
+    assert _resumen() == esperadas
+
+
+@pytest.mark.parametrize("caso", sorted(CASOS))
+def test_jornada_cuenta_los_mismos_pares_que_reportes(app, crear_empleado, caso):
+    marcaciones, esperadas = CASOS[caso]
+    empleado, pin = crear_empleado()
+
+    _marcar_en_linea(empleado, pin, marcaciones)
+    pares = obtener_pares(FiltrosReporte("", DIA, SIGUIENTE))
+
+    completos = [par for par in pares if par["hora_entrada"] and par["hora_salida"]]
+    assert len(completos) == sum(pares for pares, *_ in esperadas.values())
+
+
+def test_reconstruir_conserva_las_jornadas_archivadas(app, crear_empleado):
+    empleado, pin = crear_empleado()
+    _marcar_en_linea(empleado, pin, [(I, DIA, 8), (S, DIA, 17)])
+    _marcar_en_linea(empleado, pin, [(I, date(2024, 4, 2), 8), (S, date(2024, 4, 2), 12)])
+    archivar_registros(date(2024, 4, 1))
+
+    reconstruir_jornadas()
+
+    assert _resumen() == {DIA: (1, 540, 0, None), date(2024, 4, 2): (1, 240, 0, None)}
+
+
+def test_reconstruir_un_rango_cierra_el_turno_que_sigue_al_dia_siguiente(app, crear_empleado):
+    empleado, pin = crear_empleado()
+    _marcar_en_linea(empleado, pin, [(I, DIA, 22), (S, SIGUIENTE, 6)])
+
+    reconstruir_jornadas(DIA, DIA)
+
+    assert _resumen()[DIA] == (0, 0, 0, None)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from app.utils.limitador import limitador_intentos
+
+
+def _lote(pines, inicio=None):
+    inicio = inicio or datetime.now() - timedelta(hours=1)
+    return {
+        "registros": [
+            {
+                "pin": pin,
+                "accion": "ingreso",
+                "timestamp": (inicio + timedelta(seconds=i)).isoformat(),
+            }
+            for i, pin in enumerate(pines)
+        ]
+    }
+
+
+def test_marcar_limita_barrido_de_pin(client):
+    for i in range(limitador_intentos.max_fallos):
+        respuesta = client.post("/registro/marcar", json={"pin": f"ZZZ{i:04d}", "accion": "ingreso"})
+        assert respuesta.status_code == 409
+
+    respuesta = client.post("/registro/marcar", json={"pin": "ZZZ9999", "accion": "ingreso"})
+    assert respuesta.status_code == 429
+
+
+def test_lote_corta_barrido_de_pin(client, crear_empleado, contar_consultas):
+    _, pin = crear_empleado()
+    pines = [f"ZZZ{i:04d}" for i in range(999)] + [pin]
+
+    with contar_consultas() as sentencias:
+        respuesta = client.post("/registro/lote", json=_lote(pines))
+
+    datos = respuesta.get_json()
+    assert respuesta.status_code == 200
+    assert datos["rechazados"] == limitador_intentos.max_fallos
+    assert datos["limitados"] == len(pines) - limitador_intentos.max_fallos
+    assert datos["registrados"] == 0
+    # El PIN válido después del barrido tampoco se procesa
+    assert datos["resultados"][-1]["estado"] == "limitado"
+    consultas_credencial = [s for s in sentencias if "FROM credencial" in s]
+    assert len(consultas_credencial) <= limitador_intentos.max_fallos
+
+
+def test_lote_rechazado_si_la_direccion_ya_esta_limitada(client):
+    for _ in range(limitador_intentos.max_fallos):
+        limitador_intentos.registrar_fallo("127.0.0.1")
+
+    respuesta = client.post("/registro/lote", json=_lote(["ZZZ0001"]))
+    assert respuesta.status_code == 429
+
+
+def test_lote_con_pin_validos_no_se_limita(client, crear_empleado):
+    pines = [crear_empleado(primer_nombre=f"Emp{i}")[1] for i in range(30)]
+
+    datos = client.post("/registro/lote", json=_lote(pines)).get_json()
+    assert datos["registrados"] == 30
+    assert datos["limitados"] == 0
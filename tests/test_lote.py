@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from app.models import Registro
+
+
+def _item(pin, accion, fecha_hora):
+    return {"pin": pin, "accion": accion, "timestamp": fecha_hora.isoformat()}
+
+
+def _enviar(client, items):
+    respuesta = client.post("/registro/lote", json={"registros": items})
+    assert respuesta.status_code == 200
+    return respuesta.get_json()
+
+
+def test_lote_valida_alternancia_por_persona(client, crear_empleado):
+    _, pin = crear_empleado()
+    base = datetime.now() - timedelta(hours=5)
+
+    datos = _enviar(
+        client,
+        [
+            # Desordenado: el lote se ordena por fecha antes de validar
+            _item(pin, "salida", base + timedelta(hours=2)),
+            _item(pin, "ingreso", base),
+            _item(pin, "ingreso", base + timedelta(hours=3)),
+            _item(pin, "ingreso", base + timedelta(hours=4)),
+        ],
+    )
+
+    estados = [resultado["estado"] for resultado in datos["resultados"]]
+    assert estados == ["registrado", "registrado", "registrado", "rechazado"]
+    assert Registro.query.count() == 3
+
+
+def test_lote_reintentado_no_duplica(client, crear_empleado):
+    _, pin = crear_empleado()
+    base = datetime.now() - timedelta(hours=5)
+    items = [_item(pin, "ingreso", base), _item(pin, "salida", base + timedelta(hours=1))]
+
+    assert _enviar(client, items)["registrados"] == 2
+    datos = _enviar(client, items)
+    assert datos["duplicados"] == 2
+    assert Registro.query.count() == 2
+
+
+def test_lote_rechaza_fechas_futuras(app, client, crear_empleado):
+    _, pin = crear_empleado()
+    desfase = app.config["REGISTRO_LOTE_DESFASE_MAX"]
+    ahora = datetime.now()
+
+    datos = _enviar(
+        client,
+        [
+            _item(pin, "ingreso", ahora + timedelta(seconds=desfase + 60)),
+            _item(pin, "ingreso", ahora - timedelta(minutes=5)),
+        ],
+    )
+
+    assert [r["estado"] for r in datos["resultados"]] == ["rechazado", "registrado"]
+    assert "posterior" in datos["resultados"][0]["mensaje"]
+
+
+def test_lote_acepta_desfase_pequenio(client, crear_empleado):
+    _, pin = crear_empleado()
+    datos = _enviar(client, [_item(pin, "ingreso", datetime.now() + timedelta(seconds=30))])
+    assert datos["registrados"] == 1
+
+
+def test_lote_rechaza_fechas_demasiado_antiguas(app, client, crear_empleado):
+    _, pin = crear_empleado()
+    dias = app.config["REGISTRO_LOTE_ANTIGUEDAD_DIAS"]
+    ahora = datetime.now()
+
+    datos = _enviar(
+        client,
+        [
+            _item(pin, "ingreso", ahora - timedelta(days=dias, hours=1)),
+            _item(pin, "ingreso", ahora - timedelta(days=dias - 1)),
+        ],
+    )
+
+    assert [r["estado"] for r in datos["resultados"]] == ["rechazado", "registrado"]
+    assert "antigua" in datos["resultados"][0]["mensaje"]
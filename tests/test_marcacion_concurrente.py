@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from app.models import Registro
+
+QUIOSCOS = 8
+
+
+@pytest.fixture
+def base_datos(tmp_path):
+    """SQLite en archivo: cada hilo usa su propia conexión"""
+    return f"sqlite:///{tmp_path / 'marcas.db'}"
+
+
+def _marcar_en_paralelo(app, pines, accion="ingreso"):
+    # Todos los quioscos envían a la vez, después de una barrera común
+    barrera = threading.Barrier(len(pines))
+    codigos = [None] * len(pines)
+
+    def quiosco(indice, pin):
+        cliente = app.test_client()
+        barrera.wait()
+        respuesta = cliente.post("/registro/marcar", json={"pin": pin, "accion": accion})
+        codigos[indice] = respuesta.status_code
+
+    hilos = [threading.Thread(target=quiosco, args=item) for item in enumerate(pines)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(timeout=30)
+    return codigos
+
+
+def test_doble_toque_en_varios_quioscos_registra_una_sola_marcacion(app, crear_empleado):
+    _, pin = crear_empleado()
+
+    ingresos = _marcar_en_paralelo(app, [pin] * QUIOSCOS, "ingreso")
+    salidas = _marcar_en_paralelo(app, [pin] * QUIOSCOS, "salida")
+
+    assert sorted(ingresos) == [200] + [409] * (QUIOSCOS - 1)
+    assert sorted(salidas) == [200] + [409] * (QUIOSCOS - 1)
+    assert Registro.query.filter_by(id_tipo_registro=1).count() == 1
+    assert Registro.query.filter_by(id_tipo_registro=2).count() == 1
+
+
+def test_personas_distintas_marcan_en_paralelo(app, crear_empleado):
+    pines = [crear_empleado()[1] for _ in range(QUIOSCOS)]
+
+    codigos = _marcar_en_paralelo(app, pines, "ingreso")
+
+    assert codigos == [200] * QUIOSCOS
+    assert Registro.query.count() == QUIOSCOS
@@ -0,0 +1,74 @@
+from datetime import date, datetime, time
+
+import pytest
+
+from app import db
+from app.models import Credencial, Registro
+from app.utils.archivo import archivar_registros
+from app.utils.reportes import FiltrosReporte, obtener_pares
+
+DIA = date(2024, 3, 4)
+I, S = 1, 2
+
+# Marcaciones de un día (tipo, hora) y pares esperados (entrada, salida) con
+# la regla de la vista original: cada salida toma el primer ingreso anterior libre
+CASOS = {
+    "alternados": (
+        [(I, 8), (S, 12), (I, 13), (S, 17)],
+        [(8, 12), (13, 17)],
+    ),
+    "dos_ingresos": (
+        [(I, 8), (I, 9), (S, 17)],
+        [(8, 17), (9, None)],
+    ),
+    "salida_inicial": (
+        [(S, 7), (I, 8), (S, 17)],
+        [(None, 7), (8, 17)],
+    ),
+    "dos_salidas": (
+        [(I, 8), (S, 12), (S, 13)],
+        [(8, 12), (None, 13)],
+    ),
+    "misma_hora": (
+        [(I, 8), (S, 8)],
+        [(8, None), (None, 8)],
+    ),
+    "mezclados": (
+        [(S, 6), (I, 8), (I, 9), (S, 10), (S, 11), (S, 12), (I, 13)],
+        [(None, 6), (8, 10), (9, 11), (None, 12), (13, None)],
+    ),
+}
+
+
+def _hora(valor):
+    return time(valor) if valor is not None else None
+
+
+@pytest.mark.parametrize("fuente", ["tabla", "archivo"])
+@pytest.mark.parametrize("caso", sorted(CASOS))
+def test_emparejamiento(app, crear_empleado, caso, fuente):
+    marcaciones, esperados = CASOS[caso]
+    empleado, pin = crear_empleado()
+    credencial = Credencial.query.filter_by(valor=pin).one()
+    # Inserción directa: datos heredados que no pasaron por la validación de alternancia
+    db.session.add_all(
+        Registro(
+            id_persona=empleado.id_persona,
+            id_credencial=credencial.id_credencial,
+            id_tipo_registro=tipo,
+            fecha_hora=datetime.combine(DIA, time(hora)),
+        )
+        for tipo, hora in marcaciones
+    )
+    db.session.commit()
+    if fuente == "archivo":
+        archivar_registros(date(2024, 4, 1))
+        assert Registro.query.count() == 0
+
+    pares = obtener_pares(FiltrosReporte("", DIA, DIA))
+
+    obtenidos = sorted(
+        ((par["hora_entrada"], par["hora_salida"]) for par in pares),
+        key=lambda par: (par[0] or par[1], par[0] is None),
+    )
+    assert obtenidos == [(_hora(entrada), _hora(salida)) for entrada, salida in esperados]
@@ -0,0 +1,107 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.utils import particiones
+
+URL_POSTGRESQL = os.environ.get("TEST_POSTGRESQL_URL")
+
+
+def test_sumar_meses_cruza_anios():
+    assert particiones._sumar_meses(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert particiones._sumar_meses(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_nombre_particion():
+    assert particiones._nombre_particion(date(2025, 3, 1)) == "registro_p2025_03"
+
+
+# Las pruebas de conversión necesitan PostgreSQL: TEST_POSTGRESQL_URL apunta a
+# una base de datos desechable (se borran y crean todas las tablas)
+requiere_postgresql = pytest.mark.skipif(
+    not URL_POSTGRESQL, reason="TEST_POSTGRESQL_URL no configurada"
+)
+
+
+@pytest.fixture
+def base_datos():
+    """Base de datos PostgreSQL desechable, sin la tabla que conserva la conversión"""
+    motor = create_engine(URL_POSTGRESQL)
+    with motor.begin() as conexion:
+        conexion.execute(text("DROP TABLE IF EXISTS registro_original CASCADE"))
+    motor.dispose()
+    return URL_POSTGRESQL
+
+
+def _sembrar_registros(meses):
+    from app import db
+    from app.models import Credencial, Registro
+
+    credencial = Credencial.query.first()
+    inicio = datetime.now().replace(day=1, hour=8, minute=0, second=0, microsecond=0)
+    filas = []
+    for atras in range(meses):
+        fecha = datetime.combine(particiones._sumar_meses(inicio.date(), -atras), inicio.time())
+        for dia in range(3):
+            filas.append(
+                {
+                    "id_persona": credencial.id_persona,
+                    "id_credencial": credencial.id_credencial,
+                    "id_tipo_registro": 1 + dia % 2,
+                    "fecha_hora": fecha + timedelta(days=dia),
+                    "observacion": "Registro de prueba",
+                }
+            )
+    db.session.execute(db.insert(Registro), filas)
+    db.session.commit()
+    return len(filas)
+
+
+@requiere_postgresql
+def test_simular_conversion_no_cambia_nada(app):
+    from app.models import Registro
+
+    total = _sembrar_registros(4)
+    creadas, copiadas = particiones.convertir_a_particionada(simular=True)
+
+    assert creadas >= 4
+    assert copiadas == total
+    assert not particiones.esta_particionada()
+    assert Registro.query.count() == total
+
+
+@requiere_postgresql
+def test_conversion_con_particion_default(app):
+    from app import db
+    from app.models import Credencial, Registro
+
+    total = _sembrar_registros(4)
+    particiones.convertir_a_particionada()
+    assert particiones.esta_particionada()
+    assert Registro.query.count() == total
+    assert particiones.registros_en_default() == []
+
+    # Un registro fuera de los meses creados cae en DEFAULT en lugar de fallar
+    credencial = Credencial.query.first()
+    antiguo = datetime(2015, 6, 15, 8, 0)
+    db.session.add(
+        Registro(
+            id_persona=credencial.id_persona,
+            id_credencial=credencial.id_credencial,
+            id_tipo_registro=1,
+            fecha_hora=antiguo,
+        )
+    )
+    db.session.commit()
+    assert particiones.registros_en_default() == [(date(2015, 6, 1), 1)]
+
+    creadas, _, en_default = particiones.mantener_particiones()
+    assert en_default == [(date(2015, 6, 1), 1)]
+    assert creadas >= 1
+    assert particiones.registros_en_default() == []
+    assert "registro_p2015_06" in dict(
+        (nombre, inicio) for nombre, inicio, _ in particiones.listar_particiones()
+    )
+    assert Registro.query.count() == total + 1
@@ -0,0 +1,76 @@
+import pytest
+
+from app import db
+from app.models import CargoEmpleado, Credencial, Persona
+from app.utils import pines
+from app.utils.pines import PinesAgotados, generar_pin, id_tipo_pin
+
+# Espacio reducido: ANA0000 a ANA0099
+SUFIJOS = 100
+LIBRE = 42
+
+
+@pytest.fixture
+def espacio_reducido(monkeypatch):
+    monkeypatch.setattr(pines, "SUFIJOS_POR_PREFIJO", SUFIJOS)
+
+
+def _ocupar(crear_empleado, sufijos):
+    empleado, _ = crear_empleado("Luis")
+    id_tipo = id_tipo_pin()
+    db.session.execute(
+        db.insert(Credencial),
+        [
+            {"id_persona": empleado.id_persona, "id_tipo_credencial": id_tipo, "valor": f"ANA{numero:04d}"}
+            for numero in sufijos
+        ],
+    )
+    db.session.commit()
+
+
+def test_prefijo_casi_lleno_encuentra_el_sufijo_libre(app, crear_empleado, espacio_reducido, monkeypatch):
+    _ocupar(crear_empleado, [numero for numero in range(SUFIJOS) if numero != LIBRE])
+    # Los sufijos sorteados nunca incluyen el libre: se usa la lectura del prefijo
+    sortear = pines.random.sample
+
+    def sortear_sin_libre(poblacion, cantidad):
+        if isinstance(poblacion, range):
+            poblacion = [numero for numero in poblacion if numero != LIBRE]
+        return sortear(poblacion, cantidad)
+
+    monkeypatch.setattr(pines.random, "sample", sortear_sin_libre)
+    usados = pines.pines_usados
+    lecturas = []
+    monkeypatch.setattr(pines, "pines_usados", lambda prefijos: lecturas.append(1) or usados(prefijos))
+
+    assert generar_pin("Ana") == f"ANA{LIBRE:04d}"
+    assert lecturas == [1]
+
+
+def test_prefijo_lleno_lanza_pines_agotados(app, crear_empleado, espacio_reducido):
+    _ocupar(crear_empleado, range(SUFIJOS))
+
+    with pytest.raises(PinesAgotados):
+        generar_pin("Ana")
+
+
+def test_crear_empleado_con_prefijo_lleno_muestra_el_error(app, admin_client, crear_empleado, espacio_reducido):
+    _ocupar(crear_empleado, range(SUFIJOS))
+
+    respuesta = admin_client.post(
+        "/admin/empleados/crear",
+        data={
+            "primer_nombre": "Ana",
+            "primer_apellido": "Ruiz",
+            "documento": "D0000001",
+            "correo": "ana.ruiz@empresa.com",
+            "cargo_id": CargoEmpleado.query.first().id_cargo,
+            "fecha_contratacion": "2024-01-01",
+            "contrasena": "secreto123",
+            "confirmar_contrasena": "secreto123",
+        },
+    )
+
+    assert respuesta.status_code == 200
+    assert "No hay PIN disponibles para el prefijo ANA" in respuesta.get_data(as_text=True)
+    assert Persona.query.filter_by(documento="D0000001").count() == 0
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import Future
+from functools import partial
+
+import pytest
+
+from app.utils import trabajos_reportes as modulo
+from app.utils.reportes import FiltrosReporte
+from app.utils.trabajos_reportes import (
+    CANCELADO,
+    EJECUTANDO,
+    FINALIZADOS,
+    TERMINADO,
+    TrabajosReportes,
+)
+
+FILTROS = FiltrosReporte("", None, None)
+
+
+@pytest.fixture
+def nuevos_trabajos(crear_servicio, tmp_path):
+    """Crea administradores de trabajos que comparten directorio, como dos procesos"""
+    return partial(crear_servicio, TrabajosReportes, REPORTES_TRABAJOS_DIR=str(tmp_path))
+
+
+def _esperar(trabajos, id_trabajo):
+    limite = time.monotonic() + 10
+    while time.monotonic() < limite:
+        trabajo = trabajos.obtener(id_trabajo)
+        if trabajo["estado"] in FINALIZADOS and not trabajos._futuros:
+            return trabajo
+        time.sleep(0.01)
+    raise AssertionError("El trabajo no terminó")
+
+
+def test_cancelacion_de_otro_proceso_no_se_pierde_al_publicar_avance(nuevos_trabajos, monkeypatch):
+    propio, otro_proceso = nuevos_trabajos(), nuevos_trabajos()
+    monkeypatch.setattr(modulo, "INTERVALO_AVANCE", -1)
+
+    def exportar(filtros):
+        for numero in range(1000):
+            if numero == 3:
+                otro_proceso.cancelar(trabajo["id"])
+            yield b"x" * 10
+
+    monkeypatch.setattr(modulo, "exportar_csv", exportar)
+    trabajo = propio.enviar(FILTROS, "csv", 1)
+
+    final = _esperar(propio, trabajo["id"])
+    assert final["estado"] == CANCELADO
+    assert final["bytes"] < 1000 * 10
+    assert propio.ruta_resultado(final) is None
+
+
+def test_avance_publicado_despues_de_cancelar_no_la_deshace(nuevos_trabajos, monkeypatch):
+    propio, otro_proceso = nuevos_trabajos(), nuevos_trabajos()
+    monkeypatch.setattr(modulo, "exportar_csv", lambda filtros: iter([b"x"]))
+    trabajo = propio.enviar(FILTROS, "csv", 1)
+    _esperar(propio, trabajo["id"])
+
+    # Estado en curso que otro proceso cancela y el ejecutor vuelve a escribir
+    trabajo = dict(propio.obtener(trabajo["id"]), estado=EJECUTANDO, expira=None)
+    propio._guardar(trabajo)
+    otro_proceso.cancelar(trabajo["id"])
+    propio._guardar(trabajo)
+
+    assert propio.obtener(trabajo["id"])["estado"] == CANCELADO
+
+
+def test_cancelar_trabajo_terminado_devuelve_su_estado(nuevos_trabajos, monkeypatch):
+    propio = nuevos_trabajos()
+    monkeypatch.setattr(modulo, "exportar_csv", lambda filtros: iter([b"x"]))
+    trabajo = propio.enviar(FILTROS, "csv", 1)
+    _esperar(propio, trabajo["id"])
+    # El futuro terminado sigue registrado hasta que el hilo lo quita
+    futuro = Future()
+    futuro.set_result(None)
+    propio._futuros[trabajo["id"]] = futuro
+    leer = propio._leer
+    lecturas = []
+
+    def leer_antes_de_terminar(id_trabajo):
+        # La primera lectura ocurre mientras el hilo todavía ejecutaba
+        lecturas.append(id_trabajo)
+        actual = leer(id_trabajo)
+        return dict(actual, estado=EJECUTANDO) if len(lecturas) == 1 else actual
+
+    monkeypatch.setattr(propio, "_leer", leer_antes_de_terminar)
+    resultado = propio.cancelar(trabajo["id"])
+
+    assert resultado["estado"] == TERMINADO
+    assert resultado["mensaje"] is None
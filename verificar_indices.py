@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Script para verificar con EXPLAIN que las consultas críticas de registro,
+credencial y usuarios usan índices en lugar de recorridos secuenciales.
+
+Uso:
+    python verificar_indices.py             # verifica sobre los datos existentes
+    python verificar_indices.py --sembrar   # crea tablas y datos de volumen realista
+    python verificar_indices.py --crear     # crea los índices de los modelos que falten
+
+--sembrar inserta datos de prueba; usarlo solo contra una base de datos
+desechable (por ejemplo DATABASE_URL=sqlite:///indices.db o un PostgreSQL local).
+"""
+
+import sys
+import os
+import json
+import random
+from datetime import datetime, timedelta
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import (
+    Persona,
+    Credencial,
+    TipoCredencial,
+    Registro,
+    Usuario,
+    EstadoAsistencia,
+)
+from app.utils.init_db import inicializar_datos_referencia
+
+TABLAS_CRITICAS = {"registro", "credencial", "usuarios", "estado_asistencia"}
+
+PERSONAS = 500
+DIAS = 120
+
+
+def sembrar_datos():
+    """Crea personas, credenciales, usuarios y registros con volumen realista"""
+    db.create_all()
+    inicializar_datos_referencia()
+
+    if Persona.query.count() >= PERSONAS:
+        print("Ya existen datos suficientes. Saltando la siembra.")
+        return
+
+    tipo_pin = TipoCredencial.query.filter_by(nombre="PIN").first()
+    inicio = datetime.now() - timedelta(days=DIAS)
+
+    for i in range(PERSONAS):
+        persona = Persona(
+            primer_nombre=f"Nombre{i}",
+            primer_apellido=f"Apellido{i}",
+            documento=f"IDX{i:08d}",
+            correo=f"indices{i}@empresa.com",
+        )
+        db.session.add(persona)
+        db.session.flush()
+
+        credencial = Credencial(
+            id_persona=persona.id_persona,
+            id_tipo_credencial=tipo_pin.id_tipo_credencial,
+            valor=f"IDX{i:04d}",
+            activo=True,
+        )
+        db.session.add(credencial)
+        db.session.add(
+            Usuario(id_persona=persona.id_persona, id_rol=2, contrasena="x")
+        )
+        db.session.flush()
+
+        registros = []
+        for dia in range(DIAS):
+            fecha = inicio + timedelta(days=dia)
+            entrada = fecha.replace(hour=7, minute=random.randint(0, 59))
+            salida = fecha.replace(hour=17, minute=random.randint(0, 59))
+            for tipo, fecha_hora in ((1, entrada), (2, salida)):
+                registros.append(
+                    {
+                        "id_persona": persona.id_persona,
+                        "id_credencial": credencial.id_credencial,
+                        "id_tipo_registro": tipo,
+                        "fecha_hora": fecha_hora,
+                        "observacion": "Registro de prueba",
+                    }
+                )
+        db.session.execute(db.insert(Registro), registros)
+
+    db.session.commit()
+    print(f"✅ Datos sembrados: {PERSONAS} personas, {PERSONAS * DIAS * 2} registros")
+
+
+def crear_indices():
+    """Crea en las tablas existentes los índices definidos en los modelos que falten"""
+    for tabla in db.metadata.sorted_tables:
+        if tabla.name not in TABLAS_CRITICAS:
+            continue
+        for indice in tabla.indexes:
+            indice.create(db.engine, checkfirst=True)
+    print("✅ Índices de los modelos verificados")
+
+
+def consultas_criticas():
+    """Consultas del registro de asistencia, reportes, historial y sesión"""
+    persona = Persona.query.order_by(Persona.id_persona.desc()).first()
+    id_persona = persona.id_persona if persona else 1
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return {
+        "registro: último ingreso por persona": Registro.query.filter_by(
+            id_persona=id_persona, id_tipo_registro=1
+        )
+        .order_by(Registro.fecha_hora.desc())
+        .limit(1),
+        "registro: estado de asistencia": EstadoAsistencia.query.filter_by(
+            id_persona=id_persona
+        ),
+        "reportes: rango de fechas": db.session.query(
+            Registro.id_persona, Registro.id_tipo_registro, Registro.fecha_hora
+        ).filter(
+            Registro.fecha_hora >= hoy - timedelta(days=1),
+            Registro.fecha_hora <= hoy,
+        ),
+        "reportes: entradas de hoy": db.session.query(db.func.count()).filter(
+            Registro.fecha_hora >= hoy, Registro.id_tipo_registro == 1
+        ),
+        "perfil: historial paginado por cursor": Registro.query.filter(
+            Registro.id_persona == id_persona,
+            db.tuple_(Registro.fecha_hora, Registro.registro_id) < (hoy, 2**31 - 1),
+        )
+        .order_by(Registro.fecha_hora.desc(), Registro.registro_id.desc())
+        .limit(50),
+        "perfil: PIN de la persona": Credencial.query.filter(
+            Credencial.id_persona == id_persona
+        ),
+        "sesión: usuario por persona": Usuario.query.filter_by(id_persona=id_persona),
+    }
+
+
+def explicar(consulta):
+    """Ejecuta EXPLAIN y devuelve las tablas críticas recorridas secuencialmente"""
+    dialecto = db.engine.dialect
+    compilado = consulta.statement.compile(dialect=dialecto)
+    parametros = compilado.construct_params()
+    if compilado.positional:
+        parametros = tuple(parametros[nombre] for nombre in compilado.positiontup)
+
+    with db.engine.connect() as conexion:
+        if dialecto.name == "postgresql":
+            plan = conexion.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {compilado}", parametros
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return sorted(_recorridos_postgresql(plan[0]["Plan"])), plan
+
+        filas = conexion.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compilado}", parametros
+        ).all()
+        detalle = [fila[-1] for fila in filas]
+        recorridos = set()
+        for linea in detalle:
+            partes = linea.split()
+            if len(partes) >= 2 and partes[0] == "SCAN" and "USING" not in partes:
+                recorridos.add(partes[1])
+        return sorted(recorridos & TABLAS_CRITICAS), detalle
+
+
+def _recorridos_postgresql(nodo):
+    recorridos = set()
+    if nodo.get("Node Type") == "Seq Scan" and nodo.get("Relation Name") in TABLAS_CRITICAS:
+        recorridos.add(nodo["Relation Name"])
+    for hijo in nodo.get("Plans", []):
+        recorridos |= _recorridos_postgresql(hijo)
+    return recorridos
+
+
+def main():
+    """Función principal para verificar los planes de ejecución"""
+    app = create_app()
+
+    with app.app_context():
+        if "--sembrar" in sys.argv[1:]:
+            sembrar_datos()
+        if "--crear" in sys.argv[1:]:
+            crear_indices()
+
+        # Actualizar estadísticas para que el planificador use el volumen real
+        with db.engine.begin() as conexion:
+            conexion.exec_driver_sql("ANALYZE")
+
+        fallidas = 0
+        for nombre, consulta in consultas_criticas().items():
+            recorridos, plan = explicar(consulta)
+            if recorridos:
+                fallidas += 1
+                print(f"❌ {nombre}: recorrido secuencial sobre {', '.join(recorridos)}")
+                print(f"   {plan}")
+            else:
+                print(f"✅ {nombre}")
+
+        if fallidas:
+            print(f"\n{fallidas} consultas no usan índices")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()